@@ -1,29 +1,77 @@
 ## Keybinds
-from deletion import delete_current_image
+from deletion import delete_current_image, keep_sharpest_of_burst
 import media_loader
 import subprocess
+import tracing
 
 def bind_keyboard_shortcuts(app):
         root = app.root
+
+        #keys typed into the folder search box are text, not shortcuts
+        #each shortcut is timed as its own stage unless it waits on a dialog
+        def bind(sequence, handler, traced=True):
+                stage = "key." + sequence.strip("<>")
+
+                def on_key(e):
+                        if e.widget is app.folder_search:
+                                return None
+                        if not traced:
+                                return handler(e)
+                        with tracing.span(stage):
+                                return handler(e)
+
+                root.bind(sequence, on_key)
         
         #Delete + backspace delete photos
-        root.bind("<Delete>", lambda e: (delete_current_image(app), "break"))
-        root.bind("<BackSpace>", lambda e: (delete_current_image(app), "break"))
+        bind("<Delete>", lambda e: (delete_current_image(app), "break"), traced=False)
+        bind("<BackSpace>", lambda e: (delete_current_image(app), "break"), traced=False)
 
         
+        #b keeps the sharpest frame of the current burst, trashes the rest
+        bind("<b>", lambda e: keep_sharpest_of_burst(app), traced=False)
+
+        #1-5 sort into the suggested folders, best guess first
+        bind("<Key-1>", lambda e: app.move_to_suggestion(0))
+        bind("<Key-2>", lambda e: app.move_to_suggestion(1))
+        bind("<Key-3>", lambda e: app.move_to_suggestion(2))
+        bind("<Key-4>", lambda e: app.move_to_suggestion(3))
+        bind("<Key-5>", lambda e: app.move_to_suggestion(4))
+
         #Tab makes new folder
-        root.bind("<Tab>", lambda e: app.create_new_folder())
+        bind("<Tab>", lambda e: app.create_new_folder(), traced=False)
 
         #Spacebar is playing/pausing videos
         #enter shows them in native video app
-        root.bind("<space>", lambda e: media_loader.toggle_video(app))
+        bind("<space>", lambda e: media_loader.toggle_video(app))
 
-        root.bind(
+        bind(
                 "<Return>",
                 lambda e: subprocess.Popen(
                         ["open", str(app.current_image_path)]
                 ) if app.current_image_path and app.is_video(app.current_image_path) else None
         )
 
+        #Shift + arrows grow/shrink the range that the next move applies to
+        bind("<Shift-Right>", lambda e: app.set_selection(app.selection + 1))
+        bind("<Shift-Left>", lambda e: app.set_selection(app.selection - 1))
+
+        #hold z to see 100% around the pointer; = and - zoom in steps,
+        #drag to pan while zoomed
+        bind("<KeyPress-z>", lambda e: media_loader.zoom_key_down(app))
+        bind("<KeyRelease-z>", lambda e: media_loader.zoom_key_up(app))
+        bind("<equal>", lambda e: media_loader.zoom_step(app, 2.0))
+        bind("<minus>", lambda e: media_loader.zoom_step(app, 0.5))
+        app.image_label.bind("<ButtonPress-1>", lambda e: media_loader.start_pan(app, e))
+        app.image_label.bind("<B1-Motion>", lambda e: media_loader.pan(app, e))
+
+        #/ jumps to the folder search; there, enter sorts into the top match
+        #and escape clears it and goes back to sorting
+        bind("<slash>", lambda e: (app.folder_search.focus_set(), "break"))
+        app.folder_search.bind("<Return>", lambda e: (app.move_to_top_match(), "break"))
+        app.folder_search.bind(
+                "<Escape>",
+                lambda e: (app.folder_search_var.set(""), app.refocus_app(), "break")
+        )
+
         #
         root.bind("<Command-z>", lambda e: (app.undo_last_action(), "break"))
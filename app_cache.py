@@ -0,0 +1,22 @@
+# app_cache.py
+"""
+Where the app keeps what it learns between sessions, and the SQLite
+caches kept there.
+"""
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+CACHE_DIR = Path.home() / ".cache" / "photo-sorter"
+
+
+def open_cache_db(db_path: Path) -> sqlite3.Connection:
+    """
+    Open (creating it and its folder if needed) a SQLite cache. The
+    connection is shared by the app's threads, so the caller must
+    serialize access to it (each cache holds a lock for that).
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    return sqlite3.connect(str(db_path), check_same_thread=False)
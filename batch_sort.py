@@ -0,0 +1,270 @@
+# batch_sort.py
+"""
+Headless, rule-based sorting. Files no rule matches stay in the source
+folder for the interactive sorter.
+
+    python batch_sort.py SOURCE_DIR RULES.json [--dry-run] [--workers N]
+
+RULES.json:
+
+    {"rules": [
+        {"match": {"ext": [".png"], "name": "Screenshot*"}, "target": "Screenshots"},
+        {"match": {"camera": "*iPhone*"}, "target": "Phone/{year}-{month}"},
+        {"match": {"after": "2024-01-01", "min_size": 1000000}, "target": "{year}"}
+    ]}
+
+The first matching rule wins. Match keys (all optional, all must hold):
+ext (list), name (glob), camera (glob on "make model"), after / before
+(YYYY-MM-DD, capture date or mtime), min_size / max_size (bytes).
+Targets are folders inside SOURCE_DIR; {year}, {month}, {day} and {camera}
+are filled in from the file's metadata. Moves are recorded in the same undo
+journal as the app, so they can be undone from there.
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import os
+import string
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path, PurePath
+from typing import Optional
+
+from file_routing import FileRouter, MoveResult, transfer
+from metadata import MediaInfo, MetadataIndex
+from undo import DEFAULT_JOURNAL_PATH, UndoJournal, UndoManager
+
+
+@dataclass(frozen=True)
+class Rule:
+    target: str
+    ext: tuple[str, ...] = ()
+    name: Optional[str] = None
+    camera: Optional[str] = None
+    after: Optional[datetime] = None
+    before: Optional[datetime] = None
+    min_size: Optional[int] = None
+    max_size: Optional[int] = None
+
+    def matches(self, info: MediaInfo) -> bool:
+        path = info.path
+        if self.ext and path.suffix.lower() not in self.ext:
+            return False
+        if self.name and not fnmatch.fnmatch(path.name.lower(), self.name.lower()):
+            return False
+        if self.camera and not fnmatch.fnmatch(_camera(info).lower(), self.camera.lower()):
+            return False
+        if self.after and info.date < self.after:
+            return False
+        if self.before and info.date >= self.before:
+            return False
+        if self.min_size is not None and info.size < self.min_size:
+            return False
+        if self.max_size is not None and info.size > self.max_size:
+            return False
+        return True
+
+    def folder_for(self, source_dir: Path, info: MediaInfo) -> Path:
+        d = info.date
+        name = self.target.format(
+            year=f"{d.year:04d}", month=f"{d.month:02d}", day=f"{d.day:02d}",
+            camera=_folder_name(_camera(info)),
+        )
+        folder = (source_dir / name).resolve()
+        if source_dir.resolve() not in folder.parents:
+            raise ValueError(f"Rule target escapes the source folder: {self.target}")
+        return folder
+
+
+def _camera(info: MediaInfo) -> str:
+    return " ".join(p for p in (info.make, info.model) if p)
+
+
+def _folder_name(value: str) -> str:
+    """`value` as a single folder name: no separators, never "." or ".."."""
+    value = value.replace("/", "-").replace(os.sep, "-").strip()
+    return value if value.strip(".") else "Unknown"
+
+
+def _date(value: Optional[str]) -> Optional[datetime]:
+    return datetime.strptime(value, "%Y-%m-%d") if value else None
+
+
+# What {placeholders} in a target are filled in with.
+TARGET_FIELDS = ("year", "month", "day", "camera")
+
+# The type each match key takes in RULES.json.
+MATCH_TYPES = {
+    "ext": list, "name": str, "camera": str, "after": str, "before": str,
+    "min_size": int, "max_size": int,
+}
+
+
+def _check_rule(n: int, raw) -> None:
+    """Raise ValueError, naming rule `n`, unless `raw` is a well-formed rule."""
+    if not isinstance(raw, dict) or not isinstance(raw.get("target"), str):
+        raise ValueError(f"rule {n}: needs a \"target\" folder name")
+    _check_target(n, raw["target"])
+    match = raw.get("match", {})
+    if not isinstance(match, dict):
+        raise ValueError(f"rule {n}: \"match\" must be an object")
+    for key, value in match.items():
+        expected = MATCH_TYPES.get(key)
+        if expected is None:
+            raise ValueError(f"rule {n}: unknown match key {key!r} (expected one of {', '.join(MATCH_TYPES)})")
+        if not isinstance(value, expected) or isinstance(value, bool):
+            raise ValueError(f"rule {n}: match key {key!r} must be of type {expected.__name__}, not {value!r}")
+    if not all(isinstance(e, str) for e in match.get("ext", ())):
+        raise ValueError(f"rule {n}: \"ext\" must be a list of extensions like [\".jpg\"]")
+    for key in ("after", "before"):
+        try:
+            _date(match.get(key))
+        except ValueError:
+            raise ValueError(f"rule {n}: {key!r} must be a YYYY-MM-DD date, not {match[key]!r}") from None
+
+
+def _check_target(n: int, target: str) -> None:
+    """Raise ValueError unless `target` names a folder inside the source, whatever gets filled in."""
+    try:
+        fields = {f for _, f, _, _ in string.Formatter().parse(target) if f is not None}
+        unknown = fields - set(TARGET_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown placeholder {{{sorted(unknown)[0]}}}")
+        sample = target.format(**{f: "x" for f in TARGET_FIELDS})
+    except (ValueError, IndexError) as e:
+        raise ValueError(f"rule {n}: bad target {target!r} ({e}; use {', '.join(f'{{{f}}}' for f in TARGET_FIELDS)})") from None
+    folder = PurePath(sample)
+    if not folder.parts or folder.anchor or ".." in folder.parts:
+        raise ValueError(f"rule {n}: target {target!r} must be a folder inside the source folder")
+
+
+def load_rules(path: Path) -> list[Rule]:
+    """Read RULES.json; ValueError if it isn't valid."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    rules = []
+    for n, raw in enumerate(data.get("rules", []), 1):
+        _check_rule(n, raw)
+        match = raw.get("match", {})
+        rules.append(Rule(
+            target=raw["target"],
+            ext=tuple(e.lower() for e in match.get("ext", ())),
+            name=match.get("name"),
+            camera=match.get("camera"),
+            after=_date(match.get("after")),
+            before=_date(match.get("before")),
+            min_size=match.get("min_size"),
+            max_size=match.get("max_size"),
+        ))
+    return rules
+
+
+def plan(router: FileRouter, rules: list[Rule], infos: list[MediaInfo], *, create: bool = True) -> list[MoveResult]:
+    """
+    Where each file a rule matches goes. Every target is resolved (a
+    ValueError if one escapes the source folder) before any is created.
+    """
+    targets = []
+    for info in infos:
+        rule = next((r for r in rules if r.matches(info)), None)
+        if rule is not None:
+            targets.append((info, rule.folder_for(router.source_dir, info)))
+
+    plans = []
+    for info, folder in targets:
+        if not folder.is_dir():
+            if not create:
+                plans.append(MoveResult(src=info.path, dst=folder / info.path.name))
+                continue
+            folder.mkdir(parents=True)
+        try:
+            plans.append(router.plan_move(info.path, folder, on_collision="rename"))
+        except FileNotFoundError:
+            continue    # gone since it was listed
+    return plans
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sort a folder by rules, without the GUI.")
+    parser.add_argument("source", type=Path)
+    parser.add_argument("rules", type=Path)
+    parser.add_argument("--dry-run", action="store_true", help="print what would move")
+    parser.add_argument("--workers", type=int, default=None, help="metadata worker processes")
+    parser.add_argument("--journal", type=Path, default=DEFAULT_JOURNAL_PATH)
+    args = parser.parse_args(argv)
+
+    source = args.source.resolve()
+    router = FileRouter(source)
+    try:
+        rules = load_rules(args.rules)
+    except ValueError as e:
+        parser.error(f"{args.rules}: {e}")
+    started = time.perf_counter()
+
+    media = router.list_media()
+    index = MetadataIndex()
+    by_path = index.index(media, workers=args.workers)
+    index.close()
+    infos = [by_path[p] for p in media if p in by_path]
+
+    undo = None
+    if not args.dry_run:
+        # Checked before plan() creates any folders.
+        undo = UndoManager(UndoJournal(args.journal))
+        pending = undo.restore()
+        if pending is not None and pending != source:
+            print(f"Undo journal has an unfinished session for {pending}; "
+                  f"finish it or pass --journal.", file=sys.stderr)
+            return 2
+
+    try:
+        plans = plan(router, rules, infos, create=not args.dry_run)
+    except ValueError as e:
+        # A symlinked target folder pointing outside the source, say.
+        print(e, file=sys.stderr)
+        if undo is not None:
+            undo.journal.close()
+        return 2
+
+    if args.dry_run:
+        for p in plans:
+            print(f"{p.src.name} -> {p.dst.relative_to(source)}")
+        print(f"{len(plans)} of {len(media)} files would move")
+        return 0
+
+    if pending is None:
+        undo.begin_session(source)
+
+    moved = failed = gone = 0
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [(p, pool.submit(transfer, p.src, p.dst)) for p in plans]
+        for p, fut in futures:
+            try:
+                fut.result()
+            except Exception as e:
+                router.release(p.dst)
+                if isinstance(e, FileNotFoundError) and not os.path.lexists(p.src):
+                    gone += 1    # removed by something else meanwhile
+                    continue
+                failed += 1
+                print(f"failed: {p.src.name}: {e}", file=sys.stderr)
+                continue
+            undo.push_move(moved_to=p.dst, restore_to=p.src)
+            moved += 1
+    undo.journal.close()
+
+    elapsed = time.perf_counter() - started
+    rate = len(media) / elapsed if elapsed > 0 else 0.0
+    print(f"moved {moved}, failed {failed}, gone {gone}, left {len(media) - moved - gone} for manual sorting")
+    print(f"{len(media)} files in {elapsed:.2f}s ({rate:.1f} files/s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
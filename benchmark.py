@@ -0,0 +1,261 @@
+# benchmark.py
+"""
+Times the sorter's hot paths on a generated folder, without the GUI.
+
+    python benchmark.py [--images N] [--size WxH] [--videos N] [--folders N]
+                        [--repeat N] [--output results.json]
+                        [--baseline baseline.json] [--tolerance 0.2]
+                        [--save-baseline baseline.json]
+
+The synthetic source folder holds N images spread over JPEG / PNG / WebP,
+a few short MP4s and M target folders (one of them full of 'name (n).ext'
+collisions). Each benchmark reports the median / min / p95 time per
+operation in milliseconds. With --baseline, any benchmark whose median is
+more than --tolerance slower than the stored one is reported as a
+regression and the exit status is 1.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import media_loader
+from file_routing import FileRouter
+from undo import UndoAction, UndoManager
+
+IMAGE_FORMATS = {".jpg": "JPEG", ".png": "PNG", ".webp": "WEBP"}
+COLLISION_COPIES = 200
+
+
+def _synthetic_pixels(rng: np.random.Generator, width: int, height: int) -> Image.Image:
+    """Smooth colour fields plus grain: compresses roughly like a photo."""
+    coarse = rng.integers(0, 256, size=(max(2, height // 64), max(2, width // 64), 3), dtype=np.uint8)
+    img = Image.fromarray(coarse).resize((width, height), Image.Resampling.BICUBIC)
+    grain = rng.integers(-12, 13, size=(height, width, 1), dtype=np.int16)
+    return Image.fromarray(np.clip(np.asarray(img, dtype=np.int16) + grain, 0, 255).astype(np.uint8))
+
+
+def _write_video(path: Path, rng: np.random.Generator, width: int, height: int, frames: int = 30) -> None:
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 30.0, (width, height))
+    base = np.asarray(_synthetic_pixels(rng, width, height))[:, :, ::-1]
+    for i in range(frames):
+        writer.write(np.roll(base, i * 4, axis=1))
+    writer.release()
+
+
+def make_corpus(
+    root: Path,
+    images: int = 60,
+    size: tuple[int, int] = (4000, 3000),
+    videos: int = 3,
+    folders: int = 20,
+    seed: int = 0,
+) -> Path:
+    """Create (and return) a source folder to benchmark against."""
+    rng = np.random.default_rng(seed)
+    source = root / "source"
+    source.mkdir(parents=True)
+
+    # One picture per format, re-encoded under many names: generating the
+    # pixels is far slower than anything being measured.
+    exts = list(IMAGE_FORMATS)
+    samples = {ext: None for ext in exts}
+    for i in range(images):
+        ext = exts[i % len(exts)]
+        path = source / f"IMG_{i:05d}{ext}"
+        if samples[ext] is None:
+            _synthetic_pixels(rng, *size).save(path, IMAGE_FORMATS[ext], quality=90)
+            samples[ext] = path.read_bytes()
+        else:
+            path.write_bytes(samples[ext])
+
+    for i in range(videos):
+        _write_video(source / f"VID_{i:03d}.mp4", rng, 1280, 720)
+
+    for i in range(folders):
+        (source / f"Folder {i:03d}").mkdir()
+
+    crowded = source / "Crowded"
+    crowded.mkdir()
+    (crowded / "IMG.jpg").touch()
+    for n in range(2, COLLISION_COPIES + 1):
+        (crowded / f"IMG ({n}).jpg").touch()
+    return source
+
+
+def _time(fn: Callable[[], object], repeat: int) -> list[float]:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+    return runs
+
+
+def _summary(runs: list[float], items: int = 1) -> dict:
+    per_item = sorted(r / items * 1000 for r in runs)
+    p95 = per_item[min(len(per_item) - 1, round(0.95 * (len(per_item) - 1)))]
+    return {
+        "median_ms": round(statistics.median(per_item), 4),
+        "min_ms": round(per_item[0], 4),
+        "p95_ms": round(p95, 4),
+        "runs": len(runs),
+        "items": items,
+    }
+
+
+def run_benchmarks(source: Path, repeat: int = 5) -> dict[str, dict]:
+    results: dict[str, dict] = {}
+    router = FileRouter(source)
+    media = router.list_media()
+    folders = [f for f in router.list_target_folders() if f.name != "Crowded"]
+    images = [p for p in media if p.suffix.lower() in IMAGE_FORMATS]
+    videos = [p for p in media if p.suffix.lower() == ".mp4"]
+
+    results["list_media"] = _summary(_time(lambda: FileRouter(source).list_media(), repeat))
+    results["list_target_folders"] = _summary(_time(lambda: FileRouter(source).list_target_folders(), repeat))
+
+    # Cold: a fresh router indexes the crowded folder; warm: index reused.
+    crowded = source / "Crowded"
+    results["unique_destination_cold"] = _summary(
+        _time(lambda: FileRouter(source)._unique_destination(crowded, "IMG.jpg"), repeat)
+    )
+    warm = FileRouter(source)
+    warm._unique_destination(crowded, "IMG.jpg")
+    results["unique_destination_warm"] = _summary(
+        _time(lambda: warm._unique_destination(crowded, "IMG.jpg"), repeat * 100), 1
+    )
+
+    # Move everything out round-robin, then undo it all; each round leaves
+    # the folder as it found it.
+    move_runs, undo_runs = [], []
+    for _ in range(repeat):
+        router = FileRouter(source)
+        undo = UndoManager()
+        actions = []
+        started = time.perf_counter()
+        for i, path in enumerate(media):
+            result = router.move(path, folders[i % len(folders)], on_collision="rename")
+            actions.append(UndoAction(type="move", src=result.dst, dst=result.src))
+        move_runs.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for action in reversed(actions):
+            undo.apply(action)
+        undo_runs.append(time.perf_counter() - started)
+    results["move"] = _summary(move_runs, len(media))
+    results["undo_apply"] = _summary(undo_runs, len(media))
+
+    for ext in IMAGE_FORMATS:
+        paths = [p for p in images if p.suffix.lower() == ext]
+        if not paths:
+            continue
+        for mode in ("fast", "balanced", "quality"):
+            runs = _time(lambda: [media_loader.decode_image(p, mode) for p in paths], max(1, repeat // 2))
+            results[f"decode_{ext[1:]}_{mode}"] = _summary(runs, len(paths))
+
+    if videos:
+        def first_frames():
+            for path in videos:
+                cap = cv2.VideoCapture(str(path))
+                try:
+                    media_loader.decode_first_frame(cap)
+                finally:
+                    cap.release()
+        results["video_first_frame"] = _summary(_time(first_frames, repeat), len(videos))
+
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Benchmarks whose median got slower than the baseline allows."""
+    regressions = []
+    for name, base in sorted(baseline.items()):
+        current = results.get(name)
+        if current is None:
+            continue
+        limit = base["median_ms"] * (1 + tolerance)
+        if current["median_ms"] > limit:
+            regressions.append(
+                f"{name}: {current['median_ms']:.3f} ms vs baseline {base['median_ms']:.3f} ms "
+                f"(+{current['median_ms'] / base['median_ms'] - 1:.0%})"
+            )
+    return regressions
+
+
+def _size(value: str) -> tuple[int, int]:
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)
+
+
+def _at_least_one(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return n
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the sorter's hot paths on synthetic media.")
+    parser.add_argument("--images", type=int, default=60)
+    parser.add_argument("--size", type=_size, default=(4000, 3000), help="image resolution, WxH")
+    parser.add_argument("--videos", type=int, default=3)
+    parser.add_argument("--folders", type=_at_least_one, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", type=Path, help="fail if slower than this results file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs baseline")
+    parser.add_argument("--save-baseline", type=Path, help="also store the results as a baseline")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="photo-sorter-bench-") as tmp:
+        source = make_corpus(
+            Path(tmp), images=args.images, size=args.size,
+            videos=args.videos, folders=args.folders, seed=args.seed,
+        )
+        results = run_benchmarks(source, repeat=args.repeat)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "images": args.images,
+            "size": list(args.size),
+            "videos": args.videos,
+            "folders": args.folders,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.save_baseline:
+        args.save_baseline.write_text(text + "\n", encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
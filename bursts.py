@@ -0,0 +1,271 @@
+# bursts.py
+from __future__ import annotations
+
+import math
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import media_types
+from app_cache import CACHE_DIR, open_cache_db
+from process_pool import DEFAULT_WORKERS, process_pool
+
+DEFAULT_SIGNATURE_DB = CACHE_DIR / "signatures.sqlite3"
+
+# Frames are measured in grayscale at this size (longest side), so the
+# sharpness of frames from one camera compares fairly.
+ANALYSIS_SIZE = 512
+# A frame shot within BURST_GAP_S of the previous one, and within
+# BURST_DISTANCE bits of it by dHash, continues its burst.
+BURST_GAP_S = 2.0
+BURST_DISTANCE = 16
+# Frames this close by pHash are grouped even with other shots in between,
+# as long as the group then spans no more than NEAR_DUPLICATE_SPAN_S: a
+# slowly changing series (a timelapse, studio shots on white) must not
+# chain into one group.
+NEAR_DUPLICATE_DISTANCE = 6
+NEAR_DUPLICATE_SPAN_S = 60.0
+
+
+@dataclass(frozen=True)
+class Signature:
+    dhash: int
+    phash: int
+    sharpness: float    # variance of the Laplacian; higher is sharper
+
+
+def _measure(path: Path) -> Optional[tuple[np.ndarray, np.ndarray, float]]:
+    """
+    (9x8 and 32x32 grayscale thumbnails, sharpness) of one image. The
+    hashes themselves are computed for all images at once. Top-level and
+    picklable, so it can run in a process pool.
+    """
+    try:
+        with media_types.open_image(path) as img:
+            img.draft("L", (ANALYSIS_SIZE, ANALYSIS_SIZE))
+            img = img.convert("L")
+        img.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE), Image.Resampling.BILINEAR)
+    except Exception:
+        return None
+
+    gray = np.asarray(img)
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    dct_input = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA)
+    return small, dct_input, sharpness
+
+
+def _pack(bits: np.ndarray) -> list[int]:
+    """(N, 64) booleans -> N 64-bit ints."""
+    packed = np.ascontiguousarray(np.packbits(bits, axis=1))
+    return packed.view(">u8").ravel().tolist()
+
+
+def dhash(small: np.ndarray) -> list[int]:
+    """Difference hashes of a stack of 8x9 grayscale images: is each pixel darker than its right neighbour."""
+    small = small.astype(np.int16)
+    return _pack((small[:, :, 1:] > small[:, :, :-1]).reshape(len(small), 64))
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    m[0] /= np.sqrt(2)
+    return m.astype(np.float32)
+
+
+_DCT32 = _dct_matrix(32)
+
+
+def phash(dct_input: np.ndarray) -> list[int]:
+    """Perceptual hashes of a stack of 32x32 grayscale images: which low frequencies are above their median."""
+    coeffs = _DCT32 @ dct_input.astype(np.float32) @ _DCT32.T
+    low = coeffs[:, :8, :8].reshape(len(dct_input), 64)
+    median = np.median(low[:, 1:], axis=1)     # without the DC term
+    return _pack(low > median[:, None])
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Hashes indexed for "everything within distance r" queries under Hamming distance."""
+
+    __slots__ = ("_root",)
+
+    class _Node:
+        __slots__ = ("hash", "items", "children")
+
+        def __init__(self, h: int, item) -> None:
+            self.hash = h
+            self.items = [item]
+            self.children: dict[int, "BKTree._Node"] = {}
+
+    def __init__(self) -> None:
+        self._root: Optional[BKTree._Node] = None
+
+    def add(self, h: int, item) -> None:
+        if self._root is None:
+            self._root = BKTree._Node(h, item)
+            return
+        node = self._root
+        while True:
+            d = hamming(h, node.hash)
+            if d == 0:
+                node.items.append(item)
+                return
+            child = node.children.get(d)
+            if child is None:
+                node.children[d] = BKTree._Node(h, item)
+                return
+            node = child
+
+    def query(self, h: int, radius: int) -> list:
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node.hash)
+            if d <= radius:
+                found.extend(node.items)
+            # Triangle inequality: only these subtrees can hold matches.
+            for dist, child in node.children.items():
+                if d - radius <= dist <= d + radius:
+                    stack.append(child)
+        return found
+
+
+def find_bursts(
+    signatures: dict[Path, Signature],
+    dates: dict[Path, datetime],
+    gap_s: float = BURST_GAP_S,
+    burst_distance: int = BURST_DISTANCE,
+    near_distance: int = NEAR_DUPLICATE_DISTANCE,
+    near_span_s: float = NEAR_DUPLICATE_SPAN_S,
+) -> list[tuple[Path, ...]]:
+    """
+    Groups of two or more near-identical frames, each in capture order.
+    Consecutive frames (by `dates`) join up if they were shot within
+    `gap_s` of each other and their dHashes are close; frames whose pHashes
+    are within `near_distance` join up if the group they make spans at
+    most `near_span_s`. Frames without a capture date are never grouped.
+    """
+    paths = sorted(signatures, key=lambda p: (dates.get(p, datetime.max), p.name))
+    n = len(paths)
+    parent = list(range(n))
+    times = [dates[p].timestamp() if p in dates else math.nan for p in paths]
+    # First and last capture time of each group, kept at its root.
+    first = list(times)
+    last = list(times)
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i: int, j: int) -> None:
+        i, j = find(i), find(j)
+        if i != j:
+            parent[i] = j
+            first[j] = min(first[i], first[j])
+            last[j] = max(last[i], last[j])
+
+    if n > 1:
+        hashes = np.array([signatures[p].dhash for p in paths], dtype=np.uint64)
+        distances = np.unpackbits((hashes[1:] ^ hashes[:-1]).view(np.uint8)).reshape(n - 1, 64).sum(axis=1)
+        adjacent = (np.diff(np.array(times)) <= gap_s) & (distances <= burst_distance)
+        for i in np.flatnonzero(adjacent).tolist():
+            union(i, i + 1)
+
+    tree = BKTree()
+    for i, p in enumerate(paths):
+        if math.isnan(times[i]):
+            continue
+        h = signatures[p].phash
+        for j in tree.query(h, near_distance):
+            a, b = find(i), find(j)
+            if max(last[a], last[b]) - min(first[a], first[b]) <= near_span_s:
+                union(a, b)
+        tree.add(h, i)
+
+    groups: dict[int, list[Path]] = {}
+    for i, p in enumerate(paths):
+        groups.setdefault(find(i), []).append(p)
+    return [tuple(g) for g in groups.values() if len(g) > 1]
+
+
+def sharpest(frames: Iterable[Path], signatures: dict[Path, Signature]) -> Path:
+    return max(frames, key=lambda p: signatures[p].sharpness)
+
+
+class SignatureIndex:
+    """
+    SQLite cache of Signatures keyed by path + size + mtime, like
+    MetadataIndex: only new or changed images are decoded again, in a
+    process pool, and their hashes are then computed in one batch.
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_SIGNATURE_DB) -> None:
+        self._db = open_cache_db(db_path)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS signatures ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,"
+                " dhash TEXT, phash TEXT, sharpness REAL)"
+            )
+
+    def index(self, paths: Iterable[Path], workers: Optional[int] = None) -> dict[Path, Signature]:
+        result: dict[Path, Signature] = {}
+        stale: list[tuple[Path, os.stat_result]] = []
+
+        with self._lock:
+            for path in paths:
+                if media_types.is_video(path):
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                row = self._db.execute(
+                    "SELECT dhash, phash, sharpness FROM signatures WHERE path = ? AND size = ? AND mtime_ns = ?",
+                    (str(path), st.st_size, st.st_mtime_ns),
+                ).fetchone()
+                if row is None:
+                    stale.append((Path(path), st))
+                else:
+                    result[Path(path)] = Signature(int(row[0], 16), int(row[1], 16), row[2])
+
+        if not stale:
+            return result
+
+        with process_pool(min(workers or DEFAULT_WORKERS, len(stale))) as pool:
+            measured = list(pool.map(_measure, [p for p, _ in stale], chunksize=16))
+        done = [(p, st, m) for (p, st), m in zip(stale, measured) if m is not None]
+        if not done:
+            return result
+
+        dhashes = dhash(np.stack([m[0] for _, _, m in done]))
+        phashes = phash(np.stack([m[1] for _, _, m in done]))
+        with self._lock, self._db:
+            for (path, st, m), dh, ph in zip(done, dhashes, phashes):
+                result[path] = Signature(dh, ph, m[2])
+                self._db.execute(
+                    "INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?, ?, ?)",
+                    (str(path), st.st_size, st.st_mtime_ns, format(dh, "016x"), format(ph, "016x"), m[2]),
+                )
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,135 @@
+# checkpoint.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from app_cache import CACHE_DIR
+from file_routing import FileRouter
+
+DEFAULT_CHECKPOINT_PATH = CACHE_DIR / "checkpoint.json"
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    """
+    Where a sort left off: the items still to go, in display order, and the
+    target folders, as names inside `source`. `dir_mtime_ns` and
+    `names_digest` are the source folder's mtime and a digest of its
+    listing when the lists were taken. The mtime alone can't be trusted:
+    on filesystems with coarse timestamps (FAT, SMB, ...) a change in the
+    same second leaves it as it was. If both still match, nothing was
+    added, removed or renamed there since.
+    """
+    source: Path
+    dir_mtime_ns: int
+    remaining: tuple[str, ...]
+    folders: tuple[str, ...]
+    sort_order: str = "Name"
+    names_digest: str = ""
+
+
+def save_checkpoint(checkpoint: Checkpoint, path: Path = DEFAULT_CHECKPOINT_PATH) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "source": str(checkpoint.source),
+        "dir_mtime_ns": checkpoint.dir_mtime_ns,
+        "remaining": list(checkpoint.remaining),
+        "folders": list(checkpoint.folders),
+        "sort_order": checkpoint.sort_order,
+        "names_digest": checkpoint.names_digest,
+    }
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path: Path = DEFAULT_CHECKPOINT_PATH) -> Optional[Checkpoint]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return Checkpoint(
+            source=Path(data["source"]),
+            dir_mtime_ns=int(data["dir_mtime_ns"]),
+            remaining=tuple(data["remaining"]),
+            folders=tuple(data["folders"]),
+            sort_order=data.get("sort_order", "Name"),
+            names_digest=data.get("names_digest", ""),
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def clear_checkpoint(path: Path = DEFAULT_CHECKPOINT_PATH) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _names_digest(names) -> str:
+    joined = "\0".join(sorted(names)).encode("utf-8", "surrogateescape")
+    return hashlib.blake2b(joined, digest_size=16).hexdigest()
+
+
+def take_checkpoint(
+    router: FileRouter, remaining, folders, sort_order: str = "Name", dir_mtime_ns: Optional[int] = None,
+) -> Checkpoint:
+    """
+    `dir_mtime_ns`, if given, must have been read before `remaining` was
+    taken (the listing can then be read later, off the Tk thread).
+    """
+    # Folder state first: a change after this point makes the checkpoint
+    # look stale (a newer mtime or a different listing) rather than
+    # silently missing a file.
+    mtime_ns = os.stat(router.source_dir).st_mtime_ns if dir_mtime_ns is None else dir_mtime_ns
+    digest = _names_digest(os.listdir(router.source_dir))
+    return Checkpoint(
+        source=router.source_dir,
+        dir_mtime_ns=mtime_ns,
+        remaining=tuple(p.name for p in remaining),
+        folders=tuple(p.name for p in folders),
+        sort_order=sort_order,
+        names_digest=digest,
+    )
+
+
+def reconcile(checkpoint: Checkpoint, router: FileRouter) -> tuple[list[Path], list[Path]]:
+    """
+    (remaining media, target folders) for `router.source_dir`, from the
+    checkpoint instead of a scan, with one name-only listdir. If the
+    folder's mtime and listing are unchanged the lists are used as they
+    are; otherwise what is gone is dropped, and only names the checkpoint
+    doesn't know are type-checked (new media goes at the end, in name
+    order).
+    """
+    source = router.source_dir
+    mtime_ns = os.stat(source).st_mtime_ns
+    listing = os.listdir(source)
+    if mtime_ns == checkpoint.dir_mtime_ns and _names_digest(listing) == checkpoint.names_digest:
+        return [source / n for n in checkpoint.remaining], [source / n for n in checkpoint.folders]
+
+    names = set(listing)
+    known = set(checkpoint.remaining) | set(checkpoint.folders)
+
+    media = [source / n for n in checkpoint.remaining if n in names]
+    folders = [source / n for n in checkpoint.folders if n in names]
+
+    new_media: list[Path] = []
+    for name in sorted(names - known):
+        path = source / name
+        try:
+            if router.is_media_name(name) and path.is_file():
+                new_media.append(path)
+            elif router.is_target_name(name) and path.is_dir():
+                folders.append(path)
+        except OSError:
+            continue
+
+    return media + new_media, sorted(folders)
@@ -1,12 +1,177 @@
 ##cleanup
 
-from send2trash import send2trash
+import os
+import queue
+import threading
 from pathlib import Path
 
+from send2trash import send2trash
+
 PRIVATE_TRASH_NAME = "._trash-temp"
 
-def cleanup_private_trash(app):
+# Purge the oldest deleted files once the private trash grows past either
+# limit, down to TRASH_QUOTA_TARGET of it.
+TRASH_MAX_BYTES = 20 * 1024 ** 3
+TRASH_MAX_FILES = 2000
+TRASH_QUOTA_TARGET = 0.8
+
+
+class TrashPurger:
+    """
+    Sends files from the private trash to the system trash one at a time on
+    a background thread, with progress and cancellation. Each purged path is
+    reported back (poll() on the Tk thread) so its undo entry can be dropped;
+    undo already skips files that are gone, so a crash mid-purge leaves the
+    journal consistent either way.
+    """
+
+    def __init__(self) -> None:
+        self._events: queue.Queue = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = None
+        self.done = 0
+        self.total = 0
+
+    @property
+    def busy(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, paths, remove_dir=None) -> bool:
+        """
+        Purge `paths` (or what a function returns, called on the purge
+        thread), then `remove_dir` if it ended up empty. False if busy.
+        """
+        if self.busy:
+            return False
+        self._cancel.clear()
+        self.done = 0
+        self.total = 0
+        self._thread = threading.Thread(
+            target=self._run, args=(paths, remove_dir), name="trash-purge", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def poll(self) -> list:
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(self, paths, remove_dir) -> None:
+        paths = list(paths() if callable(paths) else paths)
+        self.total = len(paths)
+        for path in paths:
+            if self._cancel.is_set():
+                break
+            try:
+                send2trash(str(path))
+                self._events.put(("purged", Path(path)))
+            except OSError as e:
+                print("TRASH PURGE ERROR:", e)
+            self.done += 1
+            self._events.put(("progress", self.done, self.total))
+
+        cancelled = self._cancel.is_set()
+        if remove_dir is not None and not cancelled:
+            try:
+                os.rmdir(remove_dir)
+            except OSError:
+                pass  # not empty (a purge failed) or already gone
+        self._events.put(("finished", cancelled))
+
+
+def _trash_files(trash_dir):
+    """(path, size) for every file in the private trash."""
+    entries = []
+    if not trash_dir.is_dir():
+        return entries
+    with os.scandir(trash_dir) as it:
+        for entry in it:
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    entries.append((Path(entry.path), entry.stat().st_size))
+            except OSError:
+                continue
+    return entries
+
+
+def cleanup_private_trash(app, on_finished=None):
+    """
+    Empty the whole private trash in the background; if a purge is already
+    running (a quota purge, say), once it has finished.
+    """
+    _empty_trash(app, app.source_dir / PRIVATE_TRASH_NAME, on_finished)
+
+
+def _empty_trash(app, trash_dir, on_finished):
+    if not app.purger.busy:
+        _purge_all(app, trash_dir, on_finished)
+        return
+
+    running = app._purge_finished
+
+    def then(cancelled):
+        if running is not None:
+            running(cancelled)
+        # That may have started the purge queued before this one.
+        _empty_trash(app, trash_dir, on_finished)
+
+    app._purge_finished = then
+
+
+def _purge_all(app, trash_dir, on_finished):
+    files = [p for p, _ in _trash_files(trash_dir)]
+
+    if not files:
+        if trash_dir.exists():
+            try:
+                os.rmdir(trash_dir)
+            except OSError:
+                pass
+        if on_finished is not None:
+            on_finished(False)
+        return
+
+    app._purge_finished = on_finished
+    app.purger.start(files, remove_dir=trash_dir)
+
+
+def enforce_trash_quota(app):
+    """
+    If the private trash is over quota, purge the files deleted longest ago
+    (files no undo entry refers to go first) until it is back under. The
+    trash is listed on the purge thread, not the Tk thread.
+    """
+    if app.purger.busy:
+        return
+
     trash_dir = app.source_dir / PRIVATE_TRASH_NAME
+    undo_order = list(app.undo.trashed_paths())
+    app._purge_finished = None
+    app.purger.start(lambda: _over_quota(trash_dir, undo_order))
+
+
+def _over_quota(trash_dir, undo_order):
+    """The files to purge from `trash_dir` to bring it under quota, oldest first."""
+    files = dict(_trash_files(trash_dir))
+    total_bytes = sum(files.values())
+    if total_bytes <= TRASH_MAX_BYTES and len(files) <= TRASH_MAX_FILES:
+        return []
+
+    undo_order = [p for p in undo_order if p in files]
+    referenced = set(undo_order)
+    orphans = [p for p in files if p not in referenced]
 
-    if trash_dir.exists() and any(trash_dir.iterdir()):
-        send2trash(str(trash_dir))
\ No newline at end of file
+    victims = []
+    for path in orphans + undo_order:
+        if total_bytes <= TRASH_MAX_BYTES * TRASH_QUOTA_TARGET and len(files) - len(victims) <= TRASH_MAX_FILES * TRASH_QUOTA_TARGET:
+            break
+        victims.append(path)
+        total_bytes -= files[path]
+    return victims
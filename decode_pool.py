@@ -0,0 +1,156 @@
+# decode_pool.py
+"""
+Decoding in worker processes, so read-ahead and thumbnailing use every
+core instead of taking turns on the GIL.
+
+A worker decodes and downscales with media_loader.decode_preview, writes
+the pixels (RGBX, 4 bytes each) into a fresh shared-memory segment and
+returns just its name and size. The app maps the segment and wraps it
+with Image.frombuffer, which for RGBX is a view, not a copy; the segment
+is unlinked at once and unmapped once the image is garbage.
+"""
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+import media_loader
+from process_pool import process_pool
+from thumb_cache import ThumbnailStore
+
+# On Windows a segment is freed once no handle is left, so workers hold
+# their newest ones open this long (in segments) for the app to attach
+# first. Elsewhere it lives until unlinked and is closed straight away.
+_KEEP_OPEN = 32
+
+_store: Optional[ThumbnailStore] = None
+_open_segments: deque = deque()
+
+
+def _init_worker(store_root) -> None:
+    global _store
+    # The app's store does the size accounting and eviction for everyone.
+    _store = ThumbnailStore(store_root, evict=False) if store_root is not None else None
+
+
+def _decode_to_shared(path: str, size: tuple[int, int], mode: Optional[str]) -> tuple[str, tuple[int, int], list]:
+    img = media_loader.decode_preview(Path(path), size, mode, _store)
+    if img.mode != "RGBX":
+        img = img.convert("RGBX")
+    data = img.tobytes()
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    shm.buf[:len(data)] = data
+    if os.name == "nt":
+        _open_segments.append(shm)
+        while len(_open_segments) > _KEEP_OPEN:
+            _open_segments.popleft().close()
+    else:
+        shm.close()
+    return shm.name, img.size, _store.take_used() if _store is not None else []
+
+
+class _Segment(shared_memory.SharedMemory):
+    def __del__(self) -> None:
+        # At exit an image may still be viewing it; the OS unmaps it anyway.
+        with contextlib.suppress(BufferError):
+            self.close()
+
+
+def _attach(name: str, size: tuple[int, int]) -> tuple[Image.Image, shared_memory.SharedMemory]:
+    shm = _Segment(name=name)
+    try:
+        img = Image.frombuffer("RGBX", size, shm.buf, "raw", "RGBX", 0, 1)
+    except BaseException:
+        shm.close()
+        raise
+    finally:
+        shm.unlink()
+    return img, shm
+
+
+class DecodeService:
+    """
+    A process pool for decodes. submit() returns a Future of a PIL image;
+    decode() waits for it. cancel_pending() drops queued work (on a folder
+    change); shutdown() stops the workers.
+    """
+
+    def __init__(self, workers: Optional[int] = None, store: Optional[ThumbnailStore] = None) -> None:
+        if os.name == "posix":
+            # Workers must report their segments to the app's tracker (which
+            # forgets them on unlink), not start trackers of their own.
+            resource_tracker.ensure_running()
+        self._pool = process_pool(
+            workers,
+            initializer=_init_worker,
+            initargs=(store.root if store is not None else None,),
+        )
+        self._store = store
+        self._pending: set[Future] = set()
+        # (image, its segment): the image reads straight from the mapping,
+        # which can only be closed once the image is gone. Copies and
+        # resizes get memory of their own.
+        self._mapped: list[tuple[weakref.ref, shared_memory.SharedMemory]] = []
+        self._lock = threading.Lock()
+
+    def submit(self, path: Path, size: tuple[int, int], mode: Optional[str] = None) -> Future:
+        self._unmap_released()
+        result: Future = Future()
+        work = self._pool.submit(_decode_to_shared, str(path), tuple(size), mode)
+        with self._lock:
+            self._pending.add(work)
+
+        def finished(work: Future) -> None:
+            with self._lock:
+                self._pending.discard(work)
+            if work.cancelled():
+                result.cancel()
+                return
+            try:
+                name, size, used = work.result()
+                # Attach even if nobody is waiting any more: that unlinks it.
+                img, shm = _attach(name, size)
+            except BaseException as e:
+                with contextlib.suppress(InvalidStateError):
+                    result.set_exception(e)
+                return
+            with self._lock:
+                self._mapped.append((weakref.ref(img), shm))
+            if used and self._store is not None:
+                self._store.record(used)
+            with contextlib.suppress(InvalidStateError):
+                result.set_result(img)
+
+        result.add_done_callback(lambda r: r.cancelled() and work.cancel())
+        work.add_done_callback(finished)
+        return result
+
+    def decode(self, path: Path, size: tuple[int, int], mode: Optional[str] = None) -> Image.Image:
+        return self.submit(path, size, mode).result()
+
+    def cancel_pending(self) -> None:
+        """Drop work that hasn't started; decodes already running finish."""
+        with self._lock:
+            pending = list(self._pending)
+        for work in pending:
+            work.cancel()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._unmap_released()
+
+    def _unmap_released(self) -> None:
+        with self._lock:
+            released = [shm for ref, shm in self._mapped if ref() is None]
+            self._mapped = [(ref, shm) for ref, shm in self._mapped if ref() is not None]
+        for shm in released:
+            shm.close()
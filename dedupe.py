@@ -0,0 +1,174 @@
+# dedupe.py
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+from app_cache import CACHE_DIR, open_cache_db
+from file_routing import FileRouter
+
+DEFAULT_HASH_DB = CACHE_DIR / "hashes.sqlite3"
+EDGE_BLOCK_SIZE = 64 * 1024
+FULL_HASH_CHUNK = 4 * 1024 * 1024
+
+
+def _edge_hash(path: Path, size: int) -> str:
+    """Hash of the first and last blocks; cheap and usually decisive."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(EDGE_BLOCK_SIZE))
+        if size > EDGE_BLOCK_SIZE:
+            f.seek(max(size - EDGE_BLOCK_SIZE, EDGE_BLOCK_SIZE))
+            h.update(f.read(EDGE_BLOCK_SIZE))
+    return h.hexdigest()
+
+
+def _full_hash(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(FULL_HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class HashStore:
+    """SQLite-backed hash cache, keyed by path and invalidated by size/mtime."""
+
+    def __init__(self, db_path: Path = DEFAULT_HASH_DB) -> None:
+        self._db = open_cache_db(db_path)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS hashes ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,"
+                " edge TEXT, full TEXT)"
+            )
+
+    def lookup(self, path: Path, st: os.stat_result) -> tuple[Optional[str], Optional[str]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime_ns, edge, full FROM hashes WHERE path = ?", (str(path),)
+            ).fetchone()
+        if row is None or row[0] != st.st_size or row[1] != st.st_mtime_ns:
+            return None, None
+        return row[2], row[3]
+
+    def save(self, path: Path, st: os.stat_result, edge: Optional[str], full: Optional[str]) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                (str(path), st.st_size, st.st_mtime_ns, edge, full),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class _Entry:
+    __slots__ = ("path", "st", "edge", "full", "in_source")
+
+    def __init__(self, path: Path, st: os.stat_result, in_source: bool) -> None:
+        self.path = path
+        self.st = st
+        self.in_source = in_source
+        self.edge: Optional[str] = None
+        self.full: Optional[str] = None
+
+
+def find_sorted_duplicates(
+    router: FileRouter,
+    target_folders: Iterable[Path],
+    store: Optional[HashStore] = None,
+    workers: int = 4,
+) -> dict[Path, list[Path]]:
+    """
+    Map each media file in the source folder to the files in `target_folders`
+    with byte-identical content.
+
+    Files are grouped by size first; only same-size groups are hashed on
+    their first/last blocks, and only groups that still collide get a full
+    content hash. Hashes are cached in `store` so rescans are cheap.
+    """
+    entries: list[_Entry] = []
+    sources = [(p, True) for p in router.list_media()]
+    for folder in target_folders:
+        sources += [(p, False) for p in FileRouter(folder, router.supported_exts).list_media()]
+    for path, in_source in sources:
+        try:
+            entries.append(_Entry(path, os.stat(path), in_source))
+        except OSError:
+            continue
+
+    def interesting(groups):
+        return [
+            group for group in groups.values()
+            if len(group) > 1 and any(e.in_source for e in group) and not all(e.in_source for e in group)
+        ]
+
+    by_size: dict[int, list[_Entry]] = defaultdict(list)
+    for e in entries:
+        by_size[e.st.st_size].append(e)
+    candidates = [e for group in interesting(by_size) for e in group]
+
+    if store is not None:
+        for e in candidates:
+            e.edge, e.full = store.lookup(e.path, e.st)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dedupe") as pool:
+        def edge(e: _Entry) -> None:
+            if e.edge is None:
+                e.edge = _edge_hash(e.path, e.st.st_size)
+
+        def full(e: _Entry) -> None:
+            if e.full is None:
+                e.full = _full_hash(e.path)
+
+        list(pool.map(_safe(edge), candidates))
+
+        by_edge: dict[tuple, list[_Entry]] = defaultdict(list)
+        for e in candidates:
+            if e.edge is not None:
+                by_edge[(e.st.st_size, e.edge)].append(e)
+        finalists = [e for group in interesting(by_edge) for e in group]
+
+        # Files that fit in the edge blocks were hashed whole already.
+        for e in finalists:
+            if e.full is None and e.st.st_size <= 2 * EDGE_BLOCK_SIZE:
+                e.full = e.edge
+        list(pool.map(_safe(full), finalists))
+
+    if store is not None:
+        for e in candidates:
+            store.save(e.path, e.st, e.edge, e.full)
+
+    by_full: dict[tuple, list[_Entry]] = defaultdict(list)
+    for e in finalists:
+        if e.full is not None:
+            by_full[(e.st.st_size, e.full)].append(e)
+
+    result: dict[Path, list[Path]] = {}
+    for group in interesting(by_full):
+        copies = sorted(e.path for e in group if not e.in_source)
+        for e in group:
+            if e.in_source:
+                result[e.path] = copies
+    return result
+
+
+def _safe(fn):
+    """Unreadable files simply drop out of the comparison."""
+    def run(e):
+        try:
+            fn(e)
+        except OSError:
+            pass
+    return run
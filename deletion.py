@@ -1,15 +1,11 @@
 ##deletion
 
 from tkinter import messagebox
-import shutil
+from bursts import sharpest
+import dialogs
 import media_loader
-
-PRIVATE_TRASH_NAME = "._trash-temp"
-
-def ensure_private_trash(app):
-    trash_dir = app.source_dir / PRIVATE_TRASH_NAME
-    trash_dir.mkdir(exist_ok=True)
-    return trash_dir
+import tracing
+from undo import UndoAction
 
 
 def delete_current_image(app):
@@ -33,18 +29,82 @@ def delete_current_image(app):
     if not confirm:
         return
 
-    trash_dir = ensure_private_trash(app)
-    destination = trash_dir / app.current_image_path.name
+    # Timed from the confirmation on; the dialog itself is user think-time.
+    with tracing.span("action.delete", app.current_image_path):
+        # The router knows about names reserved by queued moves, so collisions
+        # are resolved correctly even while earlier deletes are still in flight.
+        plan = app.router.plan_trash(app.current_image_path)
+        app.file_ops.submit(plan, kind="delete")
+
+        app.undo.push_delete(moved_to=plan.dst, restore_to=plan.src)
+        app.prefetcher.invalidate(app.current_image_path)
+
+        app.index += 1
+        app.load_image()
+
+
+def trash_sorted_duplicates(app):
+    """Send every upcoming file that already exists in a target folder to the trash."""
+    media_loader.stop_video(app)
+
+    upcoming = app.images[app.index:]
+    dupes = [p for p in upcoming if p in app.duplicates]
+    if not dupes:
+        dialogs.show_no_duplicates_info()
+        return
+
+    confirm = dialogs.confirm_trash_duplicates(len(dupes))
+    app.root.focus_force()
+    if not confirm:
+        return
+
+    actions = []
+    for path in dupes:
+        plan = app.router.plan_trash(path)
+        app.file_ops.submit(plan, kind="delete")
+        actions.append(UndoAction(type="delete", src=plan.dst, dst=plan.src))
+        app.prefetcher.invalidate(path)
+    app.undo.push_batch(actions)
 
-    # Handle name collisions
-    counter = 1
-    while destination.exists():
-        destination = trash_dir / f"{destination.stem}_{counter}{destination.suffix}"
-        counter += 1
+    # Trashed items go just before the current position, in the same order
+    # as the batch, so its undo steps back onto the files it restores.
+    dupe_set = set(dupes)
+    rest = [p for p in upcoming if p not in dupe_set]
+    app.images[app.index:] = dupes + rest
+    app.index += len(dupes)
+    app.load_image()
+
+
+def keep_sharpest_of_burst(app):
+    """Trash the current item's burst (what's left of it) except its sharpest frame."""
+    media_loader.stop_video(app)
 
-    shutil.move(app.current_image_path, destination)
+    frames = app.pending_burst()
+    if len(frames) < 2:
+        dialogs.show_no_burst_info()
+        return
+
+    keep = sharpest(frames, app.signatures)
+    rejects = [p for p in frames if p != keep]
+    confirm = dialogs.confirm_trash_burst(len(rejects), keep.name)
+    app.root.focus_force()
+    if not confirm:
+        return
 
-    app.undo.push_delete(moved_to=destination, restore_to=app.current_image_path)
+    with tracing.span("action.burst"):
+        # One undo entry for the whole burst.
+        actions = []
+        for path in rejects:
+            plan = app.router.plan_trash(path)
+            app.file_ops.submit(plan, kind="delete")
+            actions.append(UndoAction(type="delete", src=plan.dst, dst=plan.src))
+            app.prefetcher.invalidate(path)
+        app.undo.push_batch(actions)
 
-    app.index += 1
-    app.load_image()
\ No newline at end of file
+        # As with duplicates, trashed frames go just before the current
+        # position; the keeper comes up next, ready to be sorted.
+        reject_set = set(rejects)
+        rest = [p for p in app.images[app.index:] if p not in reject_set and p != keep]
+        app.images[app.index:] = rejects + [keep] + rest
+        app.index += len(rejects)
+        app.load_image()
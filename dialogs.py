@@ -47,4 +47,50 @@ def confirm_delete(filename: str) -> bool:
     return messagebox.askyesno(
         "Delete Photo",
         f"Move '{filename}' to Trash?"
-    )
\ No newline at end of file
+    )
+
+
+def show_undo_failed_error(count: int, msg: str) -> None:
+    messagebox.showerror(
+        "Undo",
+        f"{count} file(s) could not be moved back and can still be undone later:\n{msg}"
+    )
+
+
+def show_no_duplicates_info() -> None:
+    messagebox.showinfo("Duplicates", "No exact duplicates of sorted files found.")
+
+
+def confirm_trash_duplicates(count: int) -> bool:
+    return messagebox.askyesno(
+        "Trash Duplicates",
+        f"Move {count} file(s) that are already sorted (exact copies) to Trash?"
+    )
+
+
+def show_no_burst_info() -> None:
+    messagebox.showinfo("Burst", "This item isn't part of a burst.")
+
+
+def confirm_trash_burst(count: int, keep: str) -> bool:
+    return messagebox.askyesno(
+        "Keep Sharpest",
+        f"Keep '{keep}' and move the other {count} frame(s) of this burst to Trash?"
+    )
+
+
+def confirm_resume_session(folder: Path) -> bool:
+    return messagebox.askyesno(
+        "Resume",
+        f"Your last session in '{folder.name}' was not finished.\n\nResume it (with undo history)?"
+    )
+
+
+def ask_undo_count(root) -> Optional[int]:
+    return simpledialog.askinteger("Undo", "Undo how many actions?", parent=root, minvalue=1)
+
+
+def ask_selection_count(root) -> Optional[int]:
+    return simpledialog.askinteger(
+        "Select", "Select how many items (starting with this one)?", parent=root, minvalue=1
+    )
@@ -0,0 +1,132 @@
+# file_ops.py
+from __future__ import annotations
+
+import queue
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+import tracing
+from file_routing import MoveResult, transfer
+
+
+@dataclass(eq=False)
+class PendingOp:
+    plan: MoveResult
+    kind: str = "move"              # "move" | "delete"
+    done_bytes: int = 0
+    total_bytes: int = 0
+    started: bool = False
+    _finished: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._finished.wait(timeout)
+
+
+@dataclass(frozen=True)
+class OpEvent:
+    op: PendingOp
+    status: str                     # "progress" | "done" | "failed"
+    error: Optional[BaseException] = None
+
+
+class FileOpQueue:
+    """
+    Runs planned moves one at a time on a background thread, so sorting onto
+    a slow or cross-device target never blocks the Tk thread. `release` is
+    called with the destination of any move that fails or is cancelled.
+
+    Operations run strictly in submission order. Results are posted to an
+    event queue which the Tk side drains with poll() (Tk is not thread safe).
+    """
+
+    def __init__(self, release: Callable[[Path], None] = lambda dst: None) -> None:
+        self._release = release
+        self._jobs: queue.Queue = queue.Queue()
+        self._events: queue.Queue = queue.Queue()
+        self._pending: list[PendingOp] = []
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._thread = threading.Thread(target=self._worker, name="file-ops", daemon=True)
+        self._thread.start()
+
+    def submit(self, plan: MoveResult, kind: str = "move") -> PendingOp:
+        op = PendingOp(plan=plan, kind=kind)
+        with self._lock:
+            self._pending.append(op)
+        self._jobs.put(op)
+        return op
+
+    def find(self, dst: Path) -> Optional[PendingOp]:
+        """The unfinished operation that will produce `dst`, if any."""
+        dst = Path(dst)
+        with self._lock:
+            for op in self._pending:
+                if op.plan.dst == dst:
+                    return op
+        return None
+
+    def cancel(self, op: PendingOp) -> bool:
+        """
+        Withdraw an operation that has not started yet.
+        Returns False if it is already running or finished.
+        """
+        with self._lock:
+            if op not in self._pending or op.started:
+                return False
+            self._pending.remove(op)
+            op._finished.set()
+            self._idle.notify_all()
+        self._release(op.plan.dst)
+        return True
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            return bool(self._pending)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def poll(self) -> list[OpEvent]:
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def shutdown(self, wait: bool = True) -> None:
+        if wait:
+            self.wait_idle()
+        self._jobs.put(None)
+
+    def _worker(self) -> None:
+        while True:
+            op = self._jobs.get()
+            if op is None:
+                return
+
+            with self._lock:
+                if op not in self._pending:
+                    continue  # cancelled
+                op.started = True
+
+            def progress(done, total, op=op):
+                op.done_bytes, op.total_bytes = done, total
+                self._events.put(OpEvent(op, "progress"))
+
+            try:
+                with tracing.span(f"file_ops.{op.kind}", op.plan.dst):
+                    transfer(op.plan.src, op.plan.dst, progress)
+                event = OpEvent(op, "done")
+            except Exception as e:
+                self._release(op.plan.dst)
+                event = OpEvent(op, "failed", e)
+
+            with self._lock:
+                self._pending.remove(op)
+                op._finished.set()
+                self._idle.notify_all()
+            self._events.put(event)
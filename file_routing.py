@@ -1,58 +1,247 @@
 # file_router.py
 from __future__ import annotations
 
+import errno
+import filecmp
+import os
+import re
 import shutil
+import sys
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import Callable, Iterable, Iterator, Optional
+
+import media_types
 
-SUPPORTED_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".mp4")
 PRIVATE_TRASH_NAME = "._trash-temp"
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+# Same-size files up to this big are compared byte for byte when a name
+# collides; bigger ones only through hashes already in the HashStore.
+INLINE_COMPARE_BYTES = 1024 * 1024
+
+ProgressCallback = Callable[[int, int], None]
+
+
+# "name (12)" -> ("name", "12")
+_COPY_SUFFIX = re.compile(r"^(.*) \((\d+)\)$")
 
 
 @dataclass(frozen=True)
 class MoveResult:
     src: Path
     dst: Path
+    # Set when src was an identical copy of this file and is being dropped
+    # (sent to the private trash) instead of moved.
+    duplicate_of: Optional[Path] = None
+
+
+class FolderNames:
+    """
+    In-memory index of the names in one folder, so a free destination name
+    can be found without probing the filesystem. Names are compared the
+    way the folder's filesystem does (case-insensitively on most macOS and
+    Windows volumes, probed once per folder), and for every 'base.ext'
+    family the highest 'base (n).ext' seen is remembered so the next free
+    copy number is O(1) however many copies already exist.
+    """
+
+    def __init__(self, folder: Path) -> None:
+        self._names: dict[str, str] = {}    # folded -> name as on disk
+        self._highest: dict[tuple[str, str], int] = {}
+        with os.scandir(folder) as entries:
+            listing = [entry.name for entry in entries]
+        self._fold = str.casefold if _case_insensitive(Path(folder), listing) else str
+        for name in listing:
+            self.add(name)
+
+    def __contains__(self, name: str) -> bool:
+        return self._fold(name) in self._names
+
+    def existing(self, name: str) -> Optional[str]:
+        """The name on disk that `name` collides with, if any."""
+        return self._names.get(self._fold(name))
+
+    def add(self, name: str) -> None:
+        self._names[self._fold(name)] = name
+        base, n, ext = _split_copy_name(name)
+        key = (self._fold(base), self._fold(ext))
+        if n > self._highest.get(key, 0):
+            self._highest[key] = n
+
+    def discard(self, name: str) -> None:
+        self._names.pop(self._fold(name), None)
+
+    def next_free(self, filename: str) -> str:
+        if filename not in self:
+            return filename
+
+        base, _, ext = _split_copy_name(filename)
+        n = max(self._highest.get((self._fold(base), self._fold(ext)), 1), 1) + 1
+        while f"{base} ({n}){ext}" in self:
+            n += 1
+        return f"{base} ({n}){ext}"
+
+
+def _case_insensitive(folder: Path, listing: list[str]) -> bool:
+    """
+    Whether `folder`'s filesystem ignores case: look up one of its entries
+    (or the folder itself, if it has none) with the case swapped.
+    """
+    names = set(listing)
+    for name in listing:
+        swapped = name.swapcase()
+        if swapped != name:
+            # Both spellings listed: case clearly matters here.
+            return swapped not in names and os.path.lexists(folder / swapped)
+
+    swapped = folder.name.swapcase()
+    if swapped != folder.name:
+        try:
+            return os.path.samefile(folder, folder.parent / swapped)
+        except OSError:
+            return False
+    return sys.platform in ("darwin", "win32")
+
+
+def _split_copy_name(name: str) -> tuple[str, int, str]:
+    stem, ext = os.path.splitext(name)
+    m = _COPY_SUFFIX.match(stem)
+    if m:
+        return m.group(1), int(m.group(2)), ext
+    return stem, 1, ext
+
+
+@dataclass(frozen=True)
+class ScanBatch:
+    media: list[Path]
+    folders: list[Path]
 
 
 class FileRouter:
     def __init__(
         self,
         source_dir: Path,
-        supported_exts: Iterable[str] = SUPPORTED_EXTENSIONS,
+        supported_exts: Optional[Iterable[str]] = None,
         private_trash_name: str = PRIVATE_TRASH_NAME,
+        hash_store=None,
     ):
         self.source_dir = Path(source_dir)
+        # dedupe.HashStore, if any: hashes from the duplicate scan let
+        # drop_identical recognise big identical files without reading them.
+        self.hash_store = hash_store
+        # Everything in the media type registry unless narrowed down.
+        if supported_exts is None:
+            supported_exts = media_types.supported_extensions()
         self.supported_exts = tuple(e.lower() for e in supported_exts)
         self.private_trash_name = private_trash_name
+        # Per-target-folder name indexes. Planned destinations are added as
+        # soon as they are picked, so queued background moves can't collide.
+        self._folders: dict[Path, FolderNames] = {}
+        self._names_lock = threading.Lock()
 
     def list_media(self) -> list[Path]:
-        return sorted(
-            [
-                p for p in self.source_dir.iterdir()
-                if p.is_file() and p.suffix.lower() in self.supported_exts
-            ]
-        )
+        return self.list_all()[0]
 
     def list_target_folders(self) -> list[Path]:
-        return sorted(
-            [
-                p for p in self.source_dir.iterdir()
-                if p.is_dir() and p.name != self.private_trash_name
-            ]
-        )
+        return self.list_all()[1]
+
+    def list_all(self) -> tuple[list[Path], list[Path]]:
+        """(media, target folders) from a single directory pass, both sorted."""
+        media: list[Path] = []
+        folders: list[Path] = []
+        for batch in self.scan():
+            media.extend(batch.media)
+            folders.extend(batch.folders)
+        return sorted(media), sorted(folders)
+
+    def scan(self, batch_size: int = 512) -> Iterator[ScanBatch]:
+        """
+        Walk the source folder once with os.scandir, yielding media files and
+        target folders in sorted batches as they are found. The first batch
+        is yielded as soon as the first media file turns up, so the UI can
+        show something before a huge (or networked) folder is fully listed.
+
+        Type checks use the DirEntry's cached d_type, so files with an
+        unsupported extension never cost a stat.
+        """
+        media: list[Path] = []
+        folders: list[Path] = []
+        first = True
+
+        with os.scandir(self.source_dir) as entries:
+            for entry in entries:
+                try:
+                    if self.is_media_name(entry.name) and entry.is_file():
+                        media.append(Path(entry.path))
+                    elif entry.is_dir() and self.is_target_name(entry.name):
+                        folders.append(Path(entry.path))
+                    else:
+                        continue
+                except OSError:
+                    continue
+
+                if (first and media) or len(media) + len(folders) >= batch_size:
+                    first = False
+                    yield ScanBatch(sorted(media), sorted(folders))
+                    media, folders = [], []
+
+        if media or folders:
+            yield ScanBatch(sorted(media), sorted(folders))
+
+    def is_media_name(self, name: str) -> bool:
+        return os.path.splitext(name)[1].lower() in self.supported_exts
+
+    def is_target_name(self, name: str) -> bool:
+        return name != self.private_trash_name
 
     def ensure_private_trash(self) -> Path:
         trash = self.source_dir / self.private_trash_name
         trash.mkdir(exist_ok=True)
         return trash
 
-    def move(self, src: Path, target_folder: Path, *, on_collision: str = "error") -> MoveResult:
+    def move(
+        self,
+        src: Path,
+        target_folder: Path,
+        *,
+        on_collision: str = "error",
+        drop_identical: bool = False,
+    ) -> MoveResult:
         """
         on_collision:
           - "error": raise FileExistsError
           - "rename": auto-rename to 'name (2).ext', etc.
+
+        drop_identical: if the name is taken by a byte-identical file, send
+        src to the private trash instead (see MoveResult.duplicate_of).
+        """
+        plan = self.plan_move(src, target_folder, on_collision=on_collision, drop_identical=drop_identical)
+        try:
+            transfer(plan.src, plan.dst)
+        except BaseException:
+            self.release(plan.dst)
+            raise
+        return plan
+
+    def plan_move(
+        self,
+        src: Path,
+        target_folder: Path,
+        *,
+        on_collision: str = "error",
+        drop_identical: bool = False,
+    ) -> MoveResult:
+        """
+        Pick the destination for a move and reserve it, without touching the
+        file. Pair with transfer(), and release() if the move doesn't happen.
+        Options as for move().
+
+        drop_identical never reads a big file here (this runs on the Tk
+        thread): same-size files over INLINE_COMPARE_BYTES are only known to
+        be identical once the duplicate scan has hashed both into
+        `hash_store`. Until then such a name clash counts as a plain
+        collision and on_collision decides.
         """
         src = Path(src)
         target_folder = Path(target_folder)
@@ -60,30 +249,167 @@ class FileRouter:
         if not target_folder.exists() or not target_folder.is_dir():
             raise NotADirectoryError(f"Target folder does not exist: {target_folder}")
 
-        dst = target_folder / src.name
+        # Compare contents outside the lock (it can touch the disk).
+        identical_to = None
+        if drop_identical:
+            with self._names_lock:
+                taken = self._names_for(target_folder).existing(src.name)
+            if taken is not None and _same_content(src, target_folder / taken, self.hash_store):
+                identical_to = taken
+
+        with self._names_lock:
+            names = self._names_for(target_folder)
 
-        if dst.exists():
-            if on_collision == "error":
-                raise FileExistsError(f"File already exists: {dst}")
-            if on_collision == "rename":
-                dst = self._unique_destination(target_folder, src.name)
-            else:
-                raise ValueError(f"Unknown on_collision mode: {on_collision}")
+            taken = names.existing(src.name)
+            if taken is not None:
+                existing = target_folder / taken
+                if taken == identical_to:
+                    trash = self.ensure_private_trash()
+                    if target_folder != trash:
+                        dst = trash / self._names_for(trash).next_free(src.name)
+                        self._names_for(trash).add(dst.name)
+                        return MoveResult(src=src, dst=dst, duplicate_of=existing)
 
-        shutil.move(str(src), str(dst))
+                if on_collision == "error":
+                    raise FileExistsError(f"File already exists: {existing}")
+                if on_collision != "rename":
+                    raise ValueError(f"Unknown on_collision mode: {on_collision}")
+
+            dst = target_folder / names.next_free(src.name)
+            names.add(dst.name)
         return MoveResult(src=src, dst=dst)
 
+    def plan_batch(
+        self,
+        srcs: Iterable[Path],
+        target_folder: Path,
+        *,
+        on_collision: str = "error",
+        drop_identical: bool = False,
+    ) -> list[MoveResult]:
+        """
+        plan_move() for several files into one folder, all or nothing: if any
+        of them can't be planned, none of the names stay reserved.
+        """
+        plans: list[MoveResult] = []
+        try:
+            for src in srcs:
+                plans.append(self.plan_move(
+                    src, target_folder, on_collision=on_collision, drop_identical=drop_identical
+                ))
+        except BaseException:
+            for plan in plans:
+                self.release(plan.dst)
+            raise
+        return plans
+
+    def release(self, dst: Path) -> None:
+        """
+        A planned move did not happen (failed or cancelled): free its name,
+        unless something else really is there now.
+        """
+        dst = Path(dst)
+        with self._names_lock:
+            names = self._folders.get(dst.parent)
+            if names is not None and not os.path.lexists(dst):
+                names.discard(dst.name)
+
+    def forget(self, path: Path) -> None:
+        """A file left a target folder by other means (e.g. undo)."""
+        path = Path(path)
+        with self._names_lock:
+            names = self._folders.get(path.parent)
+            if names is not None:
+                names.discard(path.name)
+
     def move_to_trash(self, src: Path, *, on_collision: str = "rename") -> MoveResult:
         trash = self.ensure_private_trash()
         return self.move(src, trash, on_collision=on_collision)
 
+    def plan_trash(self, src: Path, *, on_collision: str = "rename") -> MoveResult:
+        trash = self.ensure_private_trash()
+        return self.plan_move(src, trash, on_collision=on_collision)
+
+    def _names_for(self, folder: Path) -> FolderNames:
+        names = self._folders.get(folder)
+        if names is None:
+            names = self._folders[folder] = FolderNames(folder)
+        return names
+
     def _unique_destination(self, folder: Path, filename: str) -> Path:
-        base = Path(filename).stem
-        ext = Path(filename).suffix
-        candidate = folder / filename
-        counter = 2
-        while candidate.exists():
-            candidate = folder / f"{base} ({counter}){ext}"
-            counter += 1
-        return candidate
+        with self._names_lock:
+            return folder / self._names_for(Path(folder)).next_free(filename)
+
+
+def _same_content(a: Path, b: Path, hash_store=None) -> bool:
+    """
+    Whether `a` and `b` are known to be identical, without reading big
+    files: different sizes never are; otherwise cached content hashes
+    decide, and only small files are compared byte for byte. Unknown
+    counts as different, i.e. as a plain name collision.
+    """
+    try:
+        sa, sb = os.stat(a), os.stat(b)
+    except OSError:
+        return False
+    if sa.st_size != sb.st_size:
+        return False
+
+    if hash_store is not None:
+        edge_a, full_a = hash_store.lookup(a, sa)
+        edge_b, full_b = hash_store.lookup(b, sb)
+        if full_a is not None and full_b is not None:
+            return full_a == full_b
+        if edge_a is not None and edge_b is not None and edge_a != edge_b:
+            return False
+
+    if sa.st_size > INLINE_COMPARE_BYTES:
+        return False
+    try:
+        return filecmp.cmp(a, b, shallow=False)
+    except OSError:
+        return False
+
+
+def transfer(src: Path, dst: Path, progress: Optional[ProgressCallback] = None) -> None:
+    """
+    Move one file. Same-device moves are a plain rename; cross-device moves
+    stream in chunks to a hidden '.part' file which is renamed into place
+    once complete, so a failed copy never leaves a truncated file behind.
+    """
+    src = Path(src)
+    dst = Path(dst)
+
+    # The router's name index can't see files added behind its back, and
+    # rename() silently replaces on POSIX, so check once before committing.
+    if os.path.lexists(dst):
+        raise FileExistsError(f"File already exists: {dst}")
+
+    try:
+        os.rename(src, dst)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    total = src.stat().st_size
+    part = dst.with_name(f".{dst.name}.part")
+    done = 0
+    try:
+        with open(src, "rb") as fin, open(part, "wb") as fout:
+            while True:
+                chunk = fin.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                fout.write(chunk)
+                done += len(chunk)
+                if progress is not None:
+                    progress(done, total)
+        shutil.copystat(src, part)
+        os.replace(part, dst)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+
+    os.unlink(src)
     
\ No newline at end of file
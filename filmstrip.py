@@ -0,0 +1,174 @@
+# filmstrip.py
+from __future__ import annotations
+
+import queue
+import threading
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+from PIL import ImageTk
+
+import media_loader
+
+FILMSTRIP_COUNT = 15
+FILMSTRIP_THUMB_SIZE = (96, 72)
+# The worker also renders this many items past the visible strip, so the
+# next few moves only ever hit memory.
+FILMSTRIP_LOOKAHEAD = 15
+# Thumbnails are rendered (in parallel, given a decode pool) and handed to
+# the Tk thread this many at a time.
+FILMSTRIP_BATCH = 8
+
+
+class Filmstrip:
+    """
+    A row of thumbnails for the items after the current one.
+
+    A single background thread works through what the strip shows (and a
+    little past it), in batches; show() only re-labels slots and swaps in
+    thumbnails that are already in memory, so it never waits on a decode.
+    Rendered thumbnails are kept by path, so moving, deleting or undoing
+    one item costs at most the one thumbnail that scrolled into view.
+    """
+
+    def __init__(
+        self,
+        parent,
+        store=None,
+        count: int = FILMSTRIP_COUNT,
+        size: tuple[int, int] = FILMSTRIP_THUMB_SIZE,
+        submit: Optional[Callable[[Path, tuple[int, int]], Optional[Future]]] = None,
+    ) -> None:
+        # submit(path, size) hands a render to a decode pool and returns its
+        # Future, or None to have the worker thread render it itself.
+        self.submit = submit
+        self.store = store
+        self.count = count
+        self.size = size
+
+        self.frame = tk.Frame(parent)
+        # Sizes empty slots in pixels; the file name is drawn over it until
+        # the thumbnail arrives.
+        self._blank = tk.PhotoImage(width=size[0], height=size[1])
+        self._slots = []
+        for _ in range(count):
+            slot = tk.Label(
+                self.frame, image=self._blank, bd=2, relief="flat",
+                font=("Helvetica", 8), wraplength=size[0], compound="center",
+            )
+            slot.pack(side="left", padx=1)
+            self._slots.append(slot)
+        self._shown: list[Optional[Path]] = [None] * count
+
+        # path -> PhotoImage (Tk thread only); bounded LRU
+        self._photos: OrderedDict[Path, ImageTk.PhotoImage] = OrderedDict()
+        self._max_photos = 3 * (count + FILMSTRIP_LOOKAHEAD)
+        self._failed: set[Path] = set()
+
+        self._wanted: list[Path] = []
+        self._posted: set[Path] = set()   # rendered or being rendered
+        self._cond = threading.Condition()
+        self._results: queue.Queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name="filmstrip", daemon=True)
+        self._thread.start()
+
+    def show(self, images: Sequence[Path], index: int) -> None:
+        upcoming = list(images[index + 1:index + 1 + self.count])
+        for i, slot in enumerate(self._slots):
+            path = upcoming[i] if i < len(upcoming) else None
+            if path == self._shown[i]:
+                continue
+            self._shown[i] = path
+            self._fill(slot, path)
+
+        ahead = images[index + 1:index + 1 + self.count + FILMSTRIP_LOOKAHEAD]
+        wanted = [p for p in ahead if p not in self._photos and p not in self._failed]
+        with self._cond:
+            self._wanted = wanted
+            self._cond.notify()
+
+    def highlight(self, n: int) -> None:
+        """Outline the first `n` slots (upcoming items included in the selection)."""
+        for i, slot in enumerate(self._slots):
+            slot.config(relief="solid" if i < n else "flat")
+
+    def poll(self) -> None:
+        """Move finished thumbnails onto the strip. Call on the Tk thread."""
+        while True:
+            try:
+                batch = self._results.get_nowait()
+            except queue.Empty:
+                return
+            for path, img in batch:
+                if img is None:
+                    self._failed.add(path)
+                    continue
+                self._photos[path] = ImageTk.PhotoImage(img)
+                while len(self._photos) > self._max_photos:
+                    evicted, _ = self._photos.popitem(last=False)
+                    with self._cond:
+                        self._posted.discard(evicted)
+                for i, shown in enumerate(self._shown):
+                    if shown == path:
+                        self._fill(self._slots[i], path)
+
+    def forget(self, *paths: Path) -> None:
+        """Drop thumbnails of files that changed or went away."""
+        for path in paths:
+            self._photos.pop(path, None)
+            self._failed.discard(path)
+        with self._cond:
+            self._posted.difference_update(paths)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._wanted = []
+            self._cond.notify()
+
+    def _fill(self, slot, path: Optional[Path]) -> None:
+        if path is None:
+            slot.config(image=self._blank, text="")
+            return
+        photo = self._photos.get(path)
+        if photo is not None:
+            self._photos.move_to_end(path)
+            slot.config(image=photo, text="")
+        else:
+            slot.config(image=self._blank, text=path.name)
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._wanted and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                todo = [p for p in self._wanted[:FILMSTRIP_BATCH] if p not in self._posted]
+                del self._wanted[:FILMSTRIP_BATCH]
+                self._posted.update(todo)
+
+            futures = {}
+            if self.submit is not None:
+                for path in todo:
+                    try:
+                        futures[path] = self.submit(path, self.size)
+                    except Exception:
+                        pass
+            batch = []
+            for path in todo:
+                try:
+                    future = futures.get(path)
+                    if future is not None:
+                        img = future.result()
+                    else:
+                        img = media_loader.decode_preview(path, self.size, "fast", self.store)
+                except Exception:
+                    img = None
+                batch.append((path, img))
+            if batch:
+                self._results.put(batch)
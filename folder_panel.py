@@ -0,0 +1,167 @@
+# folder_panel.py
+from __future__ import annotations
+
+import bisect
+import itertools
+import tkinter as tk
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+
+class FolderIndex:
+    """
+    Target folders plus a type-ahead search over their names.
+
+    Matches rank as: name prefix, then word prefix ('bea' -> 'Summer Beach'),
+    then fuzzy subsequence ('smbch' -> 'Summer Beach'); within each tier,
+    most recently used folders come first, then alphabetical. A query that
+    extends the previous one only rescans the previous matches.
+    """
+
+    def __init__(self) -> None:
+        self.folders: list[Path] = []
+        self._keys: dict[Path, str] = {}
+        self._recent: dict[Path, int] = {}
+        self._clock = itertools.count(1)
+        self._last_query: Optional[str] = None
+        self._last_hits: list[Path] = []
+
+    def set_folders(self, folders: Iterable[Path]) -> None:
+        self.folders = sorted(folders)
+        self._keys = {f: f.name.casefold() for f in self.folders}
+        self._last_query = None
+
+    def add(self, folder: Path) -> bool:
+        if folder in self._keys:
+            return False
+        bisect.insort(self.folders, folder)
+        self._keys[folder] = folder.name.casefold()
+        self._last_query = None
+        return True
+
+    def remove(self, folder: Path) -> bool:
+        if folder not in self._keys:
+            return False
+        self.folders.remove(folder)
+        del self._keys[folder]
+        self._recent.pop(folder, None)
+        self._last_query = None
+        return True
+
+    def touch(self, folder: Path) -> None:
+        """Mark `folder` as just used (ranks it first)."""
+        if folder in self._keys:
+            self._recent[folder] = next(self._clock)
+            self._last_query = None
+
+    def search(self, query: str) -> list[Path]:
+        query = query.strip().casefold()
+
+        if self._last_query is not None and query.startswith(self._last_query):
+            pool = self._last_hits
+        else:
+            pool = self.folders
+
+        scored = []
+        for folder in pool:
+            tier = _match_tier(self._keys[folder], query)
+            if tier is not None:
+                scored.append((tier, -self._recent.get(folder, 0), folder))
+        scored.sort()
+
+        hits = [folder for _, _, folder in scored]
+        self._last_query, self._last_hits = query, hits
+        return hits
+
+
+def _match_tier(name: str, query: str) -> Optional[int]:
+    if not query or name.startswith(query):
+        return 0
+    if any(word.startswith(query) for word in name.replace("_", " ").replace("-", " ").split()):
+        return 1
+    it = iter(name)
+    if all(ch in it for ch in query):
+        return 2
+    return None
+
+
+class VirtualFolderList:
+    """
+    Scrollable list of folder buttons that only ever creates widgets for
+    the rows that fit on screen; scrolling re-labels the same buttons.
+    """
+
+    def __init__(self, parent, on_pick: Callable[[Path], None], width: int = 25, height: int = 220) -> None:
+        self.on_pick = on_pick
+        self.width = width
+        self.items: list[Path] = []
+        self.top = 0
+
+        self.frame = tk.Frame(parent, height=height)
+        self.frame.pack_propagate(False)
+        self.rows_frame = tk.Frame(self.frame)
+        self.rows_frame.grid_propagate(False)
+        self.scrollbar = tk.Scrollbar(self.frame, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.rows_frame.pack(side="left", fill="both", expand=True)
+
+        self._buttons: list[tk.Button] = []
+        self._row_height = 0
+        self.rows_frame.bind("<Configure>", lambda e: self._resize(e.height))
+
+    def set_items(self, items: list[Path]) -> None:
+        self.items = items
+        self.top = 0
+        self._render()
+
+    def scroll_rows(self, delta: int) -> None:
+        self._set_top(self.top + delta)
+
+    def scroll_to(self, fraction: float) -> None:
+        self._set_top(round(fraction * len(self.items)))
+
+    def _set_top(self, top: int) -> None:
+        top = max(0, min(top, len(self.items) - len(self._buttons)))
+        if top != self.top:
+            self.top = top
+            self._render()
+
+    def _on_scrollbar(self, *args) -> None:
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (len(self._buttons) if args[2] == "pages" else 1)
+            self.scroll_rows(step)
+
+    def _resize(self, height: int) -> None:
+        if not self._row_height:
+            probe = self._make_button()
+            self._row_height = probe.winfo_reqheight() + 4
+            probe.destroy()
+
+        wanted = max(1, height // self._row_height)
+        while len(self._buttons) < wanted:
+            self._buttons.append(self._make_button())
+        while len(self._buttons) > wanted:
+            self._buttons.pop().destroy()
+        self._set_top(self.top)
+        self._render()
+
+    def _make_button(self) -> tk.Button:
+        return tk.Button(self.rows_frame, width=self.width)
+
+    def _render(self) -> None:
+        for i, btn in enumerate(self._buttons):
+            idx = self.top + i
+            if idx < len(self.items):
+                folder = self.items[idx]
+                btn.config(text=folder.name, command=lambda f=folder: self.on_pick(f))
+                btn.grid(row=i, column=0, pady=2)
+            else:
+                btn.grid_remove()
+
+        n = len(self.items)
+        if n:
+            self.scrollbar.set(self.top / n, min(1.0, (self.top + len(self._buttons)) / n))
+        else:
+            self.scrollbar.set(0.0, 1.0)
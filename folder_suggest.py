@@ -0,0 +1,202 @@
+# folder_suggest.py
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Iterable, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app_cache import CACHE_DIR, open_cache_db
+
+DEFAULT_SUGGEST_DB = CACHE_DIR / "suggestions.sqlite3"
+SUGGESTION_COUNT = 5
+# Each folder remembers this many of the items most recently sorted into it.
+SAMPLES_PER_FOLDER = 200
+
+HIST_BINS = (8, 3, 3)     # hue, saturation, value
+FEATURE_SIZE = math.prod(HIST_BINS)
+# How a sample's similarity to the item is made up: colour (0..1), plus
+# closeness in capture time (1 for the same moment, 1/e an hour apart),
+# plus a bonus for the same camera.
+TIME_WEIGHT = 0.5
+TIME_SCALE_S = 3600.0
+CAMERA_WEIGHT = 0.25
+
+
+def image_features(img: Image.Image) -> np.ndarray:
+    """
+    Colour signature of a decoded image: the square root of its normalised
+    HSV histogram, so the dot product of two is their Bhattacharyya
+    coefficient. Takes well under a millisecond; worker-thread safe.
+    """
+    small = np.asarray(img.resize((64, 48), Image.Resampling.NEAREST).convert("RGB"))
+    hsv = cv2.cvtColor(small, cv2.COLOR_RGB2HSV)
+    hist = cv2.calcHist([hsv], [0, 1, 2], None, list(HIST_BINS), [0, 180, 0, 256, 0, 256]).ravel()
+    return np.sqrt(hist / max(hist.sum(), 1.0)).astype(np.float32)
+
+
+class FolderSuggester:
+    """
+    What was sorted where, for guessing where the next item goes.
+
+    Every move adds a sample (colour signature, camera, capture time) to
+    its target folder, replacing the folder's oldest once it has
+    SAMPLES_PER_FOLDER. rank() scores each folder by its sample nearest to
+    the item. Samples of all folders share one set of arrays, so a ranking
+    is a handful of vector operations; they are kept in SQLite, so a new
+    session starts with what earlier ones learned.
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_SUGGEST_DB) -> None:
+        self._db = open_cache_db(db_path)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            # learn() runs on the Tk thread: commit without waiting on fsync.
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS samples ("
+                " path TEXT PRIMARY KEY, folder TEXT, vector BLOB, camera TEXT, taken REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS samples_folder ON samples (folder)")
+        self._reset()
+
+    def _reset(self, capacity: int = 256) -> None:
+        self._vectors = np.zeros((capacity, FEATURE_SIZE), np.float32)
+        self._times = np.full(capacity, np.nan)
+        self._cameras = np.full(capacity, -1, np.int32)
+        self._owners = np.full(capacity, -1, np.int32)     # folder id; -1 = free row
+        self._paths: list[Optional[str]] = [None] * capacity
+        self._used = 0
+        self._free: list[int] = []
+        self._row_of: dict[str, int] = {}
+        self._folders: list[Path] = []
+        self._folder_ids: dict[Path, int] = {}
+        self._rows_by_folder: dict[int, deque] = {}
+        self._camera_ids: dict[str, int] = {}
+
+    def load(self, folders: Iterable[Path]) -> int:
+        """Forget what's in memory and read the samples of `folders`. Returns how many."""
+        with self._lock:
+            self._reset()
+            count = 0
+            for folder in folders:
+                rows = self._db.execute(
+                    "SELECT path, vector, camera, taken FROM samples WHERE folder = ?"
+                    " ORDER BY rowid DESC LIMIT ?",
+                    (str(folder), SAMPLES_PER_FOLDER),
+                ).fetchall()
+                for path, blob, camera, taken in reversed(rows):
+                    vector = np.frombuffer(blob, np.float32) if blob else None
+                    self._add(path, Path(folder), vector, camera, taken)
+                    count += 1
+            return count
+
+    def learn(self, path: Path, folder: Path, vector: Optional[np.ndarray],
+              camera: Optional[str], taken: Optional[float]) -> None:
+        """Record that the item now at `path` was sorted into `folder`."""
+        path = str(path)
+        with self._lock, self._db:
+            for evicted in self._add(path, Path(folder), vector, camera, taken):
+                self._db.execute("DELETE FROM samples WHERE path = ?", (evicted,))
+            self._db.execute(
+                "INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?)",
+                (path, str(folder), vector.tobytes() if vector is not None else None, camera, taken),
+            )
+
+    def forget(self, path: Path) -> None:
+        """Drop the sample of the item sorted to `path` (its move was undone)."""
+        path = str(path)
+        with self._lock, self._db:
+            row = self._row_of.get(path)
+            if row is not None:
+                self._rows_by_folder[int(self._owners[row])].remove(row)
+                self._remove_row(row)
+            self._db.execute("DELETE FROM samples WHERE path = ?", (path,))
+
+    def rank(self, vector: Optional[np.ndarray], camera: Optional[str], taken: Optional[float],
+             count: int = SUGGESTION_COUNT) -> list[Path]:
+        """The `count` folders with the most similar samples, best first."""
+        with self._lock:
+            n = self._used
+            owners = self._owners[:n]
+            live = owners >= 0
+            if not live.any():
+                return []
+
+            score = np.zeros(n)
+            if vector is not None:
+                score += self._vectors[:n] @ vector
+            if taken is not None:
+                closeness = np.exp(-np.abs(self._times[:n] - taken) / TIME_SCALE_S)
+                score += TIME_WEIGHT * np.nan_to_num(closeness, nan=0.0)
+            camera_id = self._camera_ids.get(camera, -2) if camera else -2
+            score += CAMERA_WEIGHT * (self._cameras[:n] == camera_id)
+
+            best = np.full(len(self._folders), -np.inf)
+            np.maximum.at(best, owners[live], score[live])
+            order = np.argsort(-best, kind="stable")[:count]
+            return [self._folders[i] for i in order if np.isfinite(best[i])]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _add(self, path: str, folder: Path, vector, camera, taken) -> list[str]:
+        """Put a sample in the arrays; returns the paths of samples it pushed out."""
+        evicted = []
+        old = self._row_of.get(path)
+        if old is not None:
+            self._rows_by_folder[int(self._owners[old])].remove(old)
+            self._remove_row(old)
+
+        folder_id = self._folder_ids.get(folder)
+        if folder_id is None:
+            folder_id = self._folder_ids[folder] = len(self._folders)
+            self._folders.append(folder)
+            self._rows_by_folder[folder_id] = deque()
+        rows = self._rows_by_folder[folder_id]
+        while len(rows) >= SAMPLES_PER_FOLDER:
+            oldest = rows.popleft()
+            evicted.append(self._paths[oldest])
+            self._remove_row(oldest)
+
+        if self._free:
+            row = self._free.pop()
+        else:
+            if self._used == len(self._owners):
+                self._grow()
+            row = self._used
+            self._used += 1
+
+        self._vectors[row] = vector if vector is not None else 0.0
+        self._times[row] = taken if taken is not None else np.nan
+        if camera:
+            self._cameras[row] = self._camera_ids.setdefault(camera, len(self._camera_ids))
+        else:
+            self._cameras[row] = -1
+        self._owners[row] = folder_id
+        self._paths[row] = path
+        self._row_of[path] = row
+        rows.append(row)
+        return evicted
+
+    def _remove_row(self, row: int) -> None:
+        del self._row_of[self._paths[row]]
+        self._paths[row] = None
+        self._owners[row] = -1
+        self._free.append(row)
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self._owners)
+        grow = capacity - len(self._owners)
+        self._vectors = np.vstack([self._vectors, np.zeros((grow, FEATURE_SIZE), np.float32)])
+        self._times = np.concatenate([self._times, np.full(grow, np.nan)])
+        self._cameras = np.concatenate([self._cameras, np.full(grow, -1, np.int32)])
+        self._owners = np.concatenate([self._owners, np.full(grow, -1, np.int32)])
+        self._paths.extend([None] * grow)
@@ -0,0 +1,267 @@
+# folder_watch.py
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import heapq
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Protocol
+
+
+@dataclass(frozen=True)
+class DirEvent:
+    kind: str                       # "added" | "removed" | "renamed"
+    path: Path
+    is_dir: bool
+    old: Optional[Path] = None      # previous path, for "renamed"
+
+
+def _snapshot(folder: Path) -> dict[str, bool]:
+    entries = {}
+    with os.scandir(folder) as it:
+        for entry in it:
+            try:
+                entries[entry.name] = entry.is_dir()
+            except OSError:
+                continue
+    return entries
+
+
+class _Watcher:
+    """
+    Keeps a name -> is_dir snapshot of one folder and diffs it on demand.
+    Pass `entries` (e.g. from the listing that was just done) to skip the
+    initial directory walk.
+    """
+
+    interval_ms = 1000
+
+    def __init__(self, folder: Path, entries: Optional[dict[str, bool]] = None) -> None:
+        self.folder = Path(folder)
+        self._entries = dict(entries) if entries is not None else _snapshot(self.folder)
+
+    def poll(self) -> list[DirEvent]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def _rescan(self) -> list[DirEvent]:
+        try:
+            current = _snapshot(self.folder)
+        except OSError:
+            return []
+
+        events = [
+            DirEvent("removed", self.folder / name, is_dir)
+            for name, is_dir in self._entries.items()
+            if name not in current
+        ]
+        events += [
+            DirEvent("added", self.folder / name, is_dir)
+            for name, is_dir in current.items()
+            if name not in self._entries
+        ]
+        self._entries = current
+        return events
+
+
+class PollingWatcher(_Watcher):
+    """Fallback: only rescan when the folder's own mtime changes."""
+
+    def __init__(self, folder: Path, entries: Optional[dict[str, bool]] = None) -> None:
+        super().__init__(folder, entries)
+        self._mtime = self._dir_mtime()
+
+    def poll(self) -> list[DirEvent]:
+        mtime = self._dir_mtime()
+        if mtime == self._mtime:
+            return []
+        self._mtime = mtime
+        return self._rescan()
+
+    def _dir_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.folder).st_mtime_ns
+        except OSError:
+            return None
+
+
+# inotify(7) constants
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher(_Watcher):
+    """
+    Linux inotify watcher driven by non-blocking reads, so the Tk loop can
+    poll it without a thread. Falls back to a rescan on queue overflow.
+    """
+
+    interval_ms = 250
+
+    def __init__(self, folder: Path, entries: Optional[dict[str, bool]] = None) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+        if libc.inotify_add_watch(fd, os.fsencode(str(folder)), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(err, f"inotify_add_watch failed for {folder}")
+
+        self._fd = fd
+        super().__init__(folder, entries)
+
+    def poll(self) -> list[DirEvent]:
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events: list[DirEvent] = []
+        # A rename inside the folder is a MOVED_FROM directly followed by
+        # the MOVED_TO with the same cookie. A MOVED_FROM followed by
+        # anything else left the folder, and is reported right there, so
+        # a file moved out and back in within one read ends up present.
+        moved_from: Optional[tuple[int, str, bool]] = None
+        offset = 0
+        while offset < len(data):
+            _wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="surrogateescape")
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                return self._rescan()
+
+            if moved_from is not None and not (mask & _IN_MOVED_TO and cookie == moved_from[0]):
+                events.append(DirEvent("removed", self.folder / moved_from[1], moved_from[2]))
+                moved_from = None
+
+            is_dir = bool(mask & _IN_ISDIR)
+            if mask & _IN_MOVED_FROM:
+                moved_from = (cookie, name, is_dir)
+                self._entries.pop(name, None)
+            elif mask & _IN_MOVED_TO:
+                self._entries[name] = is_dir
+                if moved_from is not None:
+                    old = moved_from[1]
+                    moved_from = None
+                    events.append(DirEvent("renamed", self.folder / name, is_dir, old=self.folder / old))
+                else:
+                    events.append(DirEvent("added", self.folder / name, is_dir))
+            elif mask & _IN_DELETE:
+                if self._entries.pop(name, None) is not None:
+                    events.append(DirEvent("removed", self.folder / name, is_dir))
+            elif mask & (_IN_CREATE | _IN_CLOSE_WRITE):
+                # Files are reported on close-write so they are complete;
+                # folders are reported as soon as they are created.
+                if (mask & _IN_CREATE) and not is_dir:
+                    continue
+                if name not in self._entries:
+                    self._entries[name] = is_dir
+                    events.append(DirEvent("added", self.folder / name, is_dir))
+
+        if moved_from is not None:
+            events.append(DirEvent("removed", self.folder / moved_from[1], moved_from[2]))
+        return events
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def watch(folder: Path, entries: Optional[dict[str, bool]] = None) -> _Watcher:
+    """Best available watcher for `folder`: inotify on Linux, else mtime polling."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folder, entries)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(folder, entries)
+
+
+class _Folders(Protocol):
+    def add(self, folder: Path) -> bool: ...
+    def remove(self, folder: Path) -> bool: ...
+
+
+class _Names(Protocol):
+    def is_media_name(self, name: str) -> bool: ...
+    def is_target_name(self, name: str) -> bool: ...
+
+
+@dataclass
+class Delta:
+    """What apply_event() changed; the caller refreshes whatever shows it."""
+    folders_changed: bool = False
+    items_changed: bool = False
+    removed: list[Path] = field(default_factory=list)     # items dropped from the list
+
+
+def merge_upcoming(images: list[Path], index: int, media: list[Path]) -> None:
+    """Merge sorted `media` into the items after `index` (kept sorted), in place."""
+    if not media:
+        return
+    lo = min(index + 1, len(images))
+    images[lo:] = list(heapq.merge(images[lo:], media))
+
+
+def apply_event(
+    event: DirEvent, images: list[Path], index: int, folders: _Folders, names: _Names,
+    delta: Optional[Delta] = None,
+) -> Delta:
+    """
+    Apply a change made to the source folder by another program to the
+    item list (`images`, with `index` on screen) and the target folders, in
+    place. `names` tells media and target folders apart (a FileRouter).
+    """
+    delta = delta if delta is not None else Delta()
+    if event.kind == "renamed":
+        apply_event(DirEvent("removed", event.old, event.is_dir), images, index, folders, names, delta)
+        return apply_event(DirEvent("added", event.path, event.is_dir), images, index, folders, names, delta)
+
+    if event.is_dir:
+        if names.is_target_name(event.path.name):
+            if event.kind == "added":
+                delta.folders_changed |= folders.add(event.path)
+            else:
+                delta.folders_changed |= folders.remove(event.path)
+        return delta
+
+    if not names.is_media_name(event.path.name):
+        return delta
+
+    if event.kind == "added":
+        # Files coming back through undo are already in the list.
+        if event.path not in images:
+            merge_upcoming(images, index, [event.path])
+            delta.items_changed = True
+        return delta
+
+    # Removed: items before `index` are history (undo may bring them
+    # back), so only upcoming items and a vanished current item go.
+    try:
+        pos = images.index(event.path, index)
+    except ValueError:
+        return delta
+    del images[pos]
+    delta.removed.append(event.path)
+    delta.items_changed = True
+    return delta
@@ -1,73 +1,552 @@
+import io
+import math
+
 import cv2
-from PIL import Image, ImageTk
+from PIL import ExifTags, Image, ImageOps, ImageTk
+
+import media_types
+import tracing
+from tiles import TiledImage
+from video_player import VideoPlayer, fit_size
+
+# Render box until the image area has been laid out (afterwards the live
+# size is kept in app.display_size).
+DISPLAY_SIZE = (900, 700)
+
+# Render boxes snap down to multiples of this, so small resizes keep
+# hitting the prefetch and thumbnail caches.
+RENDER_SIZE_STEP = 32
+
+# Wait for the window to stop changing size before re-rendering.
+RESIZE_DEBOUNCE_MS = 150
+
+# Re-rendering from memory on resize uses the best filter expected to
+# finish within this budget. Costs are rough ms per source megapixel.
+RESIZE_BUDGET_MS = 25.0
+_RESAMPLE_COSTS = (
+    (Image.Resampling.LANCZOS, 15.0),
+    (Image.Resampling.BICUBIC, 11.0),
+    (Image.Resampling.BILINEAR, 7.0),
+)
+
+# Decode strategy (speed vs quality):
+#   "fast"     - let libjpeg DCT-scale straight down to the target and finish
+#                with a bilinear resize
+#   "balanced" - DCT-scale / reduce() to ~2x the target, then bicubic
+#   "quality"  - full-resolution decode, then Lanczos
+DECODE_MODE = "balanced"
+
+_DECODE_STRATEGIES = {
+    "fast": (1.0, Image.Resampling.BILINEAR),
+    "balanced": (2.0, Image.Resampling.BICUBIC),
+    "quality": (None, Image.Resampling.LANCZOS),
+}
+
+# Show the EXIF-embedded JPEG thumbnail while the real decode finishes.
+SHOW_EXIF_PREVIEW = True
+
+# Zoom: most screen pixels per image pixel, and how long a released zoom
+# key waits for an auto-repeat press before zooming back out.
+ZOOM_MAX = 8.0
+ZOOM_RELEASE_MS = 60
 
 
 def stop_video(app):
     app.video_playing = False
 
+    if app.video_player is not None:
+        app.video_player.stop()
+        app.video_player = None
+
     if app.video_cap is not None:
         app.video_cap.release()
         app.video_cap = None
 
 
+def decode_image(path, mode=None, size=None):
+    """Decode and downscale an image to fit `size`. Safe to call off the Tk thread."""
+    reducing_gap, resample = _DECODE_STRATEGIES[mode or DECODE_MODE]
+    size = size or DISPLAY_SIZE
+
+    with tracing.span("decode", path), media_types.open_image(path) as img:
+        # thumbnail() uses draft() for JPEG (decode at 1/2, 1/4 or 1/8 scale)
+        # and reduce() for everything else, bounded by reducing_gap.
+        with tracing.span("thumbnail", path):
+            img.thumbnail(size, resample=resample, reducing_gap=reducing_gap)
+        return img.copy()
+
+
+def decode_cached(path, store=None, size=None, mode=None):
+    """decode_image, but read from / write to the persistent thumbnail store."""
+    size = size or DISPLAY_SIZE
+    if store is not None:
+        img = store.get(path, size)
+        if img is not None:
+            return img
+
+    img = decode_image(path, mode=mode, size=size)
+    if store is not None:
+        store.put(path, size, img)
+    return img
+
+
+def decode_preview(path, size=None, mode=None, store=None):
+    """
+    decode_cached for any media: videos give their first frame. Needs no
+    Tk, so it runs on worker threads and in decode_pool's processes.
+    """
+    size = size or DISPLAY_SIZE
+    if not media_types.is_video(path):
+        return decode_cached(path, store, size, mode)
+
+    if store is not None:
+        img = store.get(path, size)
+        if img is not None:
+            return img
+    cap = cv2.VideoCapture(str(path))
+    try:
+        if not cap.isOpened():
+            raise RuntimeError("Could not open video")
+        img = decode_first_frame(cap, size)
+    finally:
+        cap.release()
+    if store is not None:
+        store.put(path, size, img)
+    return img
+
+
+def decode_exif_preview(path):
+    """
+    Return the thumbnail embedded in the file's EXIF block, or None.
+    Only the header is read, so this is cheap even for huge JPEGs.
+    """
+    try:
+        with media_types.open_image(path) as img:
+            raw = img.info.get("exif")
+            if not raw:
+                return None
+            ifd1 = img.getexif().get_ifd(ExifTags.IFD.IFD1)
+    except Exception:
+        return None
+
+    offset = ifd1.get(0x0201)  # JPEGInterchangeFormat
+    length = ifd1.get(0x0202)  # JPEGInterchangeFormatLength
+    if not offset or not length:
+        return None
+
+    # Offsets are relative to the TIFF header, which follows "Exif\0\0".
+    start = 6 + offset if raw.startswith(b"Exif") else offset
+    try:
+        preview = Image.open(io.BytesIO(raw[start:start + length]))
+        preview.load()
+    except Exception:
+        return None
+    return preview
+
+
+def viewport_size(app):
+    """The image area's size in pixels, snapped to RENDER_SIZE_STEP. Tk thread only."""
+    width, height = app.image_frame.winfo_width(), app.image_frame.winfo_height()
+    if width <= 1 or height <= 1:
+        return DISPLAY_SIZE  # not laid out yet
+    step = RENDER_SIZE_STEP
+    return max(step, width // step * step), max(step, height // step * step)
+
+
+def pick_resample(src_size, budget_ms=RESIZE_BUDGET_MS):
+    """Best resampling filter whose estimated cost for `src_size` fits the budget."""
+    megapixels = src_size[0] * src_size[1] / 1e6
+    for resample, cost in _RESAMPLE_COSTS:
+        if megapixels * cost <= budget_ms:
+            return resample
+    return Image.Resampling.NEAREST
+
+
+def on_viewport_configure(app):
+    """<Configure> on the image area: re-render once resizing settles."""
+    pending = getattr(app, "_resize_after_id", None)
+    if pending is not None:
+        app.root.after_cancel(pending)
+    app._resize_after_id = app.root.after(RESIZE_DEBOUNCE_MS, lambda: _apply_viewport(app))
+
+
+def _apply_viewport(app):
+    app._resize_after_id = None
+    size = viewport_size(app)
+    if size == app.display_size:
+        return
+    app.display_size = size
+
+    # Everything decoded ahead of time is for the old size now.
+    app.prefetcher.invalidate()
+    if app.video_player is not None:
+        app.video_player.size = size
+    if app.zoom_source is not None:
+        _render_zoom(app)
+        return
+
+    source = app.render_source
+    if source is None:
+        return
+
+    # Re-render from the decode already in memory; only go back to the
+    # file if it was cut down to the old box and the new one is bigger.
+    old_box = app.render_box
+    was_reduced = source.width >= old_box[0] - 1 or source.height >= old_box[1] - 1
+    grew = size[0] > old_box[0] or size[1] > old_box[1]
+
+    target = fit_size(source.width, source.height, size)
+    if was_reduced and grew:
+        target = _contain(source.size, size)
+    if target != source.size:
+        img = source.resize(target, pick_resample(source.size))
+    else:
+        img = source
+    _show_image(app, img, source=False)
+
+    path = app.current_image_path
+    if was_reduced and grew and path is not None and not app.is_video(path):
+        app.prefetcher.request(path)
+        app.root.after(15, lambda: _show_when_decoded(app, path))
+
+
+def _contain(src_size, box):
+    scale = min(box[0] / src_size[0], box[1] / src_size[1])
+    return max(1, round(src_size[0] * scale)), max(1, round(src_size[1] * scale))
+
+
+# --- zoom & pan -----------------------------------------------------------
+#
+# While zoomed, app.zoom_source is a TiledImage of the current file,
+# app.zoom_scale is screen pixels per image pixel and app.zoom_center the
+# image point in the middle of the view. Only the visible region is ever
+# rendered, from the coarsest pyramid level with enough detail; until that
+# level's tiles are decoded, the fit-to-window image stands in for it.
+
+def zoom_to(app, scale):
+    """Zoom to `scale` (1.0 = 100%), keeping the point under the pointer still."""
+    path = app.current_image_path
+    if path is None or app.is_video(path) or app.render_source is None:
+        return
+
+    source = app.zoom_source
+    if source is None or source.path != path:
+        try:
+            source = TiledImage(path, app.tile_cache)
+        except Exception as e:
+            print("ZOOM ERROR:", e)
+            return
+
+    if scale <= _fit_scale(app, source):
+        zoom_fit(app)
+        return
+
+    px, py = _pointer_in_file(app, source)
+    dx, dy = _pointer_from_center(app)
+    app.zoom_source = source
+    app.zoom_scale = scale
+    app.zoom_center = (px - dx / scale, py - dy / scale)
+    _render_zoom(app)
+
+
+def zoom_step(app, factor):
+    """Zoom in (factor > 1) or out from the current scale."""
+    path = app.current_image_path
+    if path is None or app.is_video(path):
+        return
+    if app.zoom_source is not None:
+        zoom_to(app, min(app.zoom_scale * factor, ZOOM_MAX))
+    elif factor > 1 and app.render_source is not None:
+        with media_types.open_image(path) as img:
+            width = img.width
+        zoom_to(app, min(app.render_source.width / width * factor, ZOOM_MAX))
+
+
+def zoom_fit(app):
+    """Back to the whole image, fitted to the window."""
+    if app.zoom_source is None:
+        return
+    _reset_zoom(app)
+    source = app.render_source
+    if source is not None:
+        target = fit_size(source.width, source.height, app.display_size)
+        img = source if target == source.size else source.resize(target, pick_resample(source.size))
+        _show_image(app, img, source=False)
+
+
+def zoom_key_down(app):
+    """Holding the zoom key shows 100% around the pointer."""
+    pending = app._zoom_release_id
+    if pending is not None:
+        # Key auto-repeat (X11 sends release/press pairs): still held.
+        app.root.after_cancel(pending)
+        app._zoom_release_id = None
+        return
+    if app.zoom_source is None:
+        zoom_to(app, 1.0)
+
+
+def zoom_key_up(app):
+    app._zoom_release_id = app.root.after(ZOOM_RELEASE_MS, lambda: _zoom_key_released(app))
+
+
+def _zoom_key_released(app):
+    app._zoom_release_id = None
+    zoom_fit(app)
+
+
+def start_pan(app, event):
+    app._pan_from = (event.x, event.y)
+
+
+def pan(app, event):
+    if app.zoom_source is None:
+        return
+    x0, y0 = app._pan_from
+    app._pan_from = (event.x, event.y)
+    cx, cy = app.zoom_center
+    app.zoom_center = (cx - (event.x - x0) / app.zoom_scale, cy - (event.y - y0) / app.zoom_scale)
+    _render_zoom(app)
+
+
+def _reset_zoom(app):
+    app.zoom_source = None
+    app._zoom_pending = None
+
+
+def _fit_scale(app, source):
+    return app.render_source.width / source.size[0]
+
+
+def _pointer_from_center(app):
+    """Pointer offset from the middle of the image label, in screen pixels."""
+    label = app.image_label
+    x = label.winfo_pointerx() - label.winfo_rootx() - label.winfo_width() / 2
+    y = label.winfo_pointery() - label.winfo_rooty() - label.winfo_height() / 2
+    return x, y
+
+
+def _pointer_in_file(app, source):
+    """The full-resolution image point under the pointer (clamped to the image)."""
+    dx, dy = _pointer_from_center(app)
+    if app.zoom_source is not None:
+        cx, cy = app.zoom_center
+        x, y = cx + dx / app.zoom_scale, cy + dy / app.zoom_scale
+    else:
+        scale = _fit_scale(app, source)
+        x = source.size[0] / 2 + dx / scale
+        y = source.size[1] / 2 + dy / scale
+    return min(max(x, 0), source.size[0]), min(max(y, 0), source.size[1])
+
+
+def _render_zoom(app):
+    source, scale = app.zoom_source, app.zoom_scale
+    full_w, full_h = source.size
+
+    view_w = min(app.display_size[0], max(1, round(full_w * scale)))
+    view_h = min(app.display_size[1], max(1, round(full_h * scale)))
+    box_w, box_h = view_w / scale, view_h / scale
+    cx = min(max(app.zoom_center[0], box_w / 2), full_w - box_w / 2)
+    cy = min(max(app.zoom_center[1], box_h / 2), full_h - box_h / 2)
+    app.zoom_center = (cx, cy)
+    box = (cx - box_w / 2, cy - box_h / 2, cx + box_w / 2, cy + box_h / 2)
+
+    level = source.level_for(scale)
+    f = 2 ** level
+    tiles_box = (int(box[0] / f), int(box[1] / f), math.ceil(box[2] / f), math.ceil(box[3] / f))
+
+    with tracing.span("zoom.render", source.path):
+        region = source.region(level, tiles_box)
+        if region is not None:
+            sub = (box[0] / f - tiles_box[0], box[1] / f - tiles_box[1],
+                   box[2] / f - tiles_box[0], box[3] / f - tiles_box[1])
+        else:
+            # Stand-in while the level decodes: the fit-to-window image.
+            region = app.render_source
+            r = region.width / full_w
+            sub = tuple(v * r for v in box)
+            _request_level(app, source, level, tiles_box)
+        sub = (sub[0], sub[1], min(sub[2], region.width), min(sub[3], region.height))
+        img = region.resize((view_w, view_h), pick_resample(region.size), box=sub)
+    _show_image(app, img, source=False)
+
+
+def _request_level(app, source, level, focus):
+    pending = app._zoom_pending
+    if pending is not None and pending[0] is source and pending[1] == level:
+        future = pending[2]
+        if not future.done() or future.exception() is not None:
+            return
+        # A big level only kept the tiles around the last focus: decode it
+        # again if the view has panned past them.
+        if source.tiles_for(level, focus) <= future.result():
+            return
+    future = app.zoom_pool.submit(source.decode_level, level, focus)
+    app._zoom_pending = (source, level, future)
+    _poll_zoom(app, future)
+
+
+def _poll_zoom(app, future):
+    pending = app._zoom_pending
+    if pending is None or pending[2] is not future:
+        return  # zoom ended or moved on to another file/level
+    if not future.done():
+        app.root.after(30, lambda: _poll_zoom(app, future))
+        return
+    if future.exception() is not None:
+        print("ZOOM ERROR:", future.exception())
+        return
+    # Leave it marked pending: if the tiles it kept were already evicted
+    # again, the stand-in stays rather than decoding in a loop.
+    _render_zoom(app)
+
+
+def _show_image(app, img, source=True):
+    """
+    Put `img` on screen. Unless source=False, it also becomes what resizes
+    are re-rendered from (app.render_source, decoded for app.render_box).
+    """
+    if source:
+        app.render_source = img
+        app.render_box = app.display_size
+    with tracing.span("photoimage"):
+        app.tk_image = ImageTk.PhotoImage(img)
+    with tracing.span("label.update"):
+        app.image_label.config(image=app.tk_image, text="")
+        app.image_label.pack(expand=True)
+
+
+def _show_placeholder(app):
+    app.tk_image = None
+    app.render_source = None
+    app.image_label.config(image="", text="Loading…")
+
+
+def show_load_error(app, path):
+    app.tk_image = None
+    app.render_source = None
+    app.image_label.config(image="", text=f"Could not load file:\n{path.name}")
+
+
+def _show_when_decoded(app, path, retried=False):
+    """Swap the EXIF preview (or placeholder) for the real decode once the prefetcher has it."""
+    if app.current_image_path != path:
+        return
+
+    img = app.prefetcher.peek(path)
+    if img is not None:
+        _show_image(app, img)
+    elif app.prefetcher.is_pending(path):
+        app.root.after(15, lambda: _show_when_decoded(app, path, retried))
+    elif not retried:
+        # Dropped (invalidated) before it finished: ask once more, still
+        # off the Tk thread.
+        app.prefetcher.request(path)
+        app.root.after(15, lambda: _show_when_decoded(app, path, True))
+    else:
+        # The decode itself failed (or the file is gone).
+        print("MEDIA LOAD ERROR: could not decode", path)
+        show_load_error(app, path)
+
+
 def render_image(app, path):
+    with tracing.span("render_image", path):
+        _render_image(app, path)
+
+
+def _render_image(app, path):
     stop_video(app)
+    _reset_zoom(app)
     if hasattr(app, "video_overlay"):
         app.video_overlay.place_forget()
 
-    img = Image.open(path)
-    img.thumbnail((900, 700))
+    img = None
+    size = app.display_size
+    store = getattr(app, "thumb_store", None)
+    prefetcher = getattr(app, "prefetcher", None)
+    if prefetcher is not None:
+        img = prefetcher.peek(path)
 
-    app.tk_image = ImageTk.PhotoImage(img)
-    app.image_label.config(image=app.tk_image, text="")
-    app.image_label.pack(expand=True)
+        if img is None and store is not None:
+            img = store.get(path, size)
 
+        if img is None and SHOW_EXIF_PREVIEW:
+            preview = decode_exif_preview(path)
+            if preview is not None:
+                _show_image(app, ImageOps.contain(preview, size))
+                prefetcher.request(path)
+                app.root.after(15, lambda: _show_when_decoded(app, path))
+                return
 
-def render_video_paused(app, path):
-    stop_video(app)
+        if img is None:
+            # Nothing to show yet: a placeholder now, the decode once the
+            # prefetcher has it, never a wait on the Tk thread.
+            _show_placeholder(app)
+            prefetcher.request(path)
+            app.root.after(15, lambda: _show_when_decoded(app, path))
+            return
 
-    app.video_cap = cv2.VideoCapture(str(path))
-    if not app.video_cap.isOpened():
-        raise RuntimeError("Could not open video")
+    if img is None:
+        img = decode_cached(path, store, size)
+
+    _show_image(app, img)
 
-    success, frame = app.video_cap.read()
+
+def decode_first_frame(cap, size=None):
+    """The next frame of an opened capture, downscaled to fit `size`."""
+    success, frame = cap.read()
     if not success:
         raise RuntimeError("Could not read first frame")
 
     frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     img = Image.fromarray(frame)
-    img.thumbnail((900, 700))
+    img.thumbnail(size or DISPLAY_SIZE)
+    return img
+
 
-    app.tk_image = ImageTk.PhotoImage(img)
-    app.image_label.config(image=app.tk_image, text="")
-    app.image_label.pack(expand=True)
+def render_video_paused(app, path):
+    stop_video(app)
+    _reset_zoom(app)
+
+    size = app.display_size
+    store = getattr(app, "thumb_store", None)
+    prefetcher = getattr(app, "prefetcher", None)
+    img = prefetcher.peek(path) if prefetcher is not None else None
+    if img is None and store is not None:
+        img = store.get(path, size)
+
+    app.video_cap = cv2.VideoCapture(str(path))
+    if not app.video_cap.isOpened():
+        raise RuntimeError("Could not open video")
+
+    if img is None:
+        img = decode_first_frame(app.video_cap, size)
+        if store is not None:
+            store.put(path, size, img)
+
+    _show_image(app, img)
 
     app.video_playing = False
     app.video_overlay.place(relx=0.5, rely=0.5, anchor="center")
 
 
 def play_next_frame(app):
-    if not app.video_playing or app.video_cap is None:
+    player = app.video_player
+    if not app.video_playing or player is None:
         return
 
-    success, frame = app.video_cap.read()
-
-    if not success:
-        app.video_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-        success, frame = app.video_cap.read()
-        if not success:
-            stop_video(app)
-            return
-
-    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    img = Image.fromarray(frame)
-    img.thumbnail((900, 700))
+    img = player.next_due_frame()
+    if img is not None:
+        with tracing.span("video.frame"):
+            app.tk_image = ImageTk.PhotoImage(img)
+            app.image_label.config(image=app.tk_image)
+            app.image_label.pack(expand=True)
 
-    app.tk_image = ImageTk.PhotoImage(img)
-    app.image_label.config(image=app.tk_image)
-    app.image_label.pack(expand=True)
+    if player.exhausted():
+        stop_video(app)
+        return
 
-    app.root.after(33, lambda: play_next_frame(app))
+    app.root.after(player.ms_until_next(), lambda: play_next_frame(app))
 
 
 def toggle_video(app):
@@ -76,8 +555,13 @@ def toggle_video(app):
 
     if app.video_playing:
         app.video_playing = False
+        if app.video_player is not None:
+            app.video_player.pause()
         app.video_overlay.place(relx=0.5, rely=0.5, anchor="center")
     else:
+        if app.video_player is None:
+            app.video_player = VideoPlayer(app.video_cap, app.display_size)
+        app.video_player.start()
         app.video_playing = True
         app.video_overlay.place_forget()
         play_next_frame(app)
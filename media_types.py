@@ -0,0 +1,242 @@
+# media_types.py
+"""
+Which files the sorter handles and how to get a picture out of each.
+
+Every MediaType lists its extensions, whether it is an image or a video,
+and (for images) an opener that returns a lazily-decoded PIL image of the
+cheapest adequate preview: the file itself for formats Pillow reads, the
+embedded JPEG for camera RAW files (never a full demosaic). Videos all go
+through OpenCV. Register more types with register().
+"""
+from __future__ import annotations
+
+import io
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from PIL import Image
+
+try:
+    from pillow_heif import register_heif_opener
+except ImportError:
+    register_heif_opener = None
+
+try:
+    import rawpy
+except ImportError:
+    rawpy = None
+
+
+@dataclass(frozen=True)
+class MediaType:
+    name: str
+    extensions: tuple[str, ...]
+    kind: str = "image"                                      # "image" | "video"
+    open: Optional[Callable[[Path], Image.Image]] = None    # images only
+
+    @property
+    def is_video(self) -> bool:
+        return self.kind == "video"
+
+
+_BY_EXTENSION: dict[str, MediaType] = {}
+
+
+def register(media_type: MediaType) -> None:
+    for ext in media_type.extensions:
+        _BY_EXTENSION[ext.lower()] = media_type
+
+
+def for_path(path) -> Optional[MediaType]:
+    return _BY_EXTENSION.get(os.path.splitext(str(path))[1].lower())
+
+
+def supported_extensions() -> tuple[str, ...]:
+    return tuple(sorted(_BY_EXTENSION))
+
+
+def is_video(path) -> bool:
+    media_type = for_path(path)
+    return media_type is not None and media_type.is_video
+
+
+def open_image(path) -> Image.Image:
+    """Open `path` for decoding with its type's opener (lazy, like Image.open)."""
+    media_type = for_path(path)
+    if media_type is None or media_type.open is None:
+        return Image.open(path)
+    return media_type.open(Path(path))
+
+
+# --- RAW: embedded JPEG preview ---------------------------------------------
+
+_JPEG_SOI = b"\xff\xd8\xff"
+# Headers (SOF marker included) of embedded JPEGs sit within this much of
+# their start; EXIF APP1 segments are capped at 64 KiB.
+_JPEG_HEADER_WINDOW = 128 * 1024
+# RAW files that aren't TIFF-based (CR3, RAF) keep their previews near the
+# start; only this much of them is searched for JPEG start markers.
+_PREVIEW_SCAN_BYTES = 8 * 1024 * 1024
+
+_TIFF_STRIP_OFFSETS = 0x0111
+_TIFF_SUB_IFDS = 0x014A
+_TIFF_JPEG_OFFSET = 0x0201
+_TIFF_SHORT = 3
+
+
+class _FileWindow(io.RawIOBase):
+    """Read-only view of a file from `offset` on, so Image.open can read an embedded JPEG in place."""
+
+    def __init__(self, f, offset: int, length: int) -> None:
+        self._f = f
+        self._offset = offset
+        self._length = length
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        if not self.closed:
+            self._f.close()
+        super().close()
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._length}[whence]
+        self._pos = max(0, base + pos)
+        return self._pos
+
+    def readinto(self, buf) -> int:
+        n = max(0, min(len(buf), self._length - self._pos))
+        if n == 0:
+            return 0
+        self._f.seek(self._offset + self._pos)
+        data = self._f.read(n)
+        buf[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+def _tiff_jpeg_offsets(mm) -> list[int]:
+    """
+    Where the images referenced from a TIFF-based RAW's IFDs (IFD0, its
+    chain and SubIFDs) start, if they are single-strip or JPEG-pointer
+    images: that is where CR2, NEF, ARW, DNG, ORF, RW2, PEF ... keep
+    their previews. Empty for other layouts.
+    """
+    order = {b"II": "<", b"MM": ">"}.get(mm[:2])
+    if order is None or len(mm) < 8:
+        return []
+    entry = struct.Struct(order + "HHII")
+    offsets = []
+    todo = [struct.unpack_from(order + "I", mm, 4)[0]]
+    seen = set()
+    while todo and len(seen) < 64:
+        ifd = todo.pop()
+        if ifd in seen or not 8 <= ifd <= len(mm) - 2:
+            continue
+        seen.add(ifd)
+        count = struct.unpack_from(order + "H", mm, ifd)[0]
+        end = ifd + 2 + 12 * count
+        if end + 4 > len(mm):
+            continue
+        for at in range(ifd + 2, end, 12):
+            tag, kind, n, value = entry.unpack_from(mm, at)
+            if kind == _TIFF_SHORT and n == 1:
+                value = struct.unpack_from(order + "H", mm, at + 8)[0]
+            if tag in (_TIFF_JPEG_OFFSET, _TIFF_STRIP_OFFSETS) and n == 1:
+                offsets.append(value)
+            elif tag == _TIFF_SUB_IFDS:
+                if n == 1:
+                    todo.append(value)
+                elif value + 4 * n <= len(mm):
+                    todo.extend(struct.unpack_from(f"{order}{n}I", mm, value))
+        todo.append(struct.unpack_from(order + "I", mm, end)[0])
+    return offsets
+
+
+def _jpeg_starts(mm) -> list[int]:
+    """Where the embedded JPEGs may start, without reading the whole file."""
+    starts = [pos for pos in _tiff_jpeg_offsets(mm) if mm[pos:pos + 3] == _JPEG_SOI]
+    if starts:
+        return starts
+    head = mm[:_PREVIEW_SCAN_BYTES]
+    pos = head.find(_JPEG_SOI)
+    while pos != -1:
+        starts.append(pos)
+        pos = head.find(_JPEG_SOI, pos + 3)
+    return starts
+
+
+def _largest_embedded_jpeg(path: Path) -> Image.Image:
+    """
+    Camera RAW files carry one or more full JPEG previews. Find where they
+    start (from the TIFF structure, or by searching the start of the file),
+    read just the headers, and open the biggest one.
+    """
+    f = open(path, "rb")
+    try:
+        size = os.fstat(f.fileno()).st_size
+        best, best_pixels = None, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for pos in _jpeg_starts(mm):
+                try:
+                    with Image.open(io.BytesIO(mm[pos:pos + _JPEG_HEADER_WINDOW])) as probe:
+                        pixels = probe.width * probe.height if probe.format == "JPEG" else 0
+                except Exception:
+                    pixels = 0
+                if pixels > best_pixels:
+                    best, best_pixels = pos, pixels
+
+        if best is None:
+            raise OSError(f"No embedded preview in {path.name}")
+        window = io.BufferedReader(_FileWindow(f, best, size - best))
+        img = Image.open(window)
+        # Keep the file open for the lazy decode; closing the image closes it.
+        img._exclusive_fp = True
+        return img
+    except BaseException:
+        f.close()
+        raise
+
+
+def _open_raw_preview(path: Path) -> Image.Image:
+    if rawpy is not None:
+        with rawpy.imread(str(path)) as raw:
+            try:
+                thumb = raw.extract_thumb()
+            except (rawpy.LibRawNoThumbnailError, rawpy.LibRawUnsupportedThumbnailError):
+                thumb = None
+        if thumb is not None and thumb.format == rawpy.ThumbFormat.JPEG:
+            return Image.open(io.BytesIO(thumb.data))
+        if thumb is not None and thumb.format == rawpy.ThumbFormat.BITMAP:
+            return Image.fromarray(thumb.data)
+    return _largest_embedded_jpeg(path)
+
+
+# --- built-in types ---------------------------------------------------------
+
+register(MediaType("JPEG", (".jpg", ".jpeg"), open=Image.open))
+register(MediaType("PNG", (".png",), open=Image.open))
+register(MediaType("WebP", (".webp",), open=Image.open))
+register(MediaType("TIFF", (".tif", ".tiff"), open=Image.open))
+register(MediaType(
+    "Camera RAW",
+    (".dng", ".cr2", ".cr3", ".nef", ".nrw", ".arw", ".srf", ".sr2", ".orf", ".rw2", ".raf", ".pef", ".srw"),
+    open=_open_raw_preview,
+))
+register(MediaType("Video", (".mp4", ".mov", ".m4v", ".mkv", ".avi", ".webm"), kind="video"))
+
+if register_heif_opener is not None:
+    register_heif_opener()
+    register(MediaType("HEIF", (".heic", ".heif"), open=Image.open))
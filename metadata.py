@@ -0,0 +1,195 @@
+# metadata.py
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import cv2
+from PIL import ExifTags
+
+import media_types
+from app_cache import CACHE_DIR, open_cache_db
+from process_pool import DEFAULT_WORKERS, process_pool
+
+DEFAULT_INDEX_PATH = CACHE_DIR / "metadata.sqlite3"
+
+_TAG_MAKE = 0x010F
+_TAG_MODEL = 0x0110
+_TAG_ORIENTATION = 0x0112
+_TAG_DATETIME = 0x0132
+_TAG_DATETIME_ORIGINAL = 0x9003
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    path: Path
+    size: int
+    mtime: float
+    captured: Optional[datetime] = None
+    make: Optional[str] = None
+    model: Optional[str] = None
+    width: int = 0
+    height: int = 0
+    orientation: int = 1
+    duration: Optional[float] = None    # seconds, videos only
+    mtime_ns: int = 0
+
+    @property
+    def date(self) -> datetime:
+        """Capture time if known, else the file's mtime."""
+        return self.captured or datetime.fromtimestamp(self.mtime)
+
+
+def _parse_exif_datetime(value) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.strptime(value.strip("\0 "), "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def _clean(value) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    value = value.strip("\0 ")
+    return value or None
+
+
+def read_metadata(path: Path) -> MediaInfo:
+    """
+    Cheap per-file metadata: stat plus the EXIF header (no pixel decode),
+    or the container header for videos. Top-level and picklable, so it can
+    run in a process pool.
+    """
+    path = Path(path)
+    st = os.stat(path)
+    fields = {}
+
+    try:
+        with media_types.open_image(path) as img:
+            fields["width"], fields["height"] = img.size
+            exif = img.getexif()
+            sub = exif.get_ifd(ExifTags.IFD.Exif)
+            fields["captured"] = _parse_exif_datetime(sub.get(_TAG_DATETIME_ORIGINAL)) or _parse_exif_datetime(
+                exif.get(_TAG_DATETIME)
+            )
+            fields["make"] = _clean(exif.get(_TAG_MAKE))
+            fields["model"] = _clean(exif.get(_TAG_MODEL))
+            orientation = exif.get(_TAG_ORIENTATION)
+            if isinstance(orientation, int):
+                fields["orientation"] = orientation
+    except Exception:
+        fields.update(_read_video_metadata(path))
+
+    return MediaInfo(path=path, size=st.st_size, mtime=st.st_mtime, mtime_ns=st.st_mtime_ns, **fields)
+
+
+def _read_video_metadata(path: Path) -> dict:
+    cap = cv2.VideoCapture(str(path))
+    try:
+        if not cap.isOpened():
+            return {}
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        return {
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "duration": frames / fps if fps > 0 and frames > 0 else None,
+        }
+    finally:
+        cap.release()
+
+
+# Orders offered for app.images. Each maps MediaInfo -> sort key.
+SORT_ORDERS: dict[str, Callable[[MediaInfo], tuple]] = {
+    "Name": lambda m: (m.path.name,),
+    "Capture time": lambda m: (m.date, m.path.name),
+    "Size": lambda m: (m.size, m.path.name),
+    "Type": lambda m: (m.path.suffix.lower(), m.path.name),
+}
+
+
+class MetadataIndex:
+    """
+    SQLite cache of MediaInfo keyed by path + size + mtime. Only files that
+    are new or changed since they were last seen are read again, in a
+    process pool (EXIF parsing is pure-Python and holds the GIL).
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_INDEX_PATH) -> None:
+        self._db = open_cache_db(db_path)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS media ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, mtime REAL,"
+                " captured TEXT, make TEXT, model TEXT, width INTEGER, height INTEGER,"
+                " orientation INTEGER, duration REAL)"
+            )
+
+    def index(self, paths: Iterable[Path], workers: Optional[int] = None) -> dict[Path, MediaInfo]:
+        result: dict[Path, MediaInfo] = {}
+        stale: list[Path] = []
+
+        with self._lock:
+            for path in paths:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                row = self._db.execute(
+                    "SELECT * FROM media WHERE path = ? AND size = ? AND mtime_ns = ?",
+                    (str(path), st.st_size, st.st_mtime_ns),
+                ).fetchone()
+                if row is None:
+                    stale.append(Path(path))
+                else:
+                    result[Path(path)] = _from_row(row)
+
+        if stale:
+            with process_pool(min(workers or DEFAULT_WORKERS, len(stale))) as pool:
+                fresh = list(pool.map(_read_or_none, stale, chunksize=32))
+            with self._lock, self._db:
+                for info in fresh:
+                    if info is None:
+                        continue
+                    result[info.path] = info
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        _to_row(info),
+                    )
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _read_or_none(path: Path) -> Optional[MediaInfo]:
+    try:
+        return read_metadata(path)
+    except OSError:
+        return None
+
+
+def _to_row(info: MediaInfo) -> tuple:
+    return (
+        str(info.path), info.size, info.mtime_ns, info.mtime,
+        info.captured.isoformat() if info.captured else None,
+        info.make, info.model, info.width, info.height, info.orientation, info.duration,
+    )
+
+
+def _from_row(row: tuple) -> MediaInfo:
+    path, size, mtime_ns, mtime, captured, make, model, width, height, orientation, duration = row
+    return MediaInfo(
+        path=Path(path), size=size, mtime=mtime, mtime_ns=mtime_ns,
+        captured=datetime.fromisoformat(captured) if captured else None,
+        make=make, model=model, width=width, height=height,
+        orientation=orientation, duration=duration,
+    )
@@ -0,0 +1,173 @@
+# prefetch.py
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+CacheKey = tuple[str, int]
+
+
+def cache_key(path: Path) -> Optional[CacheKey]:
+    """Key a file by path + mtime so edited files are never served stale."""
+    try:
+        return (str(path), os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+
+
+class DecodeCache:
+    """Small thread-safe LRU of decoded, already-downscaled images."""
+
+    def __init__(self, max_items: int = 8) -> None:
+        self.max_items = max_items
+        self._items: OrderedDict[CacheKey, object] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: CacheKey):
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+            return img
+
+    def put(self, key: CacheKey, img) -> None:
+        with self._lock:
+            self._items[key] = img
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def discard_path(self, path: Path) -> None:
+        p = str(path)
+        with self._lock:
+            for key in [k for k in self._items if k[0] == p]:
+                del self._items[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class Prefetcher:
+    """
+    Decodes the next `ahead` items (and `behind` previous ones, for undo)
+    of the media list on a worker pool, so the Tk thread only has to wrap
+    a ready PIL image in ImageTk.PhotoImage.
+    """
+
+    def __init__(
+        self,
+        decode: Callable[[Path], object],
+        *,
+        accept: Callable[[Path], bool] = lambda p: True,
+        ahead: int = 3,
+        behind: int = 1,
+        workers: int = 2,
+    ) -> None:
+        self.decode = decode
+        self.accept = accept
+        self.ahead = ahead
+        self.behind = behind
+        self.cache = DecodeCache(max_items=ahead + behind + 2)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._pending: dict[CacheKey, Future] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def schedule(self, images: Sequence[Path], index: int) -> None:
+        """Queue decodes for the window around `index` (current item first)."""
+        order = [index] + list(range(index + 1, index + 1 + self.ahead))
+        order += list(range(index - 1, index - 1 - self.behind, -1))
+
+        for i in order:
+            if 0 <= i < len(images) and self.accept(images[i]):
+                self._submit(images[i])
+
+    def request(self, path: Path) -> None:
+        """Queue a decode of a single path (no-op if cached or in flight)."""
+        self._submit(path)
+
+    def peek(self, path: Path):
+        """Return the cached image for `path` without waiting, or None."""
+        key = cache_key(path)
+        return None if key is None else self.cache.get(key)
+
+    def is_pending(self, path: Path) -> bool:
+        key = cache_key(path)
+        with self._lock:
+            return key in self._pending
+
+    def get(self, path: Path):
+        """
+        Return the decoded image for `path`, waiting on an in-flight decode
+        if there is one. Returns None if nothing was prefetched.
+        """
+        key = cache_key(path)
+        if key is None:
+            return None
+
+        img = self.cache.get(key)
+        if img is not None:
+            return img
+
+        with self._lock:
+            fut = self._pending.get(key)
+        if fut is None:
+            return None
+
+        try:
+            return fut.result()
+        except Exception:
+            return None
+
+    def invalidate(self, *paths: Path) -> None:
+        """Drop cached/in-flight entries for `paths`, or everything if none given."""
+        if not paths:
+            with self._lock:
+                self._generation += 1
+                for fut in self._pending.values():
+                    fut.cancel()
+                self._pending.clear()
+            self.cache.clear()
+            return
+
+        names = {str(p) for p in paths}
+        with self._lock:
+            for key in [k for k in self._pending if k[0] in names]:
+                self._pending.pop(key).cancel()
+        for p in paths:
+            self.cache.discard_path(p)
+
+    def shutdown(self) -> None:
+        self.invalidate()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, path: Path) -> None:
+        key = cache_key(path)
+        if key is None or self.cache.get(key) is not None:
+            return
+
+        with self._lock:
+            if key in self._pending:
+                return
+            generation = self._generation
+            fut = self._pool.submit(self._run, path, key, generation)
+            self._pending[key] = fut
+        fut.add_done_callback(lambda f, k=key: self._forget(k, f))
+
+    def _run(self, path: Path, key: CacheKey, generation: int):
+        img = self.decode(path)
+        with self._lock:
+            stale = generation != self._generation or key not in self._pending
+        if not stale:
+            self.cache.put(key, img)
+        return img
+
+    def _forget(self, key: CacheKey, fut: Future) -> None:
+        with self._lock:
+            if self._pending.get(key) is fut:
+                del self._pending[key]
@@ -0,0 +1,25 @@
+# process_pool.py
+"""Process pools for the CPU-bound background work (decodes, indexing, hashing)."""
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# Leave a core for the Tk thread.
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+
+def process_pool(workers: Optional[int] = None, **kwargs) -> ProcessPoolExecutor:
+    """
+    A pool of `workers` processes (DEFAULT_WORKERS if not given); other
+    arguments go to ProcessPoolExecutor. The workers are spawned, not
+    forked: the app runs Tk and worker threads, and a fork copies locks
+    those threads may be holding.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers or DEFAULT_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        **kwargs,
+    )
@@ -1,12 +1,30 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import tkinter as tk
 from pathlib import Path
 
 from keybinds import bind_keyboard_shortcuts
-from ui import build_ui
-from undo import UndoManager
+from ui import build_ui, enable_dpi_awareness
+from undo import UndoAction, UndoJournal, UndoManager
 from file_routing import FileRouter
+from file_ops import FileOpQueue
+from folder_panel import FolderIndex
+from folder_suggest import FolderSuggester, image_features
+import folder_watch
+from dedupe import HashStore, find_sorted_duplicates
+from bursts import SignatureIndex, find_bursts, sharpest
+import checkpoint
+from cleanup import TrashPurger, cleanup_private_trash, enforce_trash_quota
+from metadata import SORT_ORDERS, MetadataIndex
+from prefetch import Prefetcher
+from decode_pool import DecodeService
+from thumb_cache import ThumbnailStore
+from tiles import TileCache
 import media_loader
+import media_types
 import dialogs
+import tracing
 
 
 ###
@@ -18,35 +36,99 @@ import dialogs
 #dialogs
 ###
 
+CHECKPOINT_INTERVAL_MS = 30_000
+
+
 class PhotoSorterApp:
     def is_video(self, path: Path):
-        return path.suffix.lower() == ".mp4"
+        return media_types.is_video(path)
     
     def __init__(self, root):
-        self.undo = UndoManager()
+        self.undo = UndoManager(UndoJournal())
+        self.thumb_store = ThumbnailStore()
+        # Started with the first folder (see select_source_folder).
+        self.decode_service = None
+        self.prefetcher = Prefetcher(
+            self._decode_ahead,
+            # Without worker processes, video posters are left to the Tk thread.
+            accept=lambda p: self.decode_service is not None or not self.is_video(p),
+            # Prefetch threads mostly wait on the decode processes.
+            workers=4,
+        )
         self.root = root
         self.root.title("Photo Sorter")
+        self.root.protocol("WM_DELETE_WINDOW", self.shutdown)
+        self.file_ops = FileOpQueue(release=lambda dst: self.router.release(dst))
 
         self.video_cap = None
+        self.video_player = None
         self.video_playing = False
 
         self.images = []
         self.index = 0
+        self.selection = 1
         self.current_image_path = None
         self.tk_image = None
+        # Decodes are sized to the image area (see media_loader.viewport_size).
+        self.display_size = media_loader.DISPLAY_SIZE
+        self.render_source = None
+        self.render_box = self.display_size
+        # Zoom/pan state (see media_loader.zoom_to)
+        self.tile_cache = TileCache()
+        self.zoom_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tiles")
+        self.zoom_source = None
+        self.zoom_scale = 1.0
+        self.zoom_center = (0.0, 0.0)
+        self._zoom_pending = None
+        self._zoom_release_id = None
+        self._pan_from = (0, 0)
+        self.source_dir = None
+        self._scan = None
+        self._scan_folders = []
+        self.folder_index = FolderIndex()
+        # Likely target folders for the current item, on keys 1-5. Colour
+        # signatures are taken on the prefetch threads, right after decode.
+        self.folder_suggester = FolderSuggester()
+        self.features = {}
+        self.suggestions = []
+        self._suggestion_pending = None
+        self.watcher = None
+        self.hash_store = HashStore()
+        self.duplicates = {}
+        self.metadata_index = MetadataIndex()
+        self.signature_index = SignatureIndex()
+        self.signatures = {}
+        self.bursts = {}    # path -> every frame of its burst, in capture order
+        self.purger = TrashPurger()
+        self._purge_finished = None
+        self._closing = False
+        self._when_ops_idle = None    # run once queued moves have landed
+        self.media_info = {}
+        self.sort_order = "Name"
+        self._checkpointed = None
+        self.checkpoint_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
 
         build_ui(self)
         bind_keyboard_shortcuts(self)
-        self.select_source_folder()
+        self._poll_file_ops()
+        self.root.after(CHECKPOINT_INTERVAL_MS, self._autosave_checkpoint)
+
+        # Offer to pick up an interrupted session (its undo stack survives).
+        resume_dir = self.undo.restore()
+        if resume_dir is not None and resume_dir.is_dir() and dialogs.confirm_resume_session(resume_dir):
+            self.select_source_folder(resume_dir, resume=True)
+        else:
+            self.select_source_folder()
 
         self._action_lock = False
 
-    def select_source_folder(self):
-        folder = dialogs.pick_source_folder(self.root)
+    def select_source_folder(self, folder=None, resume=False):
+        if folder is None:
+            folder = dialogs.pick_source_folder(self.root)
         self.refocus_app()
 
         if not folder:
-            self.root.quit()
+            self.shutdown()
             return
 
         media_loader.stop_video(self)
@@ -54,90 +136,285 @@ class PhotoSorterApp:
             self.video_overlay.place_forget()
 
         self.source_dir = Path(folder)
-
-        self.router = FileRouter(self.source_dir)
-
-        self.undo.clear()
-        self.images = self.router.list_media()
+        self._stop_watching()
+        self.duplicates = {}
+        self.media_info = {}
+        self.signatures = {}
+        self.bursts = {}
+        self.features = {}
+
+        self.router = FileRouter(self.source_dir, hash_store=self.hash_store)
+
+        if not resume:
+            self.undo.begin_session(self.source_dir)
+        self.prefetcher.invalidate()
+        self._start_decode_service()
+        self.images = []
+        self.filmstrip.show(self.images, 0)
         self.index = 0
         self.current_image_path = None
         self.tk_image = None
 
-        if not self.images:
-            dialogs.show_no_media_error()
-            self.root.quit()
-            return
-
-        self.image_label.config(image="", text="")
+        self.image_label.config(image="", text="Scanning…")
 
-        self.refresh_folder_buttons()
-        self.load_image()
+        # Picking up where a previous run left off: no directory walk, and
+        # the remaining items keep the order they were being sorted in.
+        saved = checkpoint.load_checkpoint()
+        if saved is not None and saved.source == self.source_dir:
+            try:
+                self.images, self._scan_folders = checkpoint.reconcile(saved, self.router)
+            except OSError:
+                self.images = []
+            if self.images:
+                self._scan = None
+                self.sort_order = saved.sort_order if saved.sort_order in SORT_ORDERS else "Name"
+                self.sort_var.set(self.sort_order)
+                self._scan_finished()
+                self.load_image()
+                return
 
+        # Stream the listing: the first item is shown as soon as it is found
+        # and the rest is merged in batch by batch.
+        self._scan = self.router.scan()
+        self._scan_folders = []
+        self._continue_scan(self._scan)
+
+    def _continue_scan(self, scan):
+        if scan is not self._scan:
+            return  # a different folder was selected meanwhile
+
+        batch = next(scan, None)
+        if batch is None:
+            self._scan = None
+            if not self.images:
+                dialogs.show_no_media_error()
+                self.shutdown()
+                return
+            self._scan_finished()
+            if self.index >= len(self.images):
+                self.load_image()
+            return
 
-   
-    def load_image(self):
-        if self.index >= len(self.images):
-            from cleanup import cleanup_private_trash
-            cleanup_private_trash(self)
+        first_media = not self.images and batch.media
+        self._merge_scanned(batch.media)
+        self._scan_folders.extend(batch.folders)
 
-            again = dialogs.confirm_sort_another_folder()
+        if first_media:
+            self.refresh_folder_buttons(sorted(self._scan_folders))
 
-            if again:
-                self.undo.clear()
-                self.images = []
-                self.index = 0
-                self.current_image_path = None
+        if self.index < len(self.images) and self.images[self.index] != self.current_image_path:
+            self.load_image()
+        elif batch.media:
+            self._schedule_ahead()
+
+        self.root.after(1, lambda: self._continue_scan(scan))
+
+    def _schedule_ahead(self):
+        """Start decoding upcoming items and refresh the filmstrip."""
+        self.prefetcher.schedule(self.images, self.index)
+        self.filmstrip.show(self.images, self.index)
+
+    def _start_decode_service(self):
+        if self.decode_service is None:
+            try:
+                self.decode_service = DecodeService(store=self.thumb_store)
+            except Exception as e:
+                # Decodes then run on the prefetch threads, as with a broken pool.
+                print("DECODE WORKERS ERROR:", e)
+        else:
+            # Keep the workers; drop what was queued for the last folder.
+            self.decode_service.cancel_pending()
+
+    def _decode_ahead(self, path):
+        """Prefetch decode (worker thread): in a decode process when there are some."""
+        service = self.decode_service
+        img = None
+        if service is not None:
+            try:
+                img = service.decode(path, self.display_size)
+            except BrokenProcessPool:
+                self.decode_service = None
+        if img is None:
+            img = media_loader.decode_preview(path, self.display_size, store=self.thumb_store)
+        with tracing.span("suggest.features", path):
+            self.features[path] = image_features(img)
+        return img
+
+    def submit_decode(self, path, size, mode="fast"):
+        """Future of a decode in a worker process, or None if there are none."""
+        service = self.decode_service
+        if service is None:
+            return None
+        try:
+            return service.submit(path, size, mode)
+        except (BrokenProcessPool, RuntimeError):
+            return None
 
-                # Clear UI
-                self.image_label.config(image="", text="")
-                if hasattr(self, "video_overlay"):
-                    self.video_overlay.place_forget()
+    def _scan_finished(self):
+        self.refresh_folder_buttons(sorted(self._scan_folders))
+        self._start_watching()
+        self._start_dedupe()
+        self._start_indexing()
+        self._load_suggestions()
 
-                # Ask for new folder
-                self.select_source_folder()
-            else:
-                self.root.quit()
+    def _merge_scanned(self, media):
+        """Merge a sorted batch into the items not yet shown, keeping them sorted."""
+        folder_watch.merge_upcoming(self.images, self.index, media)
 
+    def load_image(self):
+        with tracing.span("load_image"):
+            self._load_image()
+        # Ranked once the item is on screen, never before.
+        self.root.after_idle(self._show_suggestions)
+
+    def _load_image(self):
+        if self.index >= len(self.images) and self._scan is not None:
+            # Caught up with the listing; the next batch will load the item.
+            self.current_image_path = None
+            self.image_label.config(image="", text="Scanning…")
             return
 
+        if self.index >= len(self.images):
+            # Let the queued moves land first, without blocking the Tk thread.
+            self.current_image_path = None
+            self.image_label.config(image="", text="Finishing moves…" if self.file_ops.has_pending() else "")
+            self._when_ops_idle = self._folder_done
+            return
 
         self.current_image_path = self.images[self.index]
+        self._show_duplicate_hint()
+        self._show_burst_hint()
+        self.set_selection(1)
 
         try:
-            if self.is_video(self.current_image_path):
+            media_type = media_types.for_path(self.current_image_path)
+            if media_type is not None and media_type.is_video:
                 media_loader.render_video_paused(self, self.current_image_path)
             else:
                 media_loader.render_image(self, self.current_image_path)
         except Exception as e:
             print("MEDIA LOAD ERROR:", e)
-            self.image_label.config(
-                image="",
-                text=f"Could not load file:\n{self.current_image_path.name}"
-            )
+            media_loader.show_load_error(self, self.current_image_path)
 
+        self._schedule_ahead()
 
-    def refresh_folder_buttons(self):
-        for widget in self.folder_frame.winfo_children():
-            widget.destroy()
 
-        for folder in self.router.list_target_folders():
-            if folder == self.source_dir:
-                continue
+    def _folder_done(self):
+        """Every item is sorted and its move has landed (see _poll_file_ops)."""
+        if self._closing:
+            return  # shutdown() empties the trash itself
+        if self.index < len(self.images) or self._scan is not None:
+            return  # an undo, a failed move or a new file brought one back
 
-            btn = tk.Button(
-                self.folder_frame,
-                text=folder.name,
-                width=25,
-                command=lambda f=folder: self.move_image(f)
-            )
-            btn.pack(pady=2)
+        # Purged files drop out of the undo stack one by one as they go.
+        cleanup_private_trash(self)
+
+        # Behind any autosave still being written.
+        self.checkpoint_pool.submit(checkpoint.clear_checkpoint)
+        self._checkpointed = None
+        # The folder is done: nothing to offer to resume next launch,
+        # whether or not another folder follows.
+        self.undo.clear()
+        again = dialogs.confirm_sort_another_folder()
+
+        if again:
+            self.images = []
+            self.index = 0
+            self.current_image_path = None
+
+            # Clear UI
+            self.image_label.config(image="", text="")
+            if hasattr(self, "video_overlay"):
+                self.video_overlay.place_forget()
+
+            # Ask for new folder
+            self.select_source_folder()
+        else:
+            # Queued behind the purge above: quit once the trash is empty.
+            cleanup_private_trash(self, on_finished=lambda cancelled: self.shutdown())
+
+
+    def refresh_folder_buttons(self, folders=None):
+        if folders is None:
+            folders = self.router.list_target_folders()
+
+        self.folder_index.set_folders(f for f in folders if f != self.source_dir)
+        self.filter_folders()
+
+    def add_folder_button(self, folder):
+        if folder != self.source_dir and self.folder_index.add(folder):
+            self.filter_folders()
+
+    def remove_folder_button(self, folder):
+        if self.folder_index.remove(folder):
+            self.filter_folders()
+
+    def filter_folders(self):
+        """Show the folders matching the search box (all of them when empty)."""
+        self.folder_list.set_items(self.folder_index.search(self.folder_search_var.get()))
+
+    def move_to_top_match(self):
+        """Return in the search box: sort into the best match and clear the box."""
+        if self.folder_list.items:
+            target = self.folder_list.items[0]
+            self.folder_search_var.set("")
+            self.move_image(target)
+
+    def _start_watching(self):
+        entries = {p.name: False for p in self.images}
+        entries.update((p.name, True) for p in self._scan_folders)
+        self.watcher = folder_watch.watch(self.source_dir, entries)
+        self._poll_watcher(self.watcher)
+
+    def _stop_watching(self):
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+
+    def _poll_watcher(self, watcher):
+        if watcher is not self.watcher:
+            return
+        for event in watcher.poll():
+            self._apply_dir_event(event)
+        self.root.after(watcher.interval_ms, lambda: self._poll_watcher(watcher))
+
+    def _apply_dir_event(self, event):
+        """Apply a change made to the source folder by another program."""
+        delta = folder_watch.apply_event(event, self.images, self.index, self.folder_index, self.router)
+        if delta.folders_changed:
+            self.filter_folders()
+        for path in delta.removed:
+            self.prefetcher.invalidate(path)
+            self.filmstrip.forget(path)
+        if not delta.items_changed:
+            return
+
+        current = self.images[self.index] if self.index < len(self.images) else None
+        if current != self.current_image_path:
+            media_loader.stop_video(self)
+            self.load_image()
+        else:
+            self._schedule_ahead()
 
     def move_image(self, target_folder):
+        with tracing.span("action.move", self.current_image_path):
+            self._move_image(target_folder)
+
+    def _move_image(self, target_folder):
         self.refocus_app()
         media_loader.stop_video(self)
 
+        if not self.current_image_path:
+            return
+
+        # The current item plus any range selected after it, as one batch.
+        paths = self.images[self.index:self.index + self.selection]
         try:
-            result = self.router.move(self.current_image_path, target_folder, on_collision="error")
+            with tracing.span("router.plan_batch"):
+                plans = self.router.plan_batch(
+                    paths, target_folder,
+                    on_collision="error", drop_identical=True,
+                )
         except FileExistsError:
             dialogs.show_file_exists_error()
             return
@@ -146,11 +423,49 @@ class PhotoSorterApp:
             dialogs.show_move_failed_error(str(e))
             return
 
-        self.undo.push_move(moved_to=result.dst, restore_to=result.src)
-
-        self.index += 1
+        actions = []
+        dropped = 0
+        for result in plans:
+            if result.duplicate_of is not None:
+                # Identical file already sorted there: drop this copy quietly.
+                self.file_ops.submit(result, kind="delete")
+                actions.append(UndoAction(type="delete", src=result.dst, dst=result.src))
+                dropped += 1
+            else:
+                self.file_ops.submit(result)
+                actions.append(UndoAction(type="move", src=result.dst, dst=result.src))
+                self._learn_move(result.src, result.dst, target_folder)
+            self.prefetcher.invalidate(result.src)
+        self.undo.push_batch(actions)
+
+        self.folder_index.touch(target_folder)
+        if self.folder_search_var.get():
+            self.folder_search_var.set("")
+        else:
+            self.filter_folders()
+
+        if dropped:
+            self.status_label.config(text=f"{dropped} identical copy(s) already in {target_folder.name}; trashed")
+
+        self.index += len(plans)
         self.load_image()
 
+    def set_selection(self, count):
+        """Select the current item and the next count-1 upcoming ones."""
+        self.selection = max(1, min(count, len(self.images) - self.index))
+        if self.selection > 1:
+            last = self.images[self.index + self.selection - 1].name
+            self.selection_label.config(text=f"{self.selection} selected (through {last})")
+        else:
+            self.selection_label.config(text="")
+        self.filmstrip.highlight(self.selection - 1)
+
+    def select_next_k(self):
+        k = dialogs.ask_selection_count(self.root)
+        self.refocus_app()
+        if k:
+            self.set_selection(k)
+
     def create_new_folder(self):
         name = dialogs.ask_new_folder_name(self.root)
         
@@ -162,28 +477,324 @@ class PhotoSorterApp:
         new_folder = self.source_dir / name
         try:
             new_folder.mkdir()
-            self.refresh_folder_buttons()
+            self.add_folder_button(new_folder)
         except FileExistsError:
             dialogs.show_folder_exists_error()
 
     def undo_last_action(self):
         if not self._try_lock():
             return
+        media_loader.stop_video(self)
+        self._undo_when_landed(1)
+
+    def undo_last_actions(self):
+        """Undo the last N actions in one batched pass, with a single render."""
+        n = dialogs.ask_undo_count(self.root)
+        self.refocus_app()
+        if not n or not self._try_lock():
+            return
+        media_loader.stop_video(self)
+        self._undo_when_landed(n)
+
+    def _undo_when_landed(self, n, waited=False):
+        """
+        Undo the last `n` actions once none of their files is being copied
+        any more. Moves still queued are withdrawn; one already running
+        can't be, and its file has to land before it can go back, so this
+        checks again shortly instead of waiting on the Tk thread.
+        """
+        running = False
+        for action in self.undo.peek(n):
+            for child in action.expand():
+                op = self.file_ops.find(child.src)
+                if op is not None and not self.file_ops.cancel(op):
+                    running = True
+        if running:
+            self.status_label.config(text="Undo waits for a move to finish…")
+            self.root.after(50, lambda: self._undo_when_landed(n, True))
+            return
 
         try:
-            media_loader.stop_video(self)
+            if waited:
+                self.status_label.config(text="")
+            # Withdrawn moves never happened: their files are skipped.
+            actions = self.undo.undo_many(n)
+            if actions:
+                with tracing.span("action.undo"):
+                    self._reverse([a for action in actions for a in action.expand()])
+                    self.load_image()
+        finally:
+            self.root.after(80, self._unlock)
 
-            action = self.undo.undo()
-            if action is None:
+    def _reverse(self, actions):
+        """Put files back for popped undo actions (most recent first); no move of theirs is pending."""
+        failed = []
+        with tracing.span("undo.apply"):
+            applied = self.undo.apply_many(actions, failed)
+        # Whatever couldn't be moved back stays undoable; the rest is done.
+        self.undo.commit_undo([action for action, _ in failed])
+        if failed:
+            dialogs.show_undo_failed_error(len(failed), str(failed[0][1]))
+            stuck = {id(action) for action, _ in failed}
+            actions = [action for action in actions if id(action) not in stuck]
+        for action in applied:
+            self.router.forget(action.src)
+        for action in actions:
+            if action.type == "move":
+                self.folder_suggester.forget(action.src)
+
+        for action in actions:
+            self.prefetcher.invalidate(action.src, action.dst)
+            # Step back onto the restored file; after a resumed session it
+            # isn't in the list yet, so put it back in front.
+            if self.index > 0 and self.images[self.index - 1] == action.dst:
+                self.index -= 1
+            elif action.dst not in self.images[self.index:self.index + 1]:
+                self.images.insert(self.index, action.dst)
+
+    def _run_in_background(self, name, fn, on_done):
+        """
+        Run fn() on a worker thread and hand its result to on_done() on the
+        Tk thread, unless the source folder changed in the meantime.
+        """
+        source = self.source_dir
+        box = {}
+
+        def run():
+            try:
+                box["result"] = fn()
+            except Exception as e:
+                print(f"{name.upper()} ERROR:", e)
+                box["result"] = None
+
+        def poll():
+            if self.source_dir != source:
                 return
-
-            self.undo.apply(action)
-
-            self.index = max(self.index - 1, 0)
+            if "result" not in box:
+                self.root.after(200, poll)
+            elif box["result"] is not None:
+                on_done(box["result"])
+
+        threading.Thread(target=run, name=name, daemon=True).start()
+        poll()
+
+    def _start_dedupe(self):
+        """Hash source vs target folders in the background (see dedupe.py)."""
+        router = self.router
+        folders = list(self.folder_index.folders)
+
+        def done(result):
+            self.duplicates = result
+            self._show_duplicate_hint()
+
+        self._run_in_background(
+            "dedupe", lambda: find_sorted_duplicates(router, folders, self.hash_store), done
+        )
+
+    def _start_indexing(self):
+        """Read capture time etc. for every item; only new/changed files cost anything."""
+        paths = list(self.images)
+
+        def done(result):
+            self.media_info = result
+            if self.sort_order != "Name":
+                self._apply_sort_order()
+            self._start_burst_analysis()
+
+        self._run_in_background("metadata", lambda: self.metadata_index.index(paths), done)
+
+    def _start_burst_analysis(self):
+        """Hash and score every image, then group bursts by capture time and hash (see bursts.py)."""
+        paths = list(self.images)
+        dates = {p: info.date for p, info in self.media_info.items()}
+
+        def analyse():
+            signatures = self.signature_index.index(paths)
+            return signatures, find_bursts(signatures, dates)
+
+        def done(result):
+            self.signatures, groups = result
+            self.bursts = {p: group for group in groups for p in group}
+            self._show_burst_hint()
+
+        self._run_in_background("bursts", analyse, done)
+
+    def set_sort_order(self, order):
+        self.sort_order = order
+        self._apply_sort_order()
+
+    def _apply_sort_order(self):
+        """Re-order the items after the current one; what's on screen stays."""
+        if order_key := SORT_ORDERS.get(self.sort_order):
+            info = self.media_info
+            known = [p for p in self.images[self.index + 1:] if p in info]
+            unknown = [p for p in self.images[self.index + 1:] if p not in info]
+            known.sort(key=lambda p: order_key(info[p]))
+            self.images[self.index + 1:] = known + sorted(unknown)
+            self._schedule_ahead()
+
+    def _show_duplicate_hint(self):
+        copies = self.duplicates.get(self.current_image_path)
+        if copies:
+            folders = ", ".join(sorted({p.parent.name for p in copies}))
+            self.duplicate_label.config(text=f"Already sorted into {folders}")
+        else:
+            self.duplicate_label.config(text="")
+
+    def _load_suggestions(self):
+        """Read what earlier sessions sorted into this folder's targets."""
+        folders = list(self.folder_index.folders)
+        self._run_in_background(
+            "suggestions", lambda: self.folder_suggester.load(folders), lambda _: self._show_suggestions()
+        )
+
+    def _camera_and_time(self, path):
+        """(camera, capture timestamp) from the metadata index, either None if unknown."""
+        info = self.media_info.get(path)
+        if info is None:
+            return None, None
+        camera = " ".join(filter(None, (info.make, info.model))) or None
+        return camera, info.captured.timestamp() if info.captured else None
+
+    def _learn_move(self, src, dst, folder):
+        self.folder_suggester.learn(dst, folder, self.features.get(src), *self._camera_and_time(src))
+
+    def _show_suggestions(self):
+        path = self.current_image_path
+        suggestions = []
+        if path is not None:
+            vector = self.features.get(path)
+            with tracing.span("suggest.rank", path):
+                ranked = self.folder_suggester.rank(vector, *self._camera_and_time(path))
+            existing = set(self.folder_index.folders)
+            suggestions = [f for f in ranked if f in existing]
+            # Colour isn't in yet: rank again once the prefetcher has it.
+            self._suggestion_pending = path if vector is None else None
+
+        self.suggestions = suggestions
+        for i, button in enumerate(self.suggestion_buttons):
+            if i < len(suggestions):
+                button.config(text=f"{i + 1} · {suggestions[i].name}", state="normal")
+            else:
+                button.config(text="", state="disabled")
+
+    def move_to_suggestion(self, n):
+        if n < len(self.suggestions):
+            self.move_image(self.suggestions[n])
+
+    def pending_burst(self):
+        """Frames of the current item's burst that haven't been sorted yet."""
+        group = self.bursts.get(self.current_image_path)
+        if not group:
+            return []
+        upcoming = set(self.images[self.index:])
+        return [p for p in group if p in upcoming]
+
+    def _show_burst_hint(self):
+        frames = self.pending_burst()
+        if len(frames) > 1:
+            best = sharpest(frames, self.signatures)
+            note = "this is the sharpest" if best == self.current_image_path else f"sharpest {best.name}"
+            self.burst_label.config(text=f"Burst of {len(frames)}, {note}")
+        else:
+            self.burst_label.config(text="")
+
+    def _poll_file_ops(self):
+        # Checked before draining: every event of a finished queue is in.
+        idle = not self.file_ops.has_pending()
+        for event in self.file_ops.poll():
+            op = event.op
+            if event.status == "progress" and op.total_bytes:
+                pct = int(100 * op.done_bytes / op.total_bytes)
+                self.status_label.config(text=f"Moving {op.plan.src.name}… {pct}%")
+            elif event.status == "failed":
+                self.status_label.config(text="")
+                self._restore_failed_move(op.plan, event.error)
+            elif not self.file_ops.has_pending():
+                self.status_label.config(text="")
+            if event.status == "done" and op.kind == "delete":
+                enforce_trash_quota(self)
+        if idle and self._when_ops_idle is not None:
+            self.root.after_idle(self._when_ops_idle)
+            self._when_ops_idle = None
+
+        self.filmstrip.poll()
+
+        pending = self._suggestion_pending
+        if pending is not None and pending == self.current_image_path and pending in self.features:
+            self._show_suggestions()
+
+        for event in self.purger.poll():
+            if event[0] == "purged":
+                self.undo.discard(event[1])
+            elif event[0] == "progress":
+                self.status_label.config(text=f"Emptying trash… {event[1]}/{event[2]}")
+            elif event[0] == "finished":
+                if self.purger.total:
+                    self.status_label.config(text="")
+                callback, self._purge_finished = self._purge_finished, None
+                if callback is not None:
+                    callback(event[1])
+
+        self.root.after(100, self._poll_file_ops)
+
+    def _restore_failed_move(self, plan, error):
+        """A background move failed: the file is still at its source, show it again."""
+        self.undo.discard(plan.dst)
+        dialogs.show_move_failed_error(f"{plan.src.name}: {error}")
+
+        if plan.src in self.images:
+            pos = self.images.index(plan.src)
+            del self.images[pos]
+            if pos < self.index:
+                self.index -= 1
+            self.images.insert(self.index, plan.src)
+            media_loader.stop_video(self)
             self.load_image()
 
-        finally:
-            self.root.after(80, self._unlock)
+    def save_checkpoint(self, background=False):
+        """Record the remaining items so the next launch can skip the scan."""
+        if self._scan is not None or not self.images or self.index >= len(self.images):
+            return
+        state = (self.source_dir, self.index, len(self.images), self.images[self.index])
+        if state == self._checkpointed:
+            return
+        try:
+            mtime_ns = self.source_dir.stat().st_mtime_ns
+        except OSError as e:
+            print("CHECKPOINT ERROR:", e)
+            return
+        self._checkpointed = state
+        # Copies: the Tk thread keeps changing the lists.
+        args = (self.router, self.images[self.index:], list(self.folder_index.folders), self.sort_order, mtime_ns)
+
+        def write():
+            try:
+                taken = checkpoint.take_checkpoint(*args)
+                # Items sorted meanwhile may be missing from the listing
+                # but not from `remaining`: leave it to the next save.
+                if (self.source_dir, self.index, len(self.images)) == state[:3]:
+                    checkpoint.save_checkpoint(taken)
+                else:
+                    self._checkpointed = None
+            except OSError as e:
+                print("CHECKPOINT ERROR:", e)
+                self._checkpointed = None
+
+        if background:
+            # The listing and digest take a while on big or network folders.
+            self.checkpoint_pool.submit(write)
+        else:
+            write()
+
+    def _autosave_checkpoint(self):
+        if self._closing:
+            return  # shutdown() saves one last time
+        # Only while no moves are in flight: they would change the folder's
+        # mtime right after it was recorded.
+        if not self.file_ops.has_pending():
+            self.save_checkpoint(background=True)
+        self.root.after(CHECKPOINT_INTERVAL_MS, self._autosave_checkpoint)
 
     def _try_lock(self):
         if self._action_lock:
@@ -200,15 +811,47 @@ class PhotoSorterApp:
         self.root.after(10, lambda: self.root.attributes("-topmost", False))
         self.root.focus_force()
 
+    def shutdown(self):
+        """Stop background work and close the app; every way out goes through here."""
+        if self._closing:
+            # Closing again while the trash is being emptied cancels it;
+            # whatever wasn't purged stays undoable next session.
+            self.purger.cancel()
+            return
+        self._closing = True
+
+        self._stop_watching()
+        self.file_ops.shutdown(wait=True)
+        self.prefetcher.shutdown()
+        self.filmstrip.close()
+        self.zoom_pool.shutdown(wait=False, cancel_futures=True)
+        if self.decode_service is not None:
+            self.decode_service.shutdown()
+        # Let an autosave in flight land first, so it can't overwrite this one.
+        self.checkpoint_pool.shutdown(wait=True)
+        self.save_checkpoint()
+        if self.purger.busy:
+            # A purge (over quota, say) is still running: stop it and close
+            # once it has; whatever wasn't purged stays undoable next session.
+            self._purge_finished = self._finish
+            self.purger.cancel()
+            return
+        # Mid-sort, the private trash stays so the journal can still undo
+        # deletes next time; it is purged when a folder is fully sorted.
+        if self.source_dir is not None and self._scan is None and self.index >= len(self.images):
+            cleanup_private_trash(self, on_finished=self._finish)
+        else:
+            self._finish()
+
+    def _finish(self, cancelled=False):
+        self.undo.journal.close()
+        trace_file = tracing.dump()
+        if trace_file is not None:
+            print("Latency stats written to", trace_file)
+        self.root.destroy()
+
 if __name__ == "__main__":
+    enable_dpi_awareness()
     root = tk.Tk()
     app = PhotoSorterApp(root)
-
-    from cleanup import cleanup_private_trash
-
-    def on_close():
-        cleanup_private_trash(app)
-        root.destroy()
-    root.protocol("WM_DELETE_WINDOW", on_close)
-
     root.mainloop()
\ No newline at end of file
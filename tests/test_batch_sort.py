@@ -0,0 +1,108 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from batch_sort import Rule, load_rules, plan
+from file_routing import FileRouter
+from metadata import MediaInfo
+
+
+def _rules_file(tmp_path, rules):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": rules}), encoding="utf-8")
+    return path
+
+
+def _info(path, size=100, captured=datetime(2024, 3, 9, 10, 0), make=None, model=None):
+    return MediaInfo(path=path, size=size, mtime=0.0, captured=captured, make=make, model=model)
+
+
+# --- load_rules ---------------------------------------------------------------
+
+def test_load_rules(tmp_path):
+    rules = load_rules(_rules_file(tmp_path, [
+        {"match": {"ext": [".PNG"], "name": "Screenshot*"}, "target": "Screenshots"},
+        {"match": {"after": "2024-01-01", "min_size": 10}, "target": "{year}/{month}"},
+    ]))
+    assert rules == [
+        Rule(target="Screenshots", ext=(".png",), name="Screenshot*"),
+        Rule(target="{year}/{month}", after=datetime(2024, 1, 1), min_size=10),
+    ]
+
+
+@pytest.mark.parametrize("rule, message", [
+    ({"match": {}}, "target"),
+    ({"target": "X", "match": {"colour": "red"}}, "unknown match key"),
+    ({"target": "X", "match": {"min_size": "big"}}, "min_size"),
+    ({"target": "X", "match": {"after": "March"}}, "YYYY-MM-DD"),
+    ({"target": "{year}/{lens}"}, "unknown placeholder {lens}"),
+    ({"target": "{}"}, "bad target"),
+    ({"target": "{year"}, "bad target"),
+    ({"target": "."}, "inside the source folder"),
+    ({"target": ".."}, "inside the source folder"),
+    ({"target": "Phone/../../Elsewhere"}, "inside the source folder"),
+    ({"target": "/tmp/Photos"}, "inside the source folder"),
+])
+def test_load_rules_rejects(tmp_path, rule, message):
+    with pytest.raises(ValueError, match="rule 1: .*" + message.replace("{", r"\{").replace("}", r"\}")):
+        load_rules(_rules_file(tmp_path, [rule]))
+
+
+# --- Rule.matches -------------------------------------------------------------
+
+def test_rule_matches(tmp_path):
+    shot = _info(tmp_path / "Screenshot 1.PNG", size=500, make="Apple", model="iPhone 15")
+    rule = Rule(target="X", ext=(".png",), name="screenshot*", camera="*iphone*",
+                after=datetime(2024, 1, 1), before=datetime(2025, 1, 1), min_size=100, max_size=1000)
+    assert rule.matches(shot)
+    assert not Rule(target="X", ext=(".jpg",)).matches(shot)
+    assert not Rule(target="X", name="IMG*").matches(shot)
+    assert not Rule(target="X", camera="*Canon*").matches(shot)
+    assert not Rule(target="X", after=datetime(2024, 3, 10)).matches(shot)
+    assert not Rule(target="X", before=datetime(2024, 3, 9)).matches(shot)
+    assert not Rule(target="X", min_size=501).matches(shot)
+    assert not Rule(target="X", max_size=499).matches(shot)
+
+
+def test_rule_matches_falls_back_to_mtime(tmp_path):
+    info = MediaInfo(path=tmp_path / "a.jpg", size=1, mtime=datetime(2020, 6, 1).timestamp())
+    assert Rule(target="X", before=datetime(2021, 1, 1)).matches(info)
+
+
+# --- plan ---------------------------------------------------------------------
+
+def test_plan_without_creating_folders(tmp_path):
+    for name in ("a.png", "b.jpg", "c.jpg"):
+        (tmp_path / name).write_bytes(b"x")
+    rules = [
+        Rule(target="Screens", ext=(".png",)),
+        Rule(target="{camera}/{year}-{month}", camera="*"),
+    ]
+    infos = [
+        _info(tmp_path / "a.png"),
+        _info(tmp_path / "b.jpg", make="Canon", model="EOS R/6"),
+        _info(tmp_path / "c.jpg"),
+    ]
+    plans = plan(FileRouter(tmp_path), rules, infos, create=False)
+    assert [(p.src.name, p.dst.relative_to(tmp_path).as_posix()) for p in plans] == [
+        ("a.png", "Screens/a.png"),
+        ("b.jpg", "Canon EOS R-6/2024-03/b.jpg"),
+        ("c.jpg", "Unknown/2024-03/c.jpg"),
+    ]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.png", "b.jpg", "c.jpg"]
+
+
+def test_plan_resolves_every_target_before_creating_any(tmp_path):
+    outside = tmp_path / "outside"
+    source = tmp_path / "source"
+    outside.mkdir()
+    source.mkdir()
+    (source / "Link").symlink_to(outside, target_is_directory=True)
+    for name in ("a.jpg", "b.jpg"):
+        (source / name).write_bytes(b"x")
+    rules = [Rule(target="New", name="a*"), Rule(target="Link/Sub", name="b*")]
+    infos = [_info(source / "a.jpg"), _info(source / "b.jpg")]
+    with pytest.raises(ValueError, match="escapes"):
+        plan(FileRouter(source), rules, infos)
+    assert not (source / "New").exists()
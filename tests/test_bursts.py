@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from bursts import BKTree, Signature, dhash, find_bursts, hamming, phash
+
+T0 = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def _sig(dh=0, ph=0, sharpness=1.0):
+    return Signature(dh, ph, sharpness)
+
+
+def _names(groups):
+    return sorted(tuple(p.name for p in g) for g in groups)
+
+
+# --- hashes -------------------------------------------------------------------
+
+def test_dhash_gradients():
+    rising = np.tile(np.arange(9, dtype=np.uint8), (8, 1))
+    falling = rising[:, ::-1].copy()
+    flat = np.full((8, 9), 7, dtype=np.uint8)
+    assert dhash(np.stack([rising, falling, flat])) == [2 ** 64 - 1, 0, 0]
+
+
+def _smooth_field(rng):
+    return cv2.resize(rng.integers(40, 220, (6, 6)).astype(np.float32), (32, 32), interpolation=cv2.INTER_CUBIC)
+
+
+def test_phash_is_stable_under_brightness_and_noise():
+    rng = np.random.default_rng(0)
+    base = _smooth_field(rng)
+    other = _smooth_field(rng)
+    noisy = base + rng.normal(0, 2, base.shape)
+    h = phash(np.clip(np.stack([base, base + 20, noisy, other]), 0, 255).astype(np.uint8))
+    assert h[0] == h[1]
+    assert hamming(h[0], h[2]) <= 6
+    assert hamming(h[0], h[3]) > 16
+
+
+# --- BKTree -------------------------------------------------------------------
+
+def test_bktree_query_matches_brute_force():
+    rng = np.random.default_rng(1)
+    hashes = [int(h) for h in rng.integers(0, 2 ** 63, size=300, dtype=np.int64)]
+    # A few near copies, so small radii find something.
+    hashes += [h ^ (1 << bit) for h, bit in zip(hashes[:20], range(20))]
+    tree = BKTree()
+    for i, h in enumerate(hashes):
+        tree.add(h, i)
+    for probe in hashes[:25]:
+        for radius in (0, 1, 3, 20):
+            expected = {i for i, h in enumerate(hashes) if hamming(probe, h) <= radius}
+            assert set(tree.query(probe, radius)) == expected
+
+
+def test_bktree_empty_and_duplicates():
+    tree = BKTree()
+    assert tree.query(0, 64) == []
+    tree.add(5, "a")
+    tree.add(5, "b")
+    assert sorted(tree.query(5, 0)) == ["a", "b"]
+
+
+# --- find_bursts --------------------------------------------------------------
+
+def test_consecutive_close_frames_make_a_burst():
+    paths = [Path(f"IMG_{i}.jpg") for i in range(4)]
+    signatures = {p: _sig(dh=i, ph=0xFFFF << (16 * i)) for i, p in enumerate(paths)}
+    dates = {p: T0 + timedelta(seconds=i) for i, p in enumerate(paths)}
+    # The last frame is too long after the others.
+    dates[paths[3]] = T0 + timedelta(seconds=30)
+    assert _names(find_bursts(signatures, dates)) == [("IMG_0.jpg", "IMG_1.jpg", "IMG_2.jpg")]
+
+
+def test_adjacent_frames_need_close_dhashes():
+    a, b = Path("a.jpg"), Path("b.jpg")
+    signatures = {a: _sig(dh=0, ph=0), b: _sig(dh=2 ** 64 - 1, ph=2 ** 64 - 1)}
+    dates = {a: T0, b: T0 + timedelta(seconds=1)}
+    assert find_bursts(signatures, dates) == []
+
+
+def test_near_duplicates_join_across_other_shots():
+    a, other, b = Path("a.jpg"), Path("other.jpg"), Path("b.jpg")
+    signatures = {a: _sig(dh=0, ph=0b1), other: _sig(dh=2 ** 64 - 1, ph=2 ** 64 - 1), b: _sig(dh=0, ph=0b11)}
+    dates = {a: T0, other: T0 + timedelta(seconds=1), b: T0 + timedelta(seconds=20)}
+    assert _names(find_bursts(signatures, dates)) == [("a.jpg", "b.jpg")]
+
+
+def test_slow_series_does_not_chain_into_one_group():
+    # A timelapse: every frame a near duplicate of the next, one a minute.
+    paths = [Path(f"lapse_{i:02}.jpg") for i in range(30)]
+    signatures = {p: _sig(dh=2 ** 64 - 1 if i % 2 else 0, ph=(1 << (i % 4)) - 1) for i, p in enumerate(paths)}
+    dates = {p: T0 + timedelta(minutes=i) for i, p in enumerate(paths)}
+    groups = find_bursts(signatures, dates)
+    for g in groups:
+        span = dates[g[-1]] - dates[g[0]]
+        assert span <= timedelta(seconds=60)
+
+
+def test_undated_frames_are_not_grouped():
+    a, b = Path("a.jpg"), Path("b.jpg")
+    signatures = {a: _sig(), b: _sig()}
+    assert find_bursts(signatures, {}) == []
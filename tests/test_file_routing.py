@@ -0,0 +1,131 @@
+import os
+
+import pytest
+
+import file_routing
+from dedupe import HashStore
+from file_routing import INLINE_COMPARE_BYTES, FileRouter, FolderNames
+
+
+@pytest.fixture
+def source(tmp_path):
+    src = tmp_path / "src"
+    (src / "Keepers").mkdir(parents=True)
+    return src
+
+
+# --- FolderNames --------------------------------------------------------------
+
+def test_next_free_numbers_copies(tmp_path):
+    names = FolderNames(tmp_path)
+    assert names.next_free("a.jpg") == "a.jpg"
+    names.add("a.jpg")
+    assert names.next_free("a.jpg") == "a (2).jpg"
+    names.add("a (2).jpg")
+    assert names.next_free("a.jpg") == "a (3).jpg"
+    # A copy's copy continues the same family.
+    assert names.next_free("a (2).jpg") == "a (3).jpg"
+
+
+def test_next_free_continues_after_the_highest_copy(tmp_path):
+    for name in ("a.jpg", "a (7).jpg"):
+        (tmp_path / name).write_bytes(b"x")
+    assert FolderNames(tmp_path).next_free("a.jpg") == "a (8).jpg"
+
+
+def test_discard_frees_a_name(tmp_path):
+    names = FolderNames(tmp_path)
+    names.add("a.jpg")
+    names.discard("a.jpg")
+    assert "a.jpg" not in names
+    assert names.next_free("a.jpg") == "a.jpg"
+
+
+def test_case_sensitive_folder_keeps_spellings_apart(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_routing, "_case_insensitive", lambda folder, listing: False)
+    (tmp_path / "IMG.JPG").write_bytes(b"x")
+    names = FolderNames(tmp_path)
+    assert "img.jpg" not in names
+    assert names.next_free("img.jpg") == "img.jpg"
+
+
+def test_case_insensitive_folder_folds_names(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_routing, "_case_insensitive", lambda folder, listing: True)
+    (tmp_path / "IMG.JPG").write_bytes(b"x")
+    (tmp_path / "img (2).jpg").write_bytes(b"x")
+    names = FolderNames(tmp_path)
+    assert "img.jpg" in names
+    assert names.existing("img.jpg") == "IMG.JPG"
+    assert names.next_free("Img.jpg") == "Img (3).jpg"
+
+
+def test_case_probe_on_a_case_sensitive_filesystem(tmp_path):
+    (tmp_path / "Photo.jpg").write_bytes(b"x")
+    # The swapped spelling isn't there, unless the filesystem folds case.
+    expected = os.path.exists(tmp_path / "pHOTO.JPG")
+    assert file_routing._case_insensitive(tmp_path, ["Photo.jpg"]) == expected
+
+
+# --- FileRouter reservations ---------------------------------------------------
+
+def test_planned_names_are_reserved_until_released(source):
+    for name in ("a.jpg", "b/a.jpg"):
+        (source / name).parent.mkdir(exist_ok=True)
+        (source / name).write_bytes(name.encode())
+    router = FileRouter(source)
+    keepers = source / "Keepers"
+
+    first = router.plan_move(source / "a.jpg", keepers, on_collision="rename")
+    second = router.plan_move(source / "b" / "a.jpg", keepers, on_collision="rename")
+    assert (first.dst.name, second.dst.name) == ("a.jpg", "a (2).jpg")
+    with pytest.raises(FileExistsError):
+        router.plan_move(source / "a.jpg", keepers)
+
+    router.release(first.dst)     # never moved
+    assert router.plan_move(source / "a.jpg", keepers).dst.name == "a.jpg"
+
+
+def test_plan_batch_is_all_or_nothing(source):
+    keepers = source / "Keepers"
+    (keepers / "b.jpg").write_bytes(b"old")
+    for name in ("a.jpg", "b.jpg"):
+        (source / name).write_bytes(b"new")
+    router = FileRouter(source)
+    with pytest.raises(FileExistsError):
+        router.plan_batch([source / "a.jpg", source / "b.jpg"], keepers)
+    assert router.plan_move(source / "a.jpg", keepers).dst.name == "a.jpg"
+
+
+# --- drop_identical -----------------------------------------------------------
+
+def test_identical_small_file_goes_to_the_trash(source):
+    (source / "a.jpg").write_bytes(b"same")
+    (source / "Keepers" / "a.jpg").write_bytes(b"same")
+    plan = FileRouter(source).plan_move(source / "a.jpg", source / "Keepers", drop_identical=True)
+    assert plan.duplicate_of == source / "Keepers" / "a.jpg"
+    assert plan.dst.parent.name == file_routing.PRIVATE_TRASH_NAME
+
+
+def test_different_small_file_is_a_collision(source):
+    (source / "a.jpg").write_bytes(b"this")
+    (source / "Keepers" / "a.jpg").write_bytes(b"that")
+    plan = FileRouter(source).plan_move(source / "a.jpg", source / "Keepers", on_collision="rename", drop_identical=True)
+    assert plan.duplicate_of is None and plan.dst.name == "a (2).jpg"
+
+
+def test_big_file_needs_hashes_to_be_dropped(source, tmp_path):
+    data = os.urandom(INLINE_COMPARE_BYTES + 1)
+    src, existing = source / "a.jpg", source / "Keepers" / "a.jpg"
+    src.write_bytes(data)
+    existing.write_bytes(data)
+
+    # Not hashed yet: a plain collision, without reading the files.
+    store = HashStore(tmp_path / "hashes.sqlite3")
+    router = FileRouter(source, hash_store=store)
+    assert router.plan_move(src, source / "Keepers", on_collision="rename", drop_identical=True).duplicate_of is None
+
+    for path in (src, existing):
+        store.save(path, os.stat(path), "edge", "full")
+    router = FileRouter(source, hash_store=store)
+    assert router.plan_move(src, source / "Keepers", drop_identical=True).duplicate_of == existing
+    store.close()
@@ -0,0 +1,265 @@
+import os
+import sys
+
+import pytest
+
+from file_routing import FileRouter
+from folder_panel import FolderIndex
+from folder_watch import DirEvent, InotifyWatcher, PollingWatcher, apply_event
+
+linux_only = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    src = tmp_path / "src"
+    elsewhere = tmp_path / "elsewhere"
+    src.mkdir()
+    elsewhere.mkdir()
+    return src, elsewhere
+
+
+def _bump_mtime(folder):
+    # Polling keys off the folder's mtime; make sure each step changes it
+    # even on filesystems with coarse timestamps.
+    st = os.stat(folder)
+    os.utime(folder, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def _kinds(events):
+    return [(e.kind, e.path.name, e.is_dir, e.old.name if e.old else None) for e in events]
+
+
+# --- PollingWatcher -----------------------------------------------------------
+
+def test_polling_create(dirs):
+    src, _ = dirs
+    w = PollingWatcher(src)
+    (src / "a.jpg").write_bytes(b"x")
+    _bump_mtime(src)
+    assert _kinds(w.poll()) == [("added", "a.jpg", False, None)]
+    assert w.poll() == []
+
+
+def test_polling_mkdir(dirs):
+    src, _ = dirs
+    w = PollingWatcher(src)
+    (src / "Keepers").mkdir()
+    _bump_mtime(src)
+    assert _kinds(w.poll()) == [("added", "Keepers", True, None)]
+
+
+def test_polling_rename_within(dirs):
+    src, _ = dirs
+    (src / "a.jpg").write_bytes(b"x")
+    w = PollingWatcher(src)
+    os.rename(src / "a.jpg", src / "b.jpg")
+    _bump_mtime(src)
+    # A snapshot diff can't pair the names up.
+    assert _kinds(w.poll()) == [("removed", "a.jpg", False, None), ("added", "b.jpg", False, None)]
+
+
+def test_polling_rename_out(dirs):
+    src, elsewhere = dirs
+    (src / "a.jpg").write_bytes(b"x")
+    w = PollingWatcher(src)
+    os.rename(src / "a.jpg", elsewhere / "a.jpg")
+    _bump_mtime(src)
+    assert _kinds(w.poll()) == [("removed", "a.jpg", False, None)]
+
+
+def test_polling_delete(dirs):
+    src, _ = dirs
+    (src / "a.jpg").write_bytes(b"x")
+    (src / "Old").mkdir()
+    w = PollingWatcher(src)
+    os.remove(src / "a.jpg")
+    os.rmdir(src / "Old")
+    _bump_mtime(src)
+    assert sorted(_kinds(w.poll())) == [("removed", "Old", True, None), ("removed", "a.jpg", False, None)]
+
+
+def test_polling_uses_given_entries(dirs):
+    src, _ = dirs
+    (src / "a.jpg").write_bytes(b"x")
+    w = PollingWatcher(src, entries={})
+    _bump_mtime(src)
+    assert _kinds(w.poll()) == [("added", "a.jpg", False, None)]
+
+
+# --- InotifyWatcher -----------------------------------------------------------
+
+@pytest.fixture
+def inotify(dirs):
+    watchers = []
+
+    def make(folder):
+        w = InotifyWatcher(folder)
+        watchers.append(w)
+        return w
+
+    yield make
+    for w in watchers:
+        w.close()
+
+
+@linux_only
+def test_inotify_create(dirs, inotify):
+    src, _ = dirs
+    w = inotify(src)
+    (src / "a.jpg").write_bytes(b"x")
+    assert w.poll() == [DirEvent("added", src / "a.jpg", False)]
+    assert w.poll() == []
+
+
+@linux_only
+def test_inotify_mkdir(dirs, inotify):
+    src, _ = dirs
+    w = inotify(src)
+    (src / "Keepers").mkdir()
+    assert w.poll() == [DirEvent("added", src / "Keepers", True)]
+
+
+@linux_only
+def test_inotify_rename_within(dirs, inotify):
+    src, _ = dirs
+    (src / "a.jpg").write_bytes(b"x")
+    w = inotify(src)
+    os.rename(src / "a.jpg", src / "b.jpg")
+    assert w.poll() == [DirEvent("renamed", src / "b.jpg", False, old=src / "a.jpg")]
+
+
+@linux_only
+def test_inotify_rename_out(dirs, inotify):
+    src, elsewhere = dirs
+    (src / "a.jpg").write_bytes(b"x")
+    w = inotify(src)
+    os.rename(src / "a.jpg", elsewhere / "a.jpg")
+    assert w.poll() == [DirEvent("removed", src / "a.jpg", False)]
+
+
+@linux_only
+def test_inotify_delete(dirs, inotify):
+    src, _ = dirs
+    (src / "a.jpg").write_bytes(b"x")
+    (src / "Old").mkdir()
+    w = inotify(src)
+    os.remove(src / "a.jpg")
+    os.rmdir(src / "Old")
+    assert w.poll() == [DirEvent("removed", src / "a.jpg", False), DirEvent("removed", src / "Old", True)]
+
+
+@linux_only
+def test_inotify_moved_out_and_back_in_one_read(dirs, inotify):
+    # An undo moves a sorted file back before the next poll: the removal
+    # must come first, so the file ends up present.
+    src, elsewhere = dirs
+    (src / "a.jpg").write_bytes(b"x")
+    w = inotify(src)
+    os.rename(src / "a.jpg", elsewhere / "a.jpg")
+    os.rename(elsewhere / "a.jpg", src / "a.jpg")
+    assert w.poll() == [DirEvent("removed", src / "a.jpg", False), DirEvent("added", src / "a.jpg", False)]
+
+
+# --- apply_event --------------------------------------------------------------
+
+@pytest.fixture
+def sorting(dirs):
+    """A source folder being sorted: a.jpg .. d.jpg, with c.jpg on screen."""
+    src, _ = dirs
+    for name in ("a.jpg", "b.jpg", "c.jpg", "d.jpg"):
+        (src / name).write_bytes(b"x")
+    (src / "Keepers").mkdir()
+    images = [src / n for n in ("a.jpg", "b.jpg", "c.jpg", "d.jpg")]
+    folders = FolderIndex()
+    folders.set_folders([src / "Keepers"])
+    return src, images, 2, folders, FileRouter(src)
+
+
+def _apply(events, images, index, folders, router):
+    delta = None
+    for event in events:
+        delta = apply_event(event, images, index, folders, router, delta)
+    return delta
+
+
+def test_apply_added_goes_among_upcoming_items(sorting):
+    src, images, index, folders, router = sorting
+    w = PollingWatcher(src)
+    (src / "bb.jpg").write_bytes(b"x")
+    (src / "cc.jpg").write_bytes(b"x")
+    _bump_mtime(src)
+    delta = _apply(w.poll(), images, index, folders, router)
+    # Never before the item on screen, even if it sorts earlier.
+    assert [p.name for p in images] == ["a.jpg", "b.jpg", "c.jpg", "bb.jpg", "cc.jpg", "d.jpg"]
+    assert delta.items_changed and not delta.removed
+
+
+def test_apply_added_skips_items_already_listed(sorting):
+    src, images, index, folders, router = sorting
+    delta = apply_event(DirEvent("added", src / "a.jpg", False), images, index, folders, router)
+    assert [p.name for p in images] == ["a.jpg", "b.jpg", "c.jpg", "d.jpg"]
+    assert not delta.items_changed
+
+
+def test_apply_removed_upcoming_item(sorting):
+    src, images, index, folders, router = sorting
+    w = PollingWatcher(src)
+    os.remove(src / "d.jpg")
+    _bump_mtime(src)
+    delta = _apply(w.poll(), images, index, folders, router)
+    assert [p.name for p in images] == ["a.jpg", "b.jpg", "c.jpg"]
+    assert delta.removed == [src / "d.jpg"]
+
+
+def test_apply_removed_current_item(sorting):
+    src, images, index, folders, router = sorting
+    delta = apply_event(DirEvent("removed", src / "c.jpg", False), images, index, folders, router)
+    assert [p.name for p in images] == ["a.jpg", "b.jpg", "d.jpg"]
+    assert delta.removed == [src / "c.jpg"]
+
+
+def test_apply_removed_history_item_is_kept(sorting):
+    # Items before the one on screen may come back through undo.
+    src, images, index, folders, router = sorting
+    delta = apply_event(DirEvent("removed", src / "a.jpg", False), images, index, folders, router)
+    assert [p.name for p in images] == ["a.jpg", "b.jpg", "c.jpg", "d.jpg"]
+    assert not delta.items_changed
+
+
+def test_apply_renamed_item(sorting):
+    src, images, index, folders, router = sorting
+    event = DirEvent("renamed", src / "e.jpg", False, old=src / "d.jpg")
+    delta = apply_event(event, images, index, folders, router)
+    assert [p.name for p in images] == ["a.jpg", "b.jpg", "c.jpg", "e.jpg"]
+    assert delta.removed == [src / "d.jpg"]
+
+
+def test_apply_ignores_other_files(sorting):
+    src, images, index, folders, router = sorting
+    delta = apply_event(DirEvent("added", src / "notes.txt", False), images, index, folders, router)
+    assert len(images) == 4 and not delta.items_changed
+
+
+def test_apply_mkdir_and_rmdir(sorting):
+    src, images, index, folders, router = sorting
+    w = PollingWatcher(src)
+    (src / "Beach").mkdir()
+    os.rmdir(src / "Keepers")
+    _bump_mtime(src)
+    delta = _apply(w.poll(), images, index, folders, router)
+    assert folders.folders == [src / "Beach"]
+    assert delta.folders_changed and not delta.items_changed
+
+
+def test_apply_renamed_folder(sorting):
+    src, images, index, folders, router = sorting
+    event = DirEvent("renamed", src / "Best", True, old=src / "Keepers")
+    assert apply_event(event, images, index, folders, router).folders_changed
+    assert folders.folders == [src / "Best"]
+
+
+def test_apply_ignores_private_trash(sorting):
+    src, images, index, folders, router = sorting
+    delta = apply_event(DirEvent("added", src / router.private_trash_name, True), images, index, folders, router)
+    assert folders.folders == [src / "Keepers"] and not delta.folders_changed
@@ -0,0 +1,44 @@
+from PIL import Image
+
+from thumb_cache import ThumbnailStore
+
+
+def _media(tmp_path, n):
+    paths = []
+    for i in range(n):
+        path = tmp_path / f"img{i}.png"
+        Image.new("RGB", (40, 30), (i * 40, 0, 0)).save(path)
+        paths.append(path)
+    return paths
+
+
+def test_worker_entries_count_toward_the_apps_cap(tmp_path):
+    root = tmp_path / "thumbs"
+    app = ThumbnailStore(root)
+    workers = [ThumbnailStore(root, evict=False) for _ in range(3)]
+    paths = _media(tmp_path, 6)
+
+    for i, path in enumerate(paths):
+        workers[i % 3].put(path, (20, 15), Image.new("RGB", (20, 15), (i * 40, 9, 9)))
+    sizes = []
+    for worker in workers:
+        used = worker.take_used()
+        sizes += [n for _, n in used]
+        app.record(used)
+    assert all(app.get(p, (20, 15)) is not None for p in paths)
+
+    # Room for two entries: only the app evicts, oldest first.
+    app.max_bytes = sum(sorted(sizes)[-2:])
+    app.record([])
+    assert sum(app.get(p, (20, 15)) is not None for p in paths) <= 2
+    assert sum(1 for f in root.rglob("*") if f.is_file()) <= 2
+
+
+def test_worker_store_reads_without_an_index(tmp_path):
+    root = tmp_path / "thumbs"
+    (path,) = _media(tmp_path, 1)
+    ThumbnailStore(root).put(path, (20, 15), Image.new("RGB", (20, 15)))
+    worker = ThumbnailStore(root, evict=False)
+    assert worker.get(path, (20, 15)).size == (20, 15)
+    assert [n for _, n in worker.take_used()] == [None]
+    assert worker.take_used() == []
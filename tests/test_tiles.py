@@ -0,0 +1,65 @@
+import pytest
+from PIL import Image, ImageDraw
+
+from tiles import TILE_SIZE, TiledImage, TileCache
+
+# 100 MP: past what a whole-level decode could cache, but level 0 must
+# still be reachable around the point being looked at.
+BIG = (12_500, 8_000)
+MARK = (9_000, 6_000, 9_200, 6_200)
+
+pytestmark = pytest.mark.filterwarnings("ignore::PIL.Image.DecompressionBombWarning")
+
+
+@pytest.fixture(scope="module")
+def big_jpeg(tmp_path_factory):
+    path = tmp_path_factory.mktemp("tiles") / "big.jpg"
+    img = Image.new("L", BIG, 0)
+    ImageDraw.Draw(img).rectangle(MARK, fill=255)
+    img.save(path, quality=50)
+    img.close()
+    return path
+
+
+def test_level_0_of_a_100mp_image_decodes_around_the_focus(big_jpeg):
+    cache = TileCache(max_bytes=16 * 1024 * 1024)
+    source = TiledImage(big_jpeg, cache)
+    assert source.level_for(1.0) == 0
+    assert source.level_for(2.0) == 0
+
+    focus = (8_800, 5_800, 9_400, 6_400)
+    kept = source.decode_level(0, focus)
+    assert source.tiles_for(0, focus) <= kept
+    assert len(kept) * TILE_SIZE * TILE_SIZE <= cache.max_bytes
+    assert cache._bytes <= cache.max_bytes
+
+    region = source.region(0, (9_050, 6_050, 9_150, 6_150))
+    assert region is not None and region.size == (100, 100)
+    assert region.getextrema()[0] > 200
+    # Far from the focus: not decoded into the cache.
+    assert source.region(0, (0, 0, 100, 100)) is None
+
+
+def test_decode_moves_with_the_focus(big_jpeg):
+    cache = TileCache(max_bytes=8 * 1024 * 1024)
+    source = TiledImage(big_jpeg, cache)
+    source.decode_level(0, (9_000, 6_000, 9_200, 6_200))
+    corner = (0, 0, 1_000, 700)
+    assert source.region(0, corner) is None
+
+    kept = source.decode_level(0, corner)
+    assert source.tiles_for(0, corner) <= kept
+    region = source.region(0, corner)
+    assert region is not None and region.getextrema()[1] < 50
+    assert cache._bytes <= cache.max_bytes
+
+
+def test_small_level_is_cached_whole(big_jpeg):
+    cache = TileCache(max_bytes=16 * 1024 * 1024)
+    source = TiledImage(big_jpeg, cache)
+    level = source.level_for(1 / 8)
+    assert level == 3
+    width, height = source.level_size(level)
+    assert source.decode_level(level) == source.tiles_for(level, (0, 0, width, height))
+    region = source.region(level, (0, 0, width, height))
+    assert region is not None and region.size == (width, height)
@@ -0,0 +1,182 @@
+import itertools
+import shutil
+from pathlib import Path
+
+import pytest
+
+from undo import UndoAction, UndoJournal, UndoManager
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return tmp_path / "undo-journal.jsonl"
+
+
+_copies = itertools.count()
+
+
+def _manager(journal_path):
+    return UndoManager(UndoJournal(journal_path))
+
+
+def _reopen(journal_path):
+    """
+    A fresh manager replaying a copy of the journal, as on the next launch
+    (or after a crash). A copy: replay compacts the file it reads, under
+    the feet of the manager still writing to it.
+    """
+    copy = journal_path.with_name(f"replay-{next(_copies)}.jsonl")
+    shutil.copyfile(journal_path, copy)
+    undo = _manager(copy)
+    return undo, undo.restore()
+
+
+def _stack(undo):
+    return [(a.type, a.src.name, a.dst.name, [c.src.name for c in a.children or []]) for a in undo._stack]
+
+
+def _move(name):
+    return UndoAction(type="move", src=Path("/sorted") / name, dst=Path("/src") / name)
+
+
+def test_push_survives_a_crash(journal_path):
+    undo = _manager(journal_path)
+    undo.begin_session(Path("/src"))
+    undo.push_move(moved_to=Path("/sorted/a.jpg"), restore_to=Path("/src/a.jpg"))
+    undo.push_delete(moved_to=Path("/src/._trash-temp/b.jpg"), restore_to=Path("/src/b.jpg"))
+    # No close(): every line is flushed as it is written.
+
+    again, source = _reopen(journal_path)
+    assert source == Path("/src")
+    assert _stack(again) == [("move", "a.jpg", "a.jpg", []), ("delete", "b.jpg", "b.jpg", [])]
+
+
+def test_pop_is_journalled_only_on_commit(journal_path):
+    undo = _manager(journal_path)
+    undo.begin_session(Path("/src"))
+    undo.push_batch([_move("a.jpg")])
+    undo.push_batch([_move("b.jpg")])
+
+    assert undo.undo().src.name == "b.jpg"
+    # Dies before the file is back: the action is still there to undo.
+    assert [a[1] for a in _stack(_reopen(journal_path)[0])] == ["a.jpg", "b.jpg"]
+
+    undo.commit_undo()
+    assert [a[1] for a in _stack(_reopen(journal_path)[0])] == ["a.jpg"]
+
+
+def test_undo_many_commits_as_one_pop(journal_path):
+    undo = _manager(journal_path)
+    undo.begin_session(Path("/src"))
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        undo.push_batch([_move(name)])
+    assert [a.src.name for a in undo.undo_many(2)] == ["c.jpg", "b.jpg"]
+    undo.commit_undo()
+    assert [r["op"] for r in UndoJournal(journal_path).read()].count("pop") == 1
+    assert [a[1] for a in _stack(_reopen(journal_path)[0])] == ["a.jpg"]
+
+
+def test_commit_undo_puts_back_what_could_not_be_moved(journal_path):
+    undo = _manager(journal_path)
+    undo.begin_session(Path("/src"))
+    undo.push_batch([_move("a.jpg"), _move("b.jpg"), _move("c.jpg")])
+    action = undo.undo()
+    stuck = [c for c in action.expand() if c.src.name != "b.jpg"]    # most recent first
+    undo.commit_undo(stuck)
+    assert _stack(undo) == [("batch", "c.jpg", "a.jpg", ["a.jpg", "c.jpg"])]
+    assert _stack(_reopen(journal_path)[0]) == _stack(undo)
+
+
+def test_batch_replay(journal_path):
+    undo = _manager(journal_path)
+    undo.begin_session(Path("/src"))
+    undo.push_batch([_move("a.jpg"), UndoAction(type="delete", src=Path("/src/._trash-temp/b.jpg"), dst=Path("/src/b.jpg"))])
+    again, _ = _reopen(journal_path)
+    assert _stack(again) == [("batch", "b.jpg", "a.jpg", ["a.jpg", "b.jpg"])]
+    assert [c.type for c in again._stack[0].expand()] == ["delete", "move"]
+    assert again.trashed_paths() == [Path("/src/._trash-temp/b.jpg")]
+
+
+def test_discard_inside_a_batch(journal_path):
+    undo = _manager(journal_path)
+    undo.begin_session(Path("/src"))
+    undo.push_batch([_move("a.jpg"), _move("b.jpg")])
+    undo.push_move(moved_to=Path("/sorted/c.jpg"), restore_to=Path("/src/c.jpg"))
+
+    undo.discard(Path("/sorted/a.jpg"))
+    assert _stack(_reopen(journal_path)[0]) == [
+        ("batch", "b.jpg", "a.jpg", ["b.jpg"]),
+        ("move", "c.jpg", "c.jpg", []),
+    ]
+
+    # The batch's last file goes: so does the batch.
+    undo.discard(Path("/sorted/b.jpg"))
+    assert _stack(_reopen(journal_path)[0]) == [("move", "c.jpg", "c.jpg", [])]
+
+
+def test_discard_unknown_file_writes_nothing(journal_path):
+    undo = _manager(journal_path)
+    undo.begin_session(Path("/src"))
+    undo.discard(Path("/sorted/nope.jpg"))
+    assert [r["op"] for r in UndoJournal(journal_path).read()] == ["session"]
+
+
+def test_truncated_last_line_is_ignored(journal_path):
+    undo = _manager(journal_path)
+    undo.begin_session(Path("/src"))
+    undo.push_batch([_move("a.jpg")])
+    undo.push_batch([_move("b.jpg")])
+    undo.journal.close()
+
+    data = journal_path.read_bytes()
+    journal_path.write_bytes(data[:-10])     # torn write of the last push
+
+    again = _manager(journal_path)
+    assert again.restore() == Path("/src")
+    assert [a[1] for a in _stack(again)] == ["a.jpg"]
+    # Replay compacts the journal, so the torn tail is gone for good.
+    assert [r["op"] for r in UndoJournal(journal_path).read()] == ["session", "push"]
+
+
+def test_new_session_forgets_the_old_stack(journal_path):
+    undo = _manager(journal_path)
+    undo.begin_session(Path("/src"))
+    undo.push_batch([_move("a.jpg")])
+    undo.begin_session(Path("/other"))
+    again, source = _reopen(journal_path)
+    assert source is None       # nothing to resume
+    assert _stack(again) == []
+
+
+def test_compaction_keeps_only_the_live_stack(journal_path):
+    undo = _manager(journal_path)
+    undo.begin_session(Path("/src"))
+    for i in range(1200):
+        undo.push_batch([_move(f"{i}.jpg")])
+        undo.undo()
+        undo.commit_undo()
+    undo.push_batch([_move("kept.jpg")])
+
+    records = UndoJournal(journal_path).read()
+    assert len(records) < 1200      # compacted along the way
+    assert [a[1] for a in _stack(_reopen(journal_path)[0])] == ["kept.jpg"]
+
+
+def test_apply_many_skips_gone_files_and_reports_failures(tmp_path):
+    src = tmp_path / "src"
+    sorted_ = tmp_path / "sorted"
+    src.mkdir()
+    sorted_.mkdir()
+    (sorted_ / "a.jpg").write_bytes(b"a")
+    actions = [
+        UndoAction(type="move", src=sorted_ / "a.jpg", dst=src / "a.jpg"),
+        UndoAction(type="move", src=sorted_ / "gone.jpg", dst=src / "gone.jpg"),
+    ]
+    (sorted_ / "b.jpg").write_bytes(b"b")
+    blocked = UndoAction(type="move", src=sorted_ / "b.jpg", dst=tmp_path / "missing" / "dir" / "b.jpg")
+
+    failed = []
+    applied = UndoManager().apply_many(actions + [blocked], failed)
+    assert [a.src.name for a in applied] == ["a.jpg"]
+    assert (src / "a.jpg").exists()
+    assert [a.src.name for a, _ in failed] == ["b.jpg"]
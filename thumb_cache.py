@@ -0,0 +1,165 @@
+# thumb_cache.py
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from app_cache import CACHE_DIR
+
+DEFAULT_CACHE_DIR = CACHE_DIR / "thumbs"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ThumbnailStore:
+    """
+    Persistent thumbnail cache shared across sessions.
+
+    Entries are keyed by file name, size and mtime (not by folder), so a
+    file moved by FileRouter keeps its cached thumbnail in the new folder.
+    Files are touched on every hit and the least recently used ones are
+    evicted once the store grows past `max_bytes`.
+
+    Only one process may evict. Decode workers open the store with
+    evict=False: they keep no index and just read and write entries,
+    queueing what they used for take_used(); the app's store record()s
+    that, so the size cap holds for all of them together.
+    """
+
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, evict: bool = True) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.evicts = evict
+        self._used: list[tuple[str, Optional[int]]] = []    # (key, new size or None for a hit)
+        self._index: Optional[OrderedDict[str, int]] = None
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def key(self, path: Path, size: tuple[int, int]) -> Optional[str]:
+        path = Path(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        # Whole seconds: copies onto FAT/exFAT or SMB shares round mtime.
+        ident = f"{path.name}|{st.st_size}|{int(st.st_mtime)}|{size[0]}x{size[1]}"
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+    def get(self, path: Path, size: tuple[int, int]):
+        key = self.key(path, size)
+        if key is None:
+            return None
+
+        if self.evicts:
+            with self._lock:
+                index = self._load_index()
+                if key not in index:
+                    return None
+                index.move_to_end(key)
+
+        file = self._file_for(key)
+        try:
+            with Image.open(file) as img:
+                img.load()
+                result = img.copy()
+            os.utime(file)
+        except OSError:
+            if self.evicts:
+                self._forget(key)
+            return None
+        if not self.evicts:
+            self._used.append((key, None))
+        return result
+
+    def put(self, path: Path, size: tuple[int, int], img) -> None:
+        key = self.key(path, size)
+        if key is None:
+            return
+
+        file = self._file_for(key)
+        tmp = file.with_name(file.name + ".tmp")
+        try:
+            file.parent.mkdir(parents=True, exist_ok=True)
+            if img.mode in ("RGB", "L"):
+                img.save(tmp, format="JPEG", quality=88)
+            else:
+                img.save(tmp, format="PNG")
+            os.replace(tmp, file)
+            nbytes = file.stat().st_size
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return
+
+        if self.evicts:
+            self.record([(key, nbytes)])
+        else:
+            self._used.append((key, nbytes))
+
+    def take_used(self) -> list[tuple[str, Optional[int]]]:
+        """Entries read or written since the last call (evict=False only)."""
+        used, self._used = self._used, []
+        return used
+
+    def record(self, used: list[tuple[str, Optional[int]]]) -> None:
+        """Account for entries another process read or written (see take_used)."""
+        with self._lock:
+            index = self._load_index()
+            for key, nbytes in used:
+                if nbytes is None:
+                    if key in index:
+                        index.move_to_end(key)
+                    continue
+                self._total -= index.pop(key, 0)
+                index[key] = nbytes
+                self._total += nbytes
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            index = self._load_index()
+            for key in list(index):
+                self._file_for(key).unlink(missing_ok=True)
+            index.clear()
+            self._total = 0
+
+    def _file_for(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _load_index(self) -> OrderedDict[str, int]:
+        """Build the LRU index from the cache directory (oldest first). Lock held."""
+        if self._index is not None:
+            return self._index
+
+        entries = []
+        if self.root.is_dir():
+            for bucket in os.scandir(self.root):
+                if not bucket.is_dir():
+                    continue
+                for entry in os.scandir(bucket.path):
+                    if entry.name.endswith(".tmp") or not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    entries.append((st.st_mtime, entry.name, st.st_size))
+
+        entries.sort()
+        self._index = OrderedDict((name, nbytes) for _, name, nbytes in entries)
+        self._total = sum(self._index.values())
+        self._evict()
+        return self._index
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and self._index:
+            key, nbytes = self._index.popitem(last=False)
+            self._total -= nbytes
+            self._file_for(key).unlink(missing_ok=True)
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            index = self._load_index()
+            self._total -= index.pop(key, 0)
+        self._file_for(key).unlink(missing_ok=True)
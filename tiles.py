@@ -0,0 +1,181 @@
+# tiles.py
+from __future__ import annotations
+
+import math
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+import media_types
+
+TILE_SIZE = 512
+TILE_CACHE_BYTES = 256 * 1024 * 1024
+# Share of the cache one decode may fill. A level bigger than that keeps
+# only the tiles nearest the focus, and the rest of the cache (coarser
+# levels, other files) survives.
+DECODE_CACHE_SHARE = 0.5
+
+TileKey = tuple[str, int, int, int, int]    # path, mtime_ns, level, col, row
+
+
+class TileCache:
+    """Thread-safe LRU of decoded tiles, bounded by their size in bytes."""
+
+    def __init__(self, max_bytes: int = TILE_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._tiles: OrderedDict[TileKey, Image.Image] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: TileKey) -> Optional[Image.Image]:
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+            return tile
+
+    def put(self, key: TileKey, tile: Image.Image) -> None:
+        with self._lock:
+            old = self._tiles.pop(key, None)
+            if old is not None:
+                self._bytes -= _nbytes(old)
+            self._tiles[key] = tile
+            self._bytes += _nbytes(tile)
+            while self._bytes > self.max_bytes and len(self._tiles) > 1:
+                _, evicted = self._tiles.popitem(last=False)
+                self._bytes -= _nbytes(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tiles.clear()
+            self._bytes = 0
+
+
+def _nbytes(img: Image.Image) -> int:
+    return img.width * img.height * len(img.getbands())
+
+
+class TiledImage:
+    """
+    One file seen as a pyramid: level k is the image reduced 2**k times.
+    Levels are decoded whole on demand (in a worker), cut into tiles and
+    kept in a shared TileCache; region() then assembles any part of a
+    level from tiles alone.
+
+    JPEG levels 1-3 come straight out of libjpeg's DCT scaling (draft()),
+    so they cost a fraction of a full decode in both time and memory. Other
+    formats, and level 0 of any, are loaded at full size into a temporary
+    image that is released once its tiles are cut; a level too big for the
+    cache only keeps the tiles around the focus, and panning away decodes
+    it again around the new one.
+    """
+
+    def __init__(self, path: Path, cache: TileCache) -> None:
+        self.path = Path(path)
+        self.cache = cache
+        with media_types.open_image(self.path) as img:
+            self.size = img.size
+            self.is_jpeg = img.format == "JPEG"
+        self._key = (str(self.path), os.stat(self.path).st_mtime_ns)
+
+    def level_size(self, level: int) -> tuple[int, int]:
+        f = 2 ** level
+        return math.ceil(self.size[0] / f), math.ceil(self.size[1] / f)
+
+    def level_for(self, scale: float) -> int:
+        """Coarsest level that still has at least `scale` pixels per image pixel."""
+        return math.floor(math.log2(1 / scale)) if scale < 1 else 0
+
+    def tiles_for(self, level: int, box: tuple[int, int, int, int]) -> set[tuple[int, int]]:
+        """The (col, row) of every tile of `level` that `box` touches."""
+        width, height = self.level_size(level)
+        x0, y0 = max(0, box[0]), max(0, box[1])
+        x1, y1 = min(width, box[2]), min(height, box[3])
+        if x1 <= x0 or y1 <= y0:
+            return set()
+        return {(col, row)
+                for row in range(y0 // TILE_SIZE, (y1 - 1) // TILE_SIZE + 1)
+                for col in range(x0 // TILE_SIZE, (x1 - 1) // TILE_SIZE + 1)}
+
+    def region(self, level: int, box: tuple[int, int, int, int]) -> Optional[Image.Image]:
+        """`box` of level `level`, from cached tiles, or None if any are missing."""
+        width, height = self.level_size(level)
+        x0, y0 = max(0, box[0]), max(0, box[1])
+        x1, y1 = min(width, box[2]), min(height, box[3])
+        if x1 <= x0 or y1 <= y0:
+            return None
+
+        out = None
+        for row in range(y0 // TILE_SIZE, (y1 - 1) // TILE_SIZE + 1):
+            for col in range(x0 // TILE_SIZE, (x1 - 1) // TILE_SIZE + 1):
+                tile = self.cache.get(self._key + (level, col, row))
+                if tile is None:
+                    return None
+                if out is None:
+                    out = Image.new(tile.mode, (x1 - x0, y1 - y0))
+                out.paste(tile, (col * TILE_SIZE - x0, row * TILE_SIZE - y0))
+        return out
+
+    def decode_level(
+        self, level: int, focus: Optional[tuple[int, int, int, int]] = None
+    ) -> set[tuple[int, int]]:
+        """
+        Decode `level` and cache its tiles, nearest `focus` (a box in level
+        coordinates) first, until DECODE_CACHE_SHARE of the cache is used;
+        the tiles `focus` touches are always kept. Returns the (col, row)
+        of the tiles cached.
+        """
+        img = self._decode(level)
+        try:
+            cols = math.ceil(img.width / TILE_SIZE)
+            rows = math.ceil(img.height / TILE_SIZE)
+            cells = [(c, r) for r in range(rows) for c in range(cols)]
+            needed = self.tiles_for(level, focus) if focus is not None else set()
+            if needed:
+                c0, c1 = min(c for c, _ in needed), max(c for c, _ in needed)
+                r0, r1 = min(r for _, r in needed), max(r for _, r in needed)
+                cells.sort(key=lambda cr: max(c0 - cr[0], 0, cr[0] - c1) ** 2 + max(r0 - cr[1], 0, cr[1] - r1) ** 2)
+
+            budget = self.cache.max_bytes * DECODE_CACHE_SHARE
+            tile_bytes = TILE_SIZE * TILE_SIZE * len(img.getbands())
+            keep = []
+            for cell in cells:
+                if cell not in needed and (len(keep) + 1) * tile_bytes > budget:
+                    break
+                keep.append(cell)
+
+            # Farthest first, so the tiles nearest the focus are the most
+            # recently used.
+            for col, row in reversed(keep):
+                box = (col * TILE_SIZE, row * TILE_SIZE,
+                       min(img.width, (col + 1) * TILE_SIZE), min(img.height, (row + 1) * TILE_SIZE))
+                self.cache.put(self._key + (level, col, row), img.crop(box))
+            return set(keep)
+        finally:
+            img.close()
+
+    def _decode(self, level: int) -> Image.Image:
+        # Leaving the with-block only closes the file; the decoded pixels
+        # stay, so level 0 is returned without a second full-size copy.
+        with media_types.open_image(self.path) as img:
+            if self.is_jpeg:
+                dct_level = min(level, 3)
+                img.draft("RGB" if img.mode not in ("L", "RGB") else img.mode, self.level_size(dct_level))
+            img.load()
+            done = round(math.log2(self.size[0] / img.width)) if img.width else 0
+
+        if level > done:
+            decoded = img
+            img = img.reduce(2 ** (level - done))
+            decoded.close()
+
+        if img.mode not in ("L", "RGB", "RGBA"):
+            img = img.convert("RGB")
+        # The decoder's rounding can differ from level_size() by a pixel.
+        if img.size != self.level_size(level):
+            img = img.resize(self.level_size(level), Image.Resampling.BILINEAR)
+        return img
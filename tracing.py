@@ -0,0 +1,164 @@
+# tracing.py
+"""
+Latency spans for the interactive hot paths.
+
+    with tracing.span("decode", path):
+        ...
+
+Off unless PHOTO_SORTER_TRACE is set (or enable() is called); while off,
+span() returns one shared no-op object, so the cost is a global lookup and
+a call. While on, every span feeds a per-stage histogram (p50/p95/p99) and
+spans slower than SLOW_MS are kept, with the file's name and size, in a
+slow-operation log. dump() writes both as JSON.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+from app_cache import CACHE_DIR
+
+ENABLED = bool(os.environ.get("PHOTO_SORTER_TRACE"))
+SLOW_MS = float(os.environ.get("PHOTO_SORTER_SLOW_MS", 100))
+DEFAULT_TRACE_PATH = Path(
+    os.environ.get("PHOTO_SORTER_TRACE_FILE", CACHE_DIR / "trace.json")
+)
+SLOW_LOG_SIZE = 500
+
+# Log-spaced buckets: 10 µs and up, each 10% wider than the last, so a
+# percentile is accurate to within 10% whatever its magnitude.
+_BUCKET_BASE_MS = 0.01
+_BUCKET_GROWTH = 1.1
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "total_ms", "max_ms")
+
+    def __init__(self) -> None:
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        b = 0 if ms <= _BUCKET_BASE_MS else math.ceil(math.log(ms / _BUCKET_BASE_MS, _BUCKET_GROWTH))
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (0 < q <= 1)."""
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= rank:
+                return min(_BUCKET_BASE_MS * _BUCKET_GROWTH ** b, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+_lock = threading.Lock()
+_histograms: dict[str, Histogram] = {}
+_slow: deque = deque(maxlen=SLOW_LOG_SIZE)
+
+
+class _Span:
+    __slots__ = ("name", "path", "started")
+
+    def __init__(self, name: str, path) -> None:
+        self.name = name
+        self.path = path
+
+    def __enter__(self) -> "_Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        record(self.name, (time.perf_counter() - self.started) * 1000, self.path)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL = _NullSpan()
+
+
+def span(name: str, path=None):
+    """Time a block as stage `name`; `path` names the file in the slow log."""
+    if not ENABLED:
+        return _NULL
+    return _Span(name, path)
+
+
+def enable(on: bool = True) -> None:
+    global ENABLED
+    ENABLED = on
+
+
+def record(name: str, ms: float, path=None) -> None:
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.add(ms)
+
+    if ms >= SLOW_MS:
+        entry = {"stage": name, "ms": round(ms, 3), "at": time.time()}
+        if path is not None:
+            entry["file"] = Path(path).name
+            try:
+                entry["size"] = os.stat(path).st_size
+            except OSError:
+                pass
+        with _lock:
+            _slow.append(entry)
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            "stages": {name: h.summary() for name, h in sorted(_histograms.items())},
+            "slow": list(_slow),
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
+        _slow.clear()
+
+
+def dump(path: Optional[Path] = None) -> Optional[Path]:
+    """Write stats() as JSON; returns where, or None if tracing is off."""
+    if not ENABLED:
+        return None
+    path = Path(path or DEFAULT_TRACE_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = stats()
+    data["slow_ms"] = SLOW_MS
+    path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+    return path
@@ -1,6 +1,12 @@
 ## gui
+import sys
 import tkinter as tk
-from deletion import delete_current_image
+import media_loader
+from filmstrip import Filmstrip
+from deletion import delete_current_image, keep_sharpest_of_burst, trash_sorted_duplicates
+from folder_panel import VirtualFolderList
+from folder_suggest import SUGGESTION_COUNT
+from metadata import SORT_ORDERS
 
 
 def _is_descendant(widget, ancestor):
@@ -14,9 +20,9 @@ def _is_descendant(widget, ancestor):
 
 def _install_folder_scrolling(app):
     root = app.root
-    canvas = app.folder_canvas
+    canvas = app.folder_list.frame
 
-    # Track a precise scroll position (0.0 → 1.0)
+    # Fractional rows accumulated from smooth (trackpad) deltas
     app._scroll_pos = 0.0
 
     def _on_mousewheel(event):
@@ -32,16 +38,13 @@ def _install_folder_scrolling(app):
         if delta == 0:
             return
 
-        # Normalize delta (macOS trackpad safe)
-        step = -delta / 100.0   # smaller = slower, smoother
+        # Normalize delta (macOS trackpad safe): ~1 row per 30 units
+        app._scroll_pos += -delta / 30.0
 
-        # Update position
-        app._scroll_pos += step
-
-        # Clamp to valid range
-        app._scroll_pos = max(0.0, min(1.0, app._scroll_pos))
-
-        canvas.yview_moveto(app._scroll_pos)
+        rows = int(app._scroll_pos)
+        if rows:
+            app._scroll_pos -= rows
+            app.folder_list.scroll_rows(rows)
         return "break"
 
     def _on_linux_up(event):
@@ -50,8 +53,7 @@ def _install_folder_scrolling(app):
             root.winfo_pointery()
         )
         if widget and _is_descendant(widget, canvas):
-            app._scroll_pos = max(0.0, app._scroll_pos - 0.05)
-            canvas.yview_moveto(app._scroll_pos)
+            app.folder_list.scroll_rows(-1)
             return "break"
 
     def _on_linux_down(event):
@@ -60,8 +62,7 @@ def _install_folder_scrolling(app):
             root.winfo_pointery()
         )
         if widget and _is_descendant(widget, canvas):
-            app._scroll_pos = min(1.0, app._scroll_pos + 0.05)
-            canvas.yview_moveto(app._scroll_pos)
+            app.folder_list.scroll_rows(1)
             return "break"
 
     # Global binds (required so buttons receive scroll)
@@ -69,6 +70,25 @@ def _install_folder_scrolling(app):
     root.bind_all("<Button-4>", _on_linux_up)       # Linux
     root.bind_all("<Button-5>", _on_linux_down)     # Linux
 
+def enable_dpi_awareness():
+    """
+    On Windows, ask for real device pixels instead of being bitmap-scaled
+    (blurry) on high-DPI screens, so the image area's size is its true pixel
+    size. Must run before the Tk root is created. X11 already works in
+    device pixels; on macOS Tk draws images at one pixel per point, so a
+    bigger decode would not be any sharper there.
+    """
+    if sys.platform != "win32":
+        return
+    import ctypes
+    try:
+        ctypes.windll.shcore.SetProcessDpiAwareness(1)  # system DPI aware
+    except (AttributeError, OSError):
+        try:
+            ctypes.windll.user32.SetProcessDPIAware()
+        except (AttributeError, OSError):
+            pass
+
 def build_ui(app):
     root = app.root
     app._scroll_after_id = None
@@ -79,9 +99,13 @@ def build_ui(app):
 
     # Image display frame
     app.image_frame = tk.Frame(app.content_frame, height=500)
-    app.image_frame.pack(side="top", fill="x")
+    app.image_frame.pack(side="top", fill="both", expand=True)
     app.image_frame.pack_propagate(False)
 
+    # Images are rendered for the area's live size; re-render once a
+    # resize settles
+    app.image_frame.bind("<Configure>", lambda e: media_loader.on_viewport_configure(app))
+
     # Image label
     app.image_label = tk.Label(app.image_frame)
     app.image_label.pack(expand=True)
@@ -96,35 +120,34 @@ def build_ui(app):
     )
     app.video_overlay.place_forget()
 
-    # Scroll container for folders
-    app.folder_canvas = tk.Canvas(app.content_frame, height=220)
-    app.folder_scrollbar = tk.Scrollbar(
-        app.content_frame,
-        orient="vertical",
-        command=app.folder_canvas.yview
-    )
-
-    app.folder_canvas.configure(
-        yscrollcommand=app.folder_scrollbar.set
-    )
-
-    app.folder_scrollbar.pack(side="right", fill="y")
-    app.folder_canvas.pack(side="left", fill="x", padx=10)
+    # Thumbnails of the next items, rendered in the background
+    app.filmstrip = Filmstrip(app.content_frame, store=app.thumb_store, submit=app.submit_decode)
+    app.filmstrip.frame.pack(side="top", fill="x", padx=10, pady=4)
+
+    # Predicted target folders for the current item (keys 1-5)
+    app.suggest_frame = tk.Frame(app.content_frame)
+    app.suggest_frame.pack(side="top", fill="x", padx=10, pady=2)
+    app.suggestion_buttons = []
+    for i in range(SUGGESTION_COUNT):
+        button = tk.Button(
+            app.suggest_frame,
+            text="",
+            state="disabled",
+            command=lambda i=i: app.move_to_suggestion(i)
+        )
+        button.pack(side="left", padx=2)
+        app.suggestion_buttons.append(button)
 
-    app.folder_frame = tk.Frame(app.folder_canvas)
-    app.folder_canvas.create_window(
-        (0, 0),
-        window=app.folder_frame,
-        anchor="nw"
-    )
+    # Type-ahead search over folder names ("/" focuses it, Return picks
+    # the top match, Escape clears)
+    app.folder_search_var = tk.StringVar()
+    app.folder_search = tk.Entry(app.content_frame, textvariable=app.folder_search_var)
+    app.folder_search.pack(side="top", fill="x", padx=10)
+    app.folder_search_var.trace_add("write", lambda *_: app.filter_folders())
 
-    # Update scroll region when folders change
-    app.folder_frame.bind(
-        "<Configure>",
-        lambda e: app.folder_canvas.configure(
-            scrollregion=app.folder_canvas.bbox("all")
-        )
-    )
+    # Virtualized folder list: only the visible rows are real widgets
+    app.folder_list = VirtualFolderList(app.content_frame, on_pick=app.move_image)
+    app.folder_list.frame.pack(side="left", fill="x", expand=True, padx=10)
 
     # ✅ INSTALL ROBUST SCROLLING
     _install_folder_scrolling(app)
@@ -147,6 +170,30 @@ def build_ui(app):
     )
     app.undo_btn.pack(side="left", padx=10)
 
+    app.undo_many_btn = tk.Button(
+        app.action_frame,
+        text="↩ Undo N…",
+        command=app.undo_last_actions
+    )
+    app.undo_many_btn.pack(side="left", padx=10)
+
+    app.select_btn = tk.Button(
+        app.action_frame,
+        text="⇥ Select Next…",
+        command=app.select_next_k
+    )
+    app.select_btn.pack(side="left", padx=10)
+
+    # Order of the upcoming items (see metadata.SORT_ORDERS)
+    app.sort_var = tk.StringVar(value=app.sort_order)
+    app.sort_menu = tk.OptionMenu(
+        app.action_frame,
+        app.sort_var,
+        *SORT_ORDERS,
+        command=app.set_sort_order
+    )
+    app.sort_menu.pack(side="left", padx=10)
+
     app.delete_btn = tk.Button(
         app.action_frame,
         text="🗑 Delete Photo",
@@ -154,3 +201,33 @@ def build_ui(app):
         command=lambda: delete_current_image(app)
     )
     app.delete_btn.pack(side="right", padx=10)
+
+    app.dupes_btn = tk.Button(
+        app.action_frame,
+        text="🧹 Trash Duplicates",
+        command=lambda: trash_sorted_duplicates(app)
+    )
+    app.dupes_btn.pack(side="right", padx=10)
+
+    app.burst_btn = tk.Button(
+        app.action_frame,
+        text="🎞 Keep Sharpest",
+        command=lambda: keep_sharpest_of_burst(app)
+    )
+    app.burst_btn.pack(side="right", padx=10)
+
+    # Background move progress / status
+    app.status_label = tk.Label(app.action_frame, text="", fg="gray")
+    app.status_label.pack(side="left", padx=10)
+
+    # Range selection ("5 selected (through IMG_0123.jpg)")
+    app.selection_label = tk.Label(app.action_frame, text="", fg="blue")
+    app.selection_label.pack(side="left", padx=10)
+
+    # "Already sorted into X" hint for exact duplicates
+    app.duplicate_label = tk.Label(app.action_frame, text="", fg="orange")
+    app.duplicate_label.pack(side="left", padx=10)
+
+    # "Burst of 12, sharpest IMG_0123.jpg"
+    app.burst_label = tk.Label(app.action_frame, text="", fg="purple")
+    app.burst_label.pack(side="left", padx=10)
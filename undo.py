@@ -2,22 +2,165 @@ from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Optional, Literal, Union
+import json
+import os
 import shutil
+import time
 
-ActionType = Literal["move", "delete"]
+from app_cache import CACHE_DIR
+
+DEFAULT_JOURNAL_PATH = CACHE_DIR / "undo-journal.jsonl"
+
+ActionType = Literal["move", "delete", "batch"]
 
 @dataclass
 class UndoAction:
     type: ActionType
     src: Path   # where the file currently is
     dst: Path   # where to restore it to
+    # For "batch": the individual actions, in the order they were done.
+    children: Optional[List["UndoAction"]] = None
+
+    def expand(self) -> List["UndoAction"]:
+        """The file-level actions to reverse, most recent first."""
+        if self.type == "batch":
+            return list(reversed(self.children or []))
+        return [self]
+
+class UndoJournal:
+    """
+    Append-only JSONL log of undo stack changes, so the stack (and the
+    session it belongs to) survives a crash or quit.
+
+    Lines are flushed to the OS on every append but fsync'd in batches:
+    every `fsync_every` records or `fsync_interval` seconds, whichever
+    comes first, and on sync()/close(). A torn last line from a crash is
+    ignored on replay.
+    """
+
+    def __init__(self, path: Path = DEFAULT_JOURNAL_PATH, fsync_every: int = 8, fsync_interval: float = 1.0) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.records_written = 0
+
+    def append(self, record: dict) -> None:
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        self.records_written += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self) -> None:
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def read(self) -> list[dict]:
+        records = []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        break  # torn write at the tail
+        except FileNotFoundError:
+            pass
+        return records
+
+    def rewrite(self, records: list[dict]) -> None:
+        """Atomically replace the journal with `records` (compaction)."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._unsynced = 0
+        self.records_written = len(records)
+
+    def close(self) -> None:
+        self.sync()
+        self._file.close()
+
 
 class UndoManager:
-    def __init__(self) -> None:
+    def __init__(self, journal: Optional[UndoJournal] = None) -> None:
         self._stack: List[UndoAction] = []
+        self.journal = journal
+        self.source_dir: Optional[Path] = None
+        # Popped by undo()/undo_many() but not journalled yet: that waits
+        # for commit_undo(), once the files are really back.
+        self._unlogged_pops = 0
 
     def clear(self) -> None:
         self._stack.clear()
+        if self.journal is not None:
+            self.journal.rewrite(self._session_records())
+
+    def begin_session(self, source_dir: Path) -> None:
+        """Start a fresh stack for `source_dir` (recorded so it can be resumed)."""
+        self.source_dir = Path(source_dir)
+        self.clear()
+
+    def restore(self) -> Optional[Path]:
+        """
+        Rebuild the stack by replaying the journal.
+        Returns the session's source folder, or None if there is nothing to resume.
+        """
+        if self.journal is None:
+            return None
+
+        stack: List[UndoAction] = []
+        source = None
+        for record in self.journal.read():
+            op = record.get("op")
+            if op == "session":
+                source = Path(record["source"]) if record.get("source") else None
+                stack = []
+            elif op == "push":
+                stack.append(_from_record(record))
+            elif op == "pop":
+                del stack[max(len(stack) - record.get("n", 1), 0):]
+            elif op == "discard":
+                _discard(stack, Path(record["src"]))
+
+        self._stack = stack
+        self.source_dir = source
+        self.compact()
+        return source if stack else None
+
+    def compact(self) -> None:
+        """Rewrite the journal as just the session header plus the live stack."""
+        if self.journal is not None:
+            self.journal.rewrite(self._session_records() + [_push_record(a) for a in self._stack])
+            self._unlogged_pops = 0
+
+    def _session_records(self) -> list[dict]:
+        return [{"op": "session", "source": str(self.source_dir) if self.source_dir else None}]
+
+    def _log(self, record: dict) -> None:
+        if self.journal is None:
+            return
+        self.journal.append(record)
+        # Keep replay cheap: compact once the log is mostly dead records.
+        if self.journal.records_written > 4 * len(self._stack) + 1000:
+            self.compact()
+
+    def trashed_paths(self) -> List[Path]:
+        """Files in the private trash that undo can restore, oldest first."""
+        return [a.src for action in self._stack for a in reversed(action.expand()) if a.type == "delete"]
 
     def has_actions(self) -> bool:
         return bool(self._stack)
@@ -27,22 +170,143 @@ class UndoManager:
         File was moved to `moved_to` (destination).
         Undo should move it back to `restore_to` (original location).
         """
-        self._stack.append(UndoAction(type="move", src=moved_to, dst=restore_to))
+        self._push(UndoAction(type="move", src=moved_to, dst=restore_to))
 
     def push_delete(self, moved_to: Path, restore_to: Path) -> None:
         """
         File was moved to trash/private location `moved_to`.
         Undo should move it back to `restore_to`.
         """
-        self._stack.append(UndoAction(type="delete", src=moved_to, dst=restore_to))
+        self._push(UndoAction(type="delete", src=moved_to, dst=restore_to))
+
+    def push_batch(self, actions: List[UndoAction]) -> None:
+        """Several moves/deletes done as one user action; undone together."""
+        if not actions:
+            return
+        if len(actions) == 1:
+            self._push(actions[0])
+            return
+        self._push(UndoAction(type="batch", src=actions[-1].src, dst=actions[0].dst, children=list(actions)))
+
+    def _push(self, action: UndoAction) -> None:
+        self._stack.append(action)
+        self._log(_push_record(action))
+
+    def discard(self, moved_to: Path) -> None:
+        """
+        Forget the most recent action for a file at `moved_to`
+        (e.g. a background move that failed and never happened).
+        """
+        if _discard(self._stack, moved_to):
+            self._log({"op": "discard", "src": str(moved_to)})
+
+    def peek(self, n: int = 1) -> List[UndoAction]:
+        """The last `n` actions (most recent first), without popping them."""
+        return self._stack[-n:][::-1] if n > 0 else []
 
     def undo(self) -> Optional[UndoAction]:
+        """Pop the last action. Apply it, then call commit_undo()."""
         if not self._stack:
             return None
+        self._unlogged_pops += 1
         return self._stack.pop()
 
+    def undo_many(self, n: int) -> List[UndoAction]:
+        """
+        Pop up to `n` actions at once (most recent first). Apply them, then
+        call commit_undo().
+        """
+        n = min(n, len(self._stack))
+        if n <= 0:
+            return []
+        actions = self._stack[-n:][::-1]
+        del self._stack[-n:]
+        self._unlogged_pops += n
+        return actions
+
+    def commit_undo(self, not_undone: List[UndoAction] = ()) -> None:
+        """
+        Journal the pops since the last call, as a single record. Only call
+        this once their files have been moved back: if the app dies first,
+        the actions are still there to undo next time.
+
+        `not_undone`: file-level actions (most recent first, as from
+        apply_many) whose files couldn't be moved back; they go back on
+        the stack as one action.
+        """
+        if self._unlogged_pops:
+            self._log({"op": "pop", "n": self._unlogged_pops})
+            self._unlogged_pops = 0
+        if not_undone:
+            self.push_batch(list(reversed(not_undone)))
+        if self.journal is not None:
+            self.journal.sync()
+
     def apply(self, action: UndoAction) -> None:
         """
         Execute the actual filesystem undo operation.
         """
-        shutil.move(action.src, action.dst)
+        for child in action.expand():
+            shutil.move(child.src, child.dst)
+
+    def apply_many(
+        self, actions: List[UndoAction], failed: Optional[List[tuple[UndoAction, OSError]]] = None
+    ) -> List[UndoAction]:
+        """
+        Undo several actions in one pass (batches are expanded). Files that
+        are already gone are skipped; returns the file-level actions that
+        were actually applied. A file that can't be moved back (permissions,
+        in use, ...) doesn't stop the rest: it is added, with the error, to
+        `failed` if given, and otherwise the first such error is raised
+        once the others are done.
+        """
+        applied = []
+        errors = []
+        for action in actions:
+            for child in action.expand():
+                if not os.path.lexists(child.src):
+                    continue
+                try:
+                    shutil.move(child.src, child.dst)
+                except OSError as e:
+                    errors.append((child, e))
+                    continue
+                applied.append(child)
+        if failed is not None:
+            failed.extend(errors)
+        elif errors:
+            raise errors[0][1]
+        return applied
+
+
+def _push_record(action: UndoAction) -> dict:
+    record = {"op": "push", "type": action.type, "src": str(action.src), "dst": str(action.dst)}
+    if action.children is not None:
+        record["children"] = [_push_record(c) for c in action.children]
+    return record
+
+
+def _from_record(record: dict) -> UndoAction:
+    children = record.get("children")
+    return UndoAction(
+        type=record["type"],
+        src=Path(record["src"]),
+        dst=Path(record["dst"]),
+        children=[_from_record(c) for c in children] if children is not None else None,
+    )
+
+
+def _discard(stack: List[UndoAction], moved_to: Path) -> bool:
+    for i in range(len(stack) - 1, -1, -1):
+        action = stack[i]
+        if action.type == "batch":
+            for child in action.children:
+                if child.src == moved_to:
+                    action.children.remove(child)
+                    if not action.children:
+                        del stack[i]
+                    return True
+        elif action.src == moved_to:
+            del stack[i]
+            return True
+    return False
@@ -0,0 +1,158 @@
+# video_player.py
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Optional
+
+import cv2
+from PIL import Image
+
+import tracing
+
+
+def fit_size(width: int, height: int, box: tuple[int, int]) -> tuple[int, int]:
+    """Largest size with the same aspect ratio that fits in `box` (never upscales)."""
+    scale = min(box[0] / width, box[1] / height, 1.0)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+class VideoPlayer:
+    """
+    Decodes a cv2.VideoCapture on a background thread into a small bounded
+    queue of display-sized PIL frames, each stamped with its presentation
+    time from CAP_PROP_FPS. The Tk side only pulls whatever frame is due;
+    when decoding falls behind wall-clock time, frames are grabbed without
+    being decoded (or discarded from the queue) to catch up.
+
+    The player owns reads from `cap` while running; stop() before releasing it.
+    """
+
+    def __init__(self, cap, size: tuple[int, int], queue_size: int = 8) -> None:
+        self.cap = cap
+        self.size = size
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        # Some containers report 0 or nonsense (1000) when the rate is unknown.
+        self.fps = fps if 1 < fps < 240 else 30.0
+        self.frames: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.finished = False
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._origin = 0.0
+        self._paused_at: Optional[float] = None
+        self._next = None
+
+    # --- clock --------------------------------------------------------------
+
+    def clock(self) -> float:
+        """Current playback position in seconds."""
+        if self._paused_at is not None:
+            return self._paused_at
+        return time.monotonic() - self._origin
+
+    def start(self) -> None:
+        if self._thread is not None:
+            self.resume()
+            return
+
+        start_pts = self.cap.get(cv2.CAP_PROP_POS_FRAMES) / self.fps
+        self._origin = time.monotonic() - start_pts
+        self._thread = threading.Thread(target=self._decode_loop, name="video-decode", daemon=True)
+        self._thread.start()
+
+    def pause(self) -> None:
+        if self._paused_at is None:
+            self._paused_at = self.clock()
+
+    def resume(self) -> None:
+        if self._paused_at is not None:
+            self._origin = time.monotonic() - self._paused_at
+            self._paused_at = None
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    # --- Tk side ------------------------------------------------------------
+
+    def next_due_frame(self):
+        """Return the newest frame whose time has come, dropping older ones."""
+        now = self.clock()
+        due = None
+        while True:
+            if self._next is None:
+                try:
+                    self._next = self.frames.get_nowait()
+                except queue.Empty:
+                    break
+
+            pts, frame = self._next
+            if pts > now:
+                break
+            if due is not None:
+                self.dropped += 1
+            due = frame
+            self._next = None
+        return due
+
+    def ms_until_next(self) -> int:
+        """How long the Tk loop can sleep before the next frame is due."""
+        if self._next is None:
+            return max(1, int(500 / self.fps))
+        return max(1, int((self._next[0] - self.clock()) * 1000))
+
+    def exhausted(self) -> bool:
+        return self.finished and self._next is None and self.frames.empty()
+
+    # --- decode thread ------------------------------------------------------
+
+    def _decode_loop(self) -> None:
+        cap = self.cap
+        frame_period = 1.0 / self.fps
+        index = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        loop_offset = 0.0
+
+        while not self._stop.is_set():
+            pts = loop_offset + index / self.fps
+            late = pts < self.clock() - frame_period
+
+            ok = cap.grab()
+            if not ok:
+                if index == 0:
+                    break
+                # Loop: keep timestamps increasing so the clock never resets.
+                loop_offset += index / self.fps
+                index = 0
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+            index += 1
+
+            if late:
+                self.dropped += 1
+                continue
+
+            with tracing.span("video.decode"):
+                ok, frame = cap.retrieve()
+                if not ok:
+                    continue
+
+                h, w = frame.shape[:2]
+                target = fit_size(w, h, self.size)
+                if target != (w, h):
+                    frame = cv2.resize(frame, target, interpolation=cv2.INTER_AREA)
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                item = (pts, Image.fromarray(frame))
+
+            while not self._stop.is_set():
+                try:
+                    self.frames.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+        self.finished = True